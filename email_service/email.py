@@ -23,6 +23,7 @@ class SendEmail:
 
     class EmailType:
         STOCK_TRANSFER = "Notification email sent when stock has been transferred"
+        LOW_STOCK_DIGEST = "Digest email listing new low-stock alerts"
 
     def __init__(self):
         self.email_invalid = False
@@ -170,6 +171,57 @@ class SendEmail:
                         email_from=settings.DEFAULT_FROM_EMAIL,
                         subject="[STOCK MANAGEMENT] A transfer request been placed.",
                     )
+            elif notification_type == SendEmail.EmailType.LOW_STOCK_DIGEST:
+                """
+                email a digest of low-stock alerts
+                """
+                recipient_list = list(
+                    set(
+                        User.objects.filter(groups__name="receive_mail").values_list(
+                            "email", flat=True
+                        )
+                    )
+                )
+                if recipient_list and records:
+                    body_plaintext = []
+                    body_html = ["<table><tr><th>SKU</th><th>Description</th>"
+                                 "<th>Location</th><th>Quantity</th><th>Reorder level</th></tr>"]
+                    for alert in records:
+                        body_plaintext.append(
+                            f"""
+                                    - SKU: {alert['sku']} ({alert['description']})
+                                      Location: {alert['location']}
+                                      Quantity: {alert['quantity']} (reorder level {alert['threshold']})
+                                    """
+                        )
+                        body_html.append(
+                            f"""<tr><td>{alert['sku']}</td><td>{alert['description']}</td>"""
+                            f"""<td>{alert['location']}</td><td>{alert['quantity']}</td>"""
+                            f"""<td>{alert['threshold']}</td></tr>"""
+                        )
+                    body_html.append("</table>")
+                    plaintext = f"""
+                    Low Stock Alerts
+
+                    {' '.join(body_plaintext)}
+
+                    """
+                    html = (
+                        "<html><head></head><body>"
+                        + "<h1>Low Stock Alerts</h1>"
+                        + "".join(body_html)
+                        + "<br/><hr/><br/>"
+                        + "</body><footer><hr></footer></html>"
+                    )
+                    return self.send(
+                        body_plaintext=plaintext,
+                        body_html=html,
+                        email_to=recipient_list,
+                        email_from=settings.DEFAULT_FROM_EMAIL,
+                        subject=subject
+                        if subject
+                        else f"[STOCK MANAGEMENT] {len(records)} item(s) at or below reorder level.",
+                    )
         except Exception as e:
             logger.error(f"An error occurred whilst attempting to send email: {str(e)}")
         return False
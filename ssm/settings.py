@@ -85,16 +85,88 @@ ANYMAIL = {
     "SPARKPOST_API_URL": os.getenv("MAIL_SERVICE_API_URL"),
 }
 WSGI_APPLICATION = "ssm.wsgi.application"
+# SQLite storage profile. "tuned" enables WAL so readers no longer block behind
+# writers, and applies the PRAGMAs below on every new connection. "default" keeps
+# SQLite's stock behaviour.
+DB_PROFILE = os.getenv("DB_PROFILE", "tuned")
+SQLITE_PRAGMAS = {
+    "tuned": {
+        "journal_mode": "WAL",
+        # Only takes effect on a new database (or after a VACUUM); lets the
+        # maintain_database command reclaim free pages incrementally.
+        "auto_vacuum": "INCREMENTAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000)),
+        "mmap_size": int(os.getenv("DB_MMAP_SIZE", 268435456)),
+        "cache_size": int(os.getenv("DB_CACHE_SIZE", -64000)),  # negative = KiB
+        "temp_store": "MEMORY",
+    },
+    "default": {},
+}[DB_PROFILE]
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "stock_manager.db_backends.sqlite3",
         "NAME": BASE_DIR / os.environ.get("DB_NAME"),
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 0)),
+        # Connections are returned to a per-worker pool instead of being closed;
+        # see stock_manager/db_backends/sqlite3/base.py. 0 disables pooling.
+        "POOL_SIZE": int(os.getenv("DB_POOL_SIZE", 8)),
+        "OPTIONS": {
+            "init_command": ";".join(
+                f"PRAGMA {name}={value}" for name, value in SQLITE_PRAGMAS.items()
+            ),
+            # Take the write lock when a transaction starts rather than on its first
+            # write, so concurrent writers wait on busy_timeout instead of failing
+            # with "database is locked" on lock upgrade.
+            "transaction_mode": "IMMEDIATE" if DB_PROFILE == "tuned" else None,
+        },
     }
 }
+# Read-only connection on the same file for list, export and report traffic, so
+# long scans never queue behind (or hold up) the writer. See stock_manager/routers.py.
+if get_bool_env(os.getenv("DB_READ_REPLICA", "True")):
+    DATABASES["readonly"] = {
+        **DATABASES["default"],
+        "NAME": f"file:{DATABASES['default']['NAME']}?mode=ro",
+        "OPTIONS": {
+            "init_command": ";".join(
+                [f"PRAGMA {name}={value}" for name, value in SQLITE_PRAGMAS.items() if name not in ("journal_mode", "auto_vacuum")]
+                + ["PRAGMA query_only=1"]
+            ),
+        },
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["stock_manager.routers.ReadWriteRouter"]
+# "responses" holds cached API list/detail responses and "sessions" sessions and
+# the auth cache generation, each in a SQLite file shared by every worker on the
+# host; see stock_manager/cache_backends.py.
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "responses": {
+        "BACKEND": "stock_manager.cache_backends.SQLiteCache",
+        "LOCATION": os.getenv("RESPONSE_CACHE_PATH", str(BASE_DIR / "response_cache.sqlite3")),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 5000)),
+            "MAX_SIZE": int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+        },
+    },
+    "sessions": {
+        "BACKEND": "stock_manager.cache_backends.SQLiteCache",
+        "LOCATION": os.getenv("SESSION_CACHE_PATH", str(BASE_DIR / "session_cache.sqlite3")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("SESSION_CACHE_MAX_ENTRIES", 20000))},
+    },
+}
+# Sessions are read from the cache and written through to the database.
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+SESSION_CACHE_ALIAS = "sessions"
+# Inactive items untouched for this many days are moved to the ArchivedItem table
+# by the archive_items command.
+ITEM_ARCHIVE_AFTER_DAYS = int(os.getenv("ITEM_ARCHIVE_AFTER_DAYS", 90))
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTHENTICATION_BACKENDS = [
     "axes.backends.AxesStandaloneBackend",
-    "django.contrib.auth.backends.ModelBackend",
+    # ModelBackend with a per-worker user and group cache.
+    "stock_manager.auth_backends.CachedModelBackend",
 ]
 AUTH_PASSWORD_VALIDATORS = [
     {
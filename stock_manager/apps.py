@@ -1,7 +1,24 @@
 from django.apps import AppConfig
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
 
 
 class StockManagerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'stock_manager'
-    verbose_name = "SSM"
\ No newline at end of file
+    verbose_name = "SSM"
+
+    def ready(self):
+        from django.contrib.auth.models import Group, User
+
+        from .auth_backends import invalidate_user_cache
+        from .changelog import install_triggers_after_migrate
+        from .edit_lock import sync_edit_lock
+        from .models import Admin
+
+        post_migrate.connect(install_triggers_after_migrate, sender=self)
+        # Cached users carry their group names, so membership changes count too.
+        for model in (User, Group):
+            post_save.connect(invalidate_user_cache, sender=model)
+            post_delete.connect(invalidate_user_cache, sender=model)
+        m2m_changed.connect(invalidate_user_cache, sender=User.groups.through)
+        post_save.connect(sync_edit_lock, sender=Admin)
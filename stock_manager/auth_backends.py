@@ -0,0 +1,92 @@
+"""
+Authentication backend that keeps recently seen users, with their group names,
+in a per-worker cache. Loading request.user then costs no database query.
+
+Workers share a generation token in the "sessions" cache. Any change to a user
+or to group membership replaces the token (see invalidate_user_cache), and every
+worker drops its cached users when it sees a new token. The token is replaced
+again once the change commits, since a worker may have cached the old rows under
+the first new token before then. Cached users are also reloaded after
+USER_CACHE_TTL seconds regardless.
+"""
+import threading
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .roles import user_roles
+
+AUTH_CACHE_ALIAS = "sessions"
+GENERATION_KEY = "auth:generation"
+USER_CACHE_TTL = 5 * 60
+
+UserModel = get_user_model()
+
+_users = {}
+_lock = threading.Lock()
+
+
+def _shared_cache():
+    return caches[AUTH_CACHE_ALIAS if AUTH_CACHE_ALIAS in settings.CACHES else "default"]
+
+
+def _generation():
+    cache = _shared_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Missing (first use, or evicted): start a new generation, which no worker
+        # has cached users for.
+        generation = uuid4().hex
+        if not cache.add(GENERATION_KEY, generation, timeout=None):
+            generation = cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def invalidate_user_cache(sender=None, update_fields=None, **kwargs):
+    """
+    Signal receiver for User and Group changes: make every worker reload users,
+    now and again once the change commits. Saves that only touch last_login
+    (every login) are ignored.
+    """
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    _new_generation()
+    transaction.on_commit(_new_generation, using=kwargs.get("using"))
+
+
+def _new_generation():
+    _shared_cache().set(GENERATION_KEY, uuid4().hex, timeout=None)
+    with _lock:
+        _users.clear()
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        generation = _generation()
+        now = time.monotonic()
+        entry = _users.get(user_id)
+        if entry is not None and entry[0] == generation and now - entry[1] < USER_CACHE_TTL:
+            _, _, values, roles = entry
+            # A fresh instance per request, so nothing a view does to request.user
+            # leaks into later requests.
+            user = UserModel.from_db(
+                DEFAULT_DB_ALIAS,
+                [field.attname for field in UserModel._meta.concrete_fields],
+                values,
+            )
+            user._roles = roles
+            return user
+        user = super().get_user(user_id)
+        if user is None:
+            with _lock:
+                _users.pop(user_id, None)
+            return None
+        values = tuple(getattr(user, field.attname) for field in UserModel._meta.concrete_fields)
+        with _lock:
+            _users[user_id] = (generation, now, values, user_roles(user))
+        return user
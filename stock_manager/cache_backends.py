@@ -0,0 +1,289 @@
+"""
+Django cache backend keeping entries in a SQLite file, so every gunicorn worker
+on the host shares one cache without running a cache server.
+
+Entries are bounded by count (OPTIONS["MAX_ENTRIES"]) and total pickled size
+(OPTIONS["MAX_SIZE"], bytes). When a write goes over either bound, the least
+recently used entries are evicted. Expired entries go first, then a further
+1/CULL_FREQUENCY of the entries. Triggers keep the entry count and total size
+in the one-row cache_total table, so checking the bounds on a write is a single
+row read rather than a scan. Recency is tracked coarsely: a hit only rewrites an
+entry's access time once it is ACCESS_RESOLUTION seconds old, so most reads stay
+reads.
+
+Hit and miss counts are kept per process and added to the shared counters in the
+file every STATS_FLUSH_INTERVAL seconds; stats() reports the combined totals.
+"""
+import os
+import pickle
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+ACCESS_RESOLUTION = 30
+STATS_FLUSH_INTERVAL = 5
+POOL_SIZE = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entry (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_entry_accessed ON cache_entry (accessed);
+CREATE TABLE IF NOT EXISTS cache_stat (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS cache_total (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_total SELECT 1, count(*), total(size) FROM cache_entry;
+CREATE TRIGGER IF NOT EXISTS cache_entry_insert AFTER INSERT ON cache_entry BEGIN
+    UPDATE cache_total SET entries = entries + 1, size = size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_update AFTER UPDATE OF size ON cache_entry BEGIN
+    UPDATE cache_total SET size = size + NEW.size - OLD.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_delete AFTER DELETE ON cache_entry BEGIN
+    UPDATE cache_total SET entries = entries - 1, size = size - OLD.size;
+END;
+"""
+
+
+class SQLiteCache(BaseCache):
+    # Shared by every instance (Django creates one per thread) in a process, keyed
+    # on (path, pid) so a forked worker never reuses its parent's connections.
+    _pools = {}
+    _counters = {}
+    _lock = threading.Lock()
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._max_size = int(params.get("OPTIONS", {}).get("MAX_SIZE", 0)) or None
+
+    # Connections
+
+    def _key(self):
+        return (self._path, os.getpid())
+
+    def _connect(self):
+        connection = sqlite3.connect(
+            self._path, timeout=5, isolation_level=None, check_same_thread=False
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        # In one transaction, so cache_total is seeded from the entries it counts.
+        connection.executescript(f"BEGIN IMMEDIATE; {SCHEMA} COMMIT;")
+        return connection
+
+    @contextmanager
+    def _connection(self):
+        with self._lock:
+            pool = self._pools.setdefault(self._key(), queue.LifoQueue(maxsize=POOL_SIZE))
+        try:
+            connection = pool.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            yield connection
+        except BaseException:
+            connection.close()
+            raise
+        try:
+            pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    # Statistics
+
+    def _count(self, connection, name):
+        with self._lock:
+            counters = self._counters.setdefault(
+                self._key(), {"hits": 0, "misses": 0, "flushed": time.monotonic()}
+            )
+            counters[name] += 1
+            if time.monotonic() - counters["flushed"] < STATS_FLUSH_INTERVAL:
+                return
+            pending = {"hits": counters["hits"], "misses": counters["misses"]}
+            counters.update(hits=0, misses=0, flushed=time.monotonic())
+        self._flush_counts(connection, pending)
+
+    def _flush_counts(self, connection, pending):
+        connection.executemany(
+            "INSERT INTO cache_stat (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+            [(name, value) for name, value in pending.items() if value],
+        )
+
+    def stats(self):
+        """
+        Return hit/miss counts (all processes) and the current size of the cache.
+        """
+        with self._lock:
+            counters = self._counters.get(self._key())
+            pending = {}
+            if counters:
+                pending = {"hits": counters["hits"], "misses": counters["misses"]}
+                counters.update(hits=0, misses=0, flushed=time.monotonic())
+        with self._connection() as connection:
+            self._flush_counts(connection, pending)
+            totals = dict(connection.execute("SELECT name, value FROM cache_stat"))
+            entries, size = self._totals(connection)
+        hits, misses = totals.get("hits", 0), totals.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            "entries": entries,
+            "size_bytes": int(size),
+            "max_entries": self._max_entries,
+            "max_size_bytes": self._max_size,
+        }
+
+    # Eviction
+
+    def _totals(self, connection):
+        return connection.execute("SELECT entries, size FROM cache_total").fetchone()
+
+    def _over_bounds(self, entries, size):
+        return entries > self._max_entries or (
+            self._max_size is not None and size > self._max_size
+        )
+
+    def _cull(self, connection, now):
+        """
+        Evict expired entries and, while over a bound, the least recently used
+        fraction. Returns the number of entries removed.
+        """
+        if not self._over_bounds(*self._totals(connection)):
+            return 0
+        removed = connection.execute(
+            "DELETE FROM cache_entry WHERE expires IS NOT NULL AND expires <= ?", (now,)
+        ).rowcount
+        entries, size = self._totals(connection)
+        while entries and self._over_bounds(entries, size):
+            batch = max(entries // self._cull_frequency, 1) if self._cull_frequency else entries
+            removed += connection.execute(
+                "DELETE FROM cache_entry WHERE key IN "
+                "(SELECT key FROM cache_entry ORDER BY accessed LIMIT ?)",
+                (batch,),
+            ).rowcount
+            entries, size = self._totals(connection)
+        return removed
+
+    def prune(self):
+        """
+        Remove expired entries and bring the cache within its bounds. Returns the
+        number of entries removed.
+        """
+        now = time.time()
+        with self._connection() as connection:
+            removed = connection.execute(
+                "DELETE FROM cache_entry WHERE expires IS NOT NULL AND expires <= ?", (now,)
+            ).rowcount
+            return removed + self._cull(connection, now)
+
+    # Cache API
+
+    def _write(self, key, value, timeout, replace):
+        now = time.time()
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        expires = self.get_backend_timeout(timeout)
+        with self._connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                if not replace:
+                    connection.execute(
+                        "DELETE FROM cache_entry WHERE key = ? AND expires <= ?", (key, now)
+                    )
+                # An upsert rather than INSERT OR REPLACE, whose implicit delete
+                # would not fire the cache_total trigger.
+                written = connection.execute(
+                    "INSERT INTO cache_entry (key, value, expires, accessed, size) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO "
+                    + (
+                        "UPDATE SET value = excluded.value, expires = excluded.expires, "
+                        "accessed = excluded.accessed, size = excluded.size"
+                        if replace
+                        else "NOTHING"
+                    ),
+                    (key, blob, expires, now, len(blob)),
+                ).rowcount
+                if written:
+                    self._cull(connection, now)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return bool(written)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._write(key, value, timeout, replace=False)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write(key, value, timeout, replace=True)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT value, expires, accessed FROM cache_entry WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self._count(connection, "misses")
+                return default
+            if now - row[2] > ACCESS_RESOLUTION:
+                connection.execute(
+                    "UPDATE cache_entry SET accessed = ? WHERE key = ?", (now, key)
+                )
+            self._count(connection, "hits")
+        return pickle.loads(row[0])
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self._connection() as connection:
+            return bool(
+                connection.execute(
+                    "UPDATE cache_entry SET expires = ? "
+                    "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                    (self.get_backend_timeout(timeout), key, now),
+                ).rowcount
+            )
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._connection() as connection:
+            return bool(
+                connection.execute("DELETE FROM cache_entry WHERE key = ?", (key,)).rowcount
+            )
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._connection() as connection:
+            return (
+                connection.execute(
+                    "SELECT 1 FROM cache_entry WHERE key = ? "
+                    "AND (expires IS NULL OR expires > ?)",
+                    (key, time.time()),
+                ).fetchone()
+                is not None
+            )
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM cache_entry")
+
+    def close(self, **kwargs):
+        # Connections stay pooled for the next request.
+        pass
@@ -0,0 +1,176 @@
+"""
+Set-based catalogue operations: one UPDATE over every Item matching a filter.
+
+Prices are rounded half-up to whole pence using integer arithmetic on the price
+in pence, so the result matches Decimal ROUND_HALF_UP rather than the binary
+floating point rounding SQLite's ROUND() would apply to REAL values.
+"""
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import CharField, F, FloatField, IntegerField, Q, Value
+from django.db.models.functions import Cast, Concat, Greatest, Length, Now, Round
+from django.db.models.lookups import LessThanOrEqual
+
+from .inventory import evaluate_alerts
+from .models import DataVersion, Item
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_ROWS = 20
+
+OPERATIONS = (
+    "price_percent",
+    "price_absolute",
+    "description_suffix",
+    "activate",
+    "deactivate",
+)
+
+
+def _decimal(value, name):
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"{name} must be a number.")
+    if not number.is_finite() or number.as_tuple().exponent < -2:
+        raise ValueError(f"{name} must be a number with at most 2 decimal places.")
+    return number
+
+
+def _int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer.")
+
+
+def filter_items(params):
+    """
+    Build the Item queryset for an operation from search, sku_prefix, is_active
+    ("true" (default), "false" or "all"), min_quantity and max_quantity.
+    """
+    queryset = Item.objects.all()
+    is_active = str(params.get("is_active", "true")).lower()
+    if is_active in ("true", "false"):
+        queryset = queryset.filter(is_active=is_active == "true")
+    elif is_active != "all":
+        raise ValueError("is_active must be true, false or all.")
+    if params.get("search"):
+        queryset = queryset.filter(
+            Q(description__icontains=params["search"]) | Q(sku__icontains=params["search"])
+        )
+    if params.get("sku_prefix"):
+        queryset = queryset.filter(sku__startswith=params["sku_prefix"])
+    if params.get("min_quantity") not in (None, ""):
+        queryset = queryset.filter(
+            quantity__gte=_int(params["min_quantity"], "min_quantity")
+        )
+    if params.get("max_quantity") not in (None, ""):
+        queryset = queryset.filter(
+            quantity__lte=_int(params["max_quantity"], "max_quantity")
+        )
+    return queryset
+
+
+def _pence(expression):
+    return Cast(Round(expression * 100), IntegerField())
+
+
+def _from_pence(expression):
+    return Cast(expression, FloatField()) / Value(100.0)
+
+
+def operation_changes(operation, value=None):
+    """
+    Return (conditions, {field: expression}) for an operation. The conditions limit
+    the UPDATE to rows the operation actually changes.
+    """
+    if operation == "price_percent":
+        percent = _decimal(value, "value")
+        if percent < -100:
+            raise ValueError("A price cannot be reduced by more than 100%.")
+        # Basis points keep the multiplication in integers.
+        factor = 10000 + int(percent * 100)
+        price = _from_pence(
+            (_pence(F("retail_price")) * Value(factor) + Value(5000)) / Value(10000)
+        )
+        conditions = [~Q(retail_price=0)] if percent else [Q(pk__in=[])]
+        return conditions, {"retail_price": price}
+    if operation == "price_absolute":
+        delta = int(_decimal(value, "value") * 100)
+        price = _from_pence(Greatest(_pence(F("retail_price")) + Value(delta), Value(0)))
+        return [Q()] if delta else [Q(pk__in=[])], {"retail_price": price}
+    if operation == "description_suffix":
+        suffix = str(value or "")
+        if not suffix:
+            raise ValueError("value must be a non-empty suffix.")
+        # Skip descriptions that already end with the suffix or would overflow.
+        room = Item._meta.get_field("description").max_length - len(suffix)
+        return [
+            ~Q(description__endswith=suffix),
+            LessThanOrEqual(Length("description"), room),
+        ], {
+            "description": Concat(
+                F("description"), Value(suffix), output_field=CharField()
+            )
+        }
+    if operation in ("activate", "deactivate"):
+        active = operation == "activate"
+        return [~Q(is_active=active)], {"is_active": Value(active)}
+    raise ValueError(f"operation must be one of: {', '.join(OPERATIONS)}.")
+
+
+def _preview_value(field, value):
+    if field == "retail_price" and value is not None:
+        return Decimal(str(value)).quantize(Decimal("0.01"))
+    return value
+
+
+def apply_operation(queryset, operation, value=None, dry_run=False):
+    """
+    Run an operation over a filtered Item queryset as a single UPDATE. With dry_run
+    nothing is written; the counts and a preview of the first rows are returned.
+    """
+    conditions, updates = operation_changes(operation, value)
+    targets = queryset.filter(*conditions)
+    result = {
+        "operation": operation,
+        "matched": queryset.count(),
+        "affected": targets.count(),
+        "dry_run": dry_run,
+    }
+    if dry_run:
+        fields = list(updates)
+        result["preview"] = [
+            {
+                "sku": row["sku"],
+                **{
+                    field: {
+                        "old": row[field],
+                        "new": _preview_value(field, row[f"new_{field}"]),
+                    }
+                    for field in fields
+                },
+            }
+            for row in targets.annotate(
+                **{f"new_{field}": expression for field, expression in updates.items()}
+            )
+            .order_by("sku")
+            .values("sku", *fields, *[f"new_{field}" for field in fields])[:PREVIEW_ROWS]
+        ]
+        return result
+
+    with transaction.atomic():
+        skus = None
+        if "is_active" in updates:
+            skus = list(targets.values_list("sku", flat=True))
+        # The import fingerprint no longer matches the row; see fingerprints.py.
+        result["affected"] = targets.update(**updates, row_hash=None, last_updated=Now())
+        if result["affected"]:
+            DataVersion.bump(DataVersion.ITEM)
+            if skus:
+                evaluate_alerts({(sku, None) for sku in skus})
+    logger.info(f"Item operation applied: {result}")
+    return result
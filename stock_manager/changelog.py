@@ -0,0 +1,218 @@
+"""
+Change sequence for incremental (delta) sync of Items and ShopItems.
+
+SQLite triggers keep one ChangeLog row per Item and ShopItem. Any insert, any
+update of a synced field and any delete replaces the object's row, and the new
+row takes the next id from the AUTOINCREMENT sequence. A client that remembers
+the last id it has seen (its cursor) can ask for the rows with a higher id and
+gets each object changed since then exactly once, with its current state. This
+covers every write path, including queryset update(), bulk_update and F()
+expressions, and only looks at the change sequence's primary key index instead
+of scanning last_updated.
+
+Updates that leave the synced fields unchanged (reserved_quantity, row_hash,
+last_updated) are not logged.
+"""
+import logging
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models import Q
+
+from .models import ChangeLog, Item, ShopItem
+from .routers import READ_ALIAS, read_replica
+
+logger = logging.getLogger(__name__)
+
+CHANGES_BATCH_SIZE = 2000
+
+# Columns whose changes are sent to sync clients.
+ITEM_COLUMNS = ("description", "retail_price", "quantity", "is_active")
+SHOP_ITEM_COLUMNS = ("item_id", "quantity")
+
+
+def _log_statements(source, key, shop_user_id, deleted):
+    """
+    SQL replacing an object's ChangeLog row with a fresh one. A DELETE then INSERT
+    rather than INSERT OR REPLACE: an outer INSERT OR IGNORE (bulk_create with
+    ignore_conflicts) would override the trigger's conflict clause.
+    """
+    table = ChangeLog._meta.db_table
+    return (
+        f'DELETE FROM "{table}" WHERE "source" = {source} AND "object_key" = {key}; '
+        f'INSERT INTO "{table}" ("source", "object_key", "shop_user_id", "deleted") '
+        f"VALUES ({source}, {key}, {shop_user_id}, {int(deleted)});"
+    )
+
+
+def _changed(columns):
+    return " OR ".join(f'OLD."{column}" IS NOT NEW."{column}"' for column in columns)
+
+
+def _triggers():
+    item = Item._meta.db_table
+    shop_item = ShopItem._meta.db_table
+    item_source = ChangeLog.Source.ITEM.value
+    shop_source = ChangeLog.Source.SHOP_ITEM.value
+    item_columns = ", ".join(f'"{column}"' for column in ITEM_COLUMNS)
+    shop_columns = ", ".join(f'"{column}"' for column in SHOP_ITEM_COLUMNS)
+    return {
+        "changelog_item_insert": (
+            f'AFTER INSERT ON "{item}" BEGIN '
+            f"{_log_statements(item_source, 'NEW.sku', 'NULL', False)} END"
+        ),
+        "changelog_item_update": (
+            f'AFTER UPDATE OF {item_columns} ON "{item}" '
+            f"WHEN {_changed(ITEM_COLUMNS)} BEGIN "
+            f"{_log_statements(item_source, 'NEW.sku', 'NULL', False)} END"
+        ),
+        "changelog_item_delete": (
+            f'AFTER DELETE ON "{item}" BEGIN '
+            f"{_log_statements(item_source, 'OLD.sku', 'NULL', True)} END"
+        ),
+        "changelog_shopitem_insert": (
+            f'AFTER INSERT ON "{shop_item}" BEGIN '
+            f"{_log_statements(shop_source, 'CAST(NEW.id AS TEXT)', 'NEW.shop_user_id', False)} END"
+        ),
+        "changelog_shopitem_update": (
+            f'AFTER UPDATE OF {shop_columns} ON "{shop_item}" '
+            f"WHEN {_changed(SHOP_ITEM_COLUMNS)} BEGIN "
+            f"{_log_statements(shop_source, 'CAST(NEW.id AS TEXT)', 'NEW.shop_user_id', False)} END"
+        ),
+        "changelog_shopitem_delete": (
+            f'AFTER DELETE ON "{shop_item}" BEGIN '
+            f"{_log_statements(shop_source, 'CAST(OLD.id AS TEXT)', 'OLD.shop_user_id', True)} END"
+        ),
+    }
+
+
+def install_triggers(using="default"):
+    """
+    (Re)create the ChangeLog triggers and log any Item or ShopItem that has no
+    ChangeLog row yet, so a sync from cursor 0 returns everything. Idempotent.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        logger.warning("Change log triggers need SQLite; delta sync is unavailable.")
+        return
+    table = ChangeLog._meta.db_table
+    with connection.cursor() as cursor:
+        for name, body in _triggers().items():
+            cursor.execute(f'DROP TRIGGER IF EXISTS "{name}"')
+            cursor.execute(f'CREATE TRIGGER "{name}" {body}')
+        cursor.execute(
+            f'INSERT INTO "{table}" ("source", "object_key", "shop_user_id", "deleted") '
+            f'SELECT {ChangeLog.Source.ITEM.value}, "sku", NULL, 0 FROM "{Item._meta.db_table}" '
+            f'WHERE "sku" NOT IN (SELECT "object_key" FROM "{table}" '
+            f'WHERE "source" = {ChangeLog.Source.ITEM.value}) ORDER BY "sku"'
+        )
+        cursor.execute(
+            f'INSERT INTO "{table}" ("source", "object_key", "shop_user_id", "deleted") '
+            f'SELECT {ChangeLog.Source.SHOP_ITEM.value}, CAST("id" AS TEXT), "shop_user_id", 0 '
+            f'FROM "{ShopItem._meta.db_table}" WHERE CAST("id" AS TEXT) NOT IN '
+            f'(SELECT "object_key" FROM "{table}" '
+            f'WHERE "source" = {ChangeLog.Source.SHOP_ITEM.value}) ORDER BY "id"'
+        )
+
+
+def install_triggers_after_migrate(sender, using="default", **kwargs):
+    """
+    post_migrate handler; the triggers are dropped whenever a migration rebuilds
+    the Item or ShopItem table, so they are recreated after every migrate.
+    """
+    if using != READ_ALIAS:
+        install_triggers(using)
+
+
+def _item_line(seq, sku, item):
+    if item is None:
+        return {"seq": seq, "type": "item", "op": "delete", "sku": sku}
+    if not item.is_active:
+        return {"seq": seq, "type": "item", "op": "deactivate", "sku": sku}
+    return {
+        "seq": seq,
+        "type": "item",
+        "op": "upsert",
+        "sku": sku,
+        "description": item.description,
+        "retail_price": str(item.retail_price),
+        "quantity": item.quantity,
+    }
+
+
+def _shop_item_line(seq, shop_item_id, shop_user, shop_item):
+    line = {"seq": seq, "type": "shop_item", "id": shop_item_id, "shop_user": shop_user}
+    # A ShopItem whose Item was deleted is gone as far as clients are concerned.
+    if shop_item is None or shop_item.item_id is None:
+        return {**line, "op": "delete"}
+    return {
+        **line,
+        "op": "upsert",
+        "sku": shop_item.item_id,
+        "quantity": shop_item.quantity,
+    }
+
+
+def _batch(cursor, shop_user_id, is_manager, limit):
+    """
+    Read the next ChangeLog rows after the cursor and the current state of the
+    objects they name. Returns a list of NDJSON-ready dicts, in sequence order.
+    """
+    entries = ChangeLog.objects.filter(id__gt=cursor).order_by("id")
+    if not is_manager:
+        # Every user syncs the whole catalogue but only their own shop stock.
+        entries = entries.filter(
+            Q(source=ChangeLog.Source.ITEM) | Q(shop_user_id=shop_user_id)
+        )
+    entries = list(entries.values_list("id", "source", "object_key", "shop_user_id")[:limit])
+    item_skus = [key for _, source, key, _ in entries if source == ChangeLog.Source.ITEM]
+    shop_item_ids = [
+        int(key) for _, source, key, _ in entries if source == ChangeLog.Source.SHOP_ITEM
+    ]
+    items = Item.objects.only("sku", *ITEM_COLUMNS).in_bulk(item_skus)
+    shop_items = ShopItem.objects.only("id", "item", "quantity").in_bulk(shop_item_ids)
+    usernames = dict(
+        User.objects.filter(
+            id__in={user_id for _, _, _, user_id in entries if user_id is not None}
+        ).values_list("id", "username")
+    )
+    lines = []
+    for seq, source, key, user_id in entries:
+        if source == ChangeLog.Source.ITEM:
+            lines.append(_item_line(seq, key, items.get(key)))
+        else:
+            lines.append(
+                _shop_item_line(
+                    seq, int(key), usernames.get(user_id), shop_items.get(int(key))
+                )
+            )
+    return lines
+
+
+def changes_after(cursor, user, is_manager, limit=None):
+    """
+    Yield the Items and ShopItems changed after `cursor`, oldest change first, as
+    dicts, followed by {"type": "cursor", "cursor": ..., "has_more": ...}. Shop
+    users get every Item but only their own ShopItems. At most `limit` changes are
+    returned (all of them if None); has_more says whether more remain.
+
+    Each batch is read from the read-only connection. Objects that change while the
+    sync runs may be sent with their newer state, and are sent again by the next
+    sync, since their change moved past the cursor.
+    """
+    remaining = limit
+    has_more = False
+    while True:
+        size = CHANGES_BATCH_SIZE if remaining is None else min(remaining, CHANGES_BATCH_SIZE)
+        with read_replica():
+            lines = _batch(cursor, user.id, is_manager, size + 1)
+        has_more = len(lines) > size
+        lines = lines[:size]
+        yield from lines
+        if lines:
+            cursor = lines[-1]["seq"]
+        if remaining is not None:
+            remaining -= len(lines)
+        if not has_more or remaining == 0:
+            break
+    yield {"type": "cursor", "cursor": cursor, "has_more": has_more}
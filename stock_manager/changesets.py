@@ -0,0 +1,371 @@
+"""
+Dry-run spreadsheet imports.
+
+diff_sheets() works out what import_sheets() would do to the database: item
+creates, updates, reactivations and deactivations, and ShopItem creates, updates
+and deletions. It does this from a few bulk reads and never writes. The result
+is stored as an ImportChangeset that keeps the parsed sheets, so confirming it
+runs the real import on exactly the previewed rows without re-parsing the
+workbook. A confirm is refused when the deletions setting changed after the
+preview, or when any row the import touches changed: the diff would no longer
+describe what gets applied. Writes to other rows (POS sales for products not in
+the file, say) do not get in the way.
+"""
+import json
+import logging
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .inventory import LEDGER_BATCH_SIZE
+from .models import (
+    Admin,
+    ArchivedItem,
+    DataVersion,
+    ImportChange,
+    ImportChangeset,
+    Item,
+    ShopItem,
+)
+from .utils import FIRST_DATA_ROW, ITEM_SHEET, SHOP_SHEET
+
+logger = logging.getLogger(__name__)
+
+# Conflicting rows named in a StaleChangeset message.
+MAX_CONFLICTS_SHOWN = 10
+
+# Pending changesets older than this can no longer be confirmed and are purged by
+# the maintain_database command.
+CHANGESET_MAX_AGE = timedelta(hours=24)
+
+ITEM_FIELDS = (
+    ("Description", "description"),
+    ("Retail Price", "retail_price"),
+    ("Quantity", "quantity"),
+)
+STATE_FIELDS = ("sku", "description", "retail_price", "quantity")
+
+
+class StaleChangeset(Exception):
+    """
+    The changeset can no longer be applied as previewed.
+    """
+
+
+def _item_state(skus):
+    """
+    Return {sku: {description, retail_price, quantity, is_active}} for the SKUs
+    found in Item or, failing that, ArchivedItem (which the import restores as
+    inactive items).
+    """
+    skus = list(skus)
+    state = {}
+    for start in range(0, len(skus), LEDGER_BATCH_SIZE):
+        batch = skus[start : start + LEDGER_BATCH_SIZE]
+        for row in Item.objects.filter(sku__in=batch).values(*STATE_FIELDS, "is_active"):
+            state[row.pop("sku")] = row
+        missing = [sku for sku in batch if sku not in state]
+        for row in ArchivedItem.objects.filter(sku__in=missing).values(*STATE_FIELDS):
+            state[row.pop("sku")] = {**row, "is_active": False}
+    return state
+
+
+def _changed(current, after):
+    """
+    Return (before, after) dicts holding only the fields whose value changes.
+    """
+    fields = [field for field, value in after.items() if current[field] != value]
+    return (
+        {field: current[field] for field in fields},
+        {field: after[field] for field in fields},
+    )
+
+
+def diff_sheets(tools, sheets, allow_deletions):
+    """
+    Return (changes, row_errors) for applying the parsed sheets, mirroring the
+    order and rules of SpreadsheetTools.import_sheets. changes is a list of
+    unsaved ImportChange objects.
+    """
+    changes, row_errors = [], []
+    state = {}
+
+    def change(kind, sku, before, after, shop_user=""):
+        changes.append(
+            ImportChange(kind=kind, sku=sku, shop_user=shop_user, before=before, after=after)
+        )
+
+    def load(skus):
+        state.update(_item_state({sku for sku in skus if sku and sku not in state}))
+
+    sheet_skus = set()
+    if ITEM_SHEET in sheets:
+        headers, rows = sheets[ITEM_SHEET]
+        clean, errors = tools.validate_sheet(ITEM_SHEET, headers, rows)
+        row_errors.extend(errors)
+        fields = [field for header, field in ITEM_FIELDS if header in headers]
+        load(clean["sku"])
+        for position, sku in enumerate(clean["sku"]):
+            if not clean["present"][position]:
+                continue
+            sheet_skus.add(sku)
+            if not clean["valid"][position]:
+                continue
+            after = {field: clean[field][position] for field in fields}
+            current = state.get(sku)
+            if current is None:
+                change(ImportChange.Kind.CREATE, sku, None, after)
+                state[sku] = {**after, "is_active": True}
+                continue
+            before, changed = _changed(current, after)
+            if not current["is_active"]:
+                change(
+                    ImportChange.Kind.REACTIVATE,
+                    sku,
+                    {**before, "is_active": False},
+                    {**changed, "is_active": True},
+                )
+            elif changed:
+                change(ImportChange.Kind.UPDATE, sku, before, changed)
+            current.update(after, is_active=True)
+
+    if allow_deletions:
+        for sku in (
+            Item.objects.filter(is_active=True).values_list("sku", flat=True).iterator()
+        ):
+            if sku not in sheet_skus:
+                change(
+                    ImportChange.Kind.DEACTIVATE, sku, {"is_active": True}, {"is_active": False}
+                )
+                if sku in state:
+                    state[sku]["is_active"] = False
+
+    if SHOP_SHEET in sheets:
+        headers, rows = sheets[SHOP_SHEET]
+        clean, errors = tools.validate_sheet(SHOP_SHEET, headers, rows)
+        row_errors.extend(errors)
+        bad_prices = {error["row"] for error in errors if error["field"] == "retail_price"}
+        rejected_rows = {
+            error["row"] for error in errors if error["field"] != "retail_price"
+        }
+        column = headers.index("Shop User") if "Shop User" in headers else None
+        usernames = [
+            row[column] if column is not None and len(row) > column else None
+            for row in rows
+        ]
+        known_users = set(
+            User.objects.filter(
+                username__in={username for username in usernames if username}
+            ).values_list("username", flat=True)
+        )
+        load(clean["sku"])
+        existing = {
+            (username, sku): quantity
+            for username, sku, quantity in ShopItem.objects.filter(
+                item__isnull=False
+            ).values_list("shop_user__username", "item_id", "quantity")
+        }
+        shop_state = dict(existing)
+        sheet_keys = set()
+        item_fields = [
+            field for header, field in ITEM_FIELDS[:2] if header in headers
+        ]
+        for position, sku in enumerate(clean["sku"]):
+            username = usernames[position]
+            row_number = position + FIRST_DATA_ROW
+            if username and sku:
+                sheet_keys.add((username, sku))
+            if not username or not sku or row_number in rejected_rows:
+                continue
+            if username not in known_users:
+                row_errors.append(
+                    {
+                        "row": row_number,
+                        "sku": sku,
+                        "field": "shop_user",
+                        "error": f"Shop user '{username}' not found.",
+                        "sheet": SHOP_SHEET,
+                    }
+                )
+                continue
+            after = {
+                field: clean[field][position]
+                for field in item_fields
+                if not (field == "retail_price" and row_number in bad_prices)
+            }
+            quantity = clean["quantity"][position] if "Quantity" in headers else 0
+            current = state.get(sku)
+            if current is None:
+                # The import creates a missing item inactive, from the shop row.
+                created = {
+                    "description": after.get("description", ""),
+                    "retail_price": after.get("retail_price", Decimal("0.00")),
+                    "quantity": quantity,
+                    "is_active": False,
+                }
+                change(ImportChange.Kind.CREATE, sku, None, created)
+                state[sku] = created
+            else:
+                before, changed = _changed(current, after)
+                if changed:
+                    change(ImportChange.Kind.UPDATE, sku, before, changed)
+                    current.update(after)
+            key = (username, sku)
+            if key not in shop_state:
+                change(ImportChange.Kind.SHOP_CREATE, sku, None, {"quantity": quantity}, username)
+            elif shop_state[key] != quantity:
+                change(
+                    ImportChange.Kind.SHOP_UPDATE,
+                    sku,
+                    {"quantity": shop_state[key]},
+                    {"quantity": quantity},
+                    username,
+                )
+            shop_state[key] = quantity
+        if allow_deletions:
+            for (username, sku), quantity in existing.items():
+                if (username, sku) not in sheet_keys:
+                    change(
+                        ImportChange.Kind.SHOP_DELETE,
+                        sku,
+                        {"quantity": quantity},
+                        None,
+                        username,
+                    )
+    row_errors.sort(key=lambda error: (error["sheet"], error["row"]))
+    return changes, row_errors
+
+
+def _summary(sheets, changes, row_errors):
+    counts = {kind.name.lower(): 0 for kind in ImportChange.Kind}
+    for item_change in changes:
+        counts[ImportChange.Kind(item_change.kind).name.lower()] += 1
+    return {
+        "rows": {name: len(rows) for name, (_, rows) in sheets.items()},
+        "changes": len(changes),
+        "counts": counts,
+        "errors": len(row_errors),
+    }
+
+
+def create_changeset(tools, sheets):
+    """
+    Diff the parsed sheets against the database and store the result, with the
+    sheets themselves, as a pending ImportChangeset.
+    """
+    allow_deletions = Admin.is_allow_upload_deletions()
+    # Read before diffing, so a write made meanwhile makes the confirm re-check.
+    versions = DataVersion.get_versions(DataVersion.ITEM, DataVersion.SHOP_ITEM)
+    changes, row_errors = diff_sheets(tools, sheets, allow_deletions)
+    with transaction.atomic():
+        changeset = ImportChangeset.objects.create(
+            created_by=tools.user,
+            data_versions=list(versions),
+            allow_deletions=allow_deletions,
+            sheets={
+                name: [headers, [list(row) for row in rows]]
+                for name, (headers, rows) in sheets.items()
+            },
+            summary=_summary(sheets, changes, row_errors),
+            row_errors=row_errors,
+        )
+        for item_change in changes:
+            item_change.changeset = changeset
+        ImportChange.objects.bulk_create(changes, batch_size=LEDGER_BATCH_SIZE)
+    logger.info(f"Import changeset {changeset.pk} previewed: {changeset.summary}")
+    return changeset
+
+
+def _change_lines(changes):
+    """
+    Count the changes as comparable (kind, sku, shop_user, before, after) lines,
+    with before/after in their stored JSON form.
+    """
+
+    def stored(value):
+        return json.dumps(value, cls=DjangoJSONEncoder, sort_keys=True)
+
+    return Counter(
+        (
+            change.kind,
+            change.sku,
+            change.shop_user,
+            stored(change.before),
+            stored(change.after),
+        )
+        for change in changes
+    )
+
+
+def conflicting_rows(tools, changeset, sheets):
+    """
+    Diff the changeset's sheets against the current data again and return the
+    sorted [(sku, shop_user)] rows whose change no longer matches the preview.
+    Empty when the stored diff still describes the import exactly.
+    """
+    changes, _ = diff_sheets(tools, sheets, changeset.allow_deletions)
+    current = _change_lines(changes)
+    previewed = _change_lines(changeset.changes.all())
+    diverged = (current - previewed) + (previewed - current)
+    return sorted({(sku, shop_user) for _, sku, shop_user, _, _ in diverged})
+
+
+def apply_changeset(tools, changeset):
+    """
+    Run the import for a pending changeset. Raises StaleChangeset if it was already
+    applied, has expired, the deletions setting changed, or a row it touches
+    changed since the preview. Returns import_sheets' (skipped_skus, row_errors).
+
+    When no Item or ShopItem was written since the preview, the diff is known to
+    hold; otherwise the sheets are diffed again and only a difference in this
+    changeset's rows refuses the confirm.
+    """
+    with transaction.atomic():
+        changeset = ImportChangeset.objects.select_for_update().get(pk=changeset.pk)
+        if changeset.status != ImportChangeset.Status.PENDING:
+            raise StaleChangeset("This changeset has already been applied.")
+        if timezone.now() - changeset.created_at > CHANGESET_MAX_AGE:
+            raise StaleChangeset("This preview has expired. Please upload the file again.")
+        if Admin.is_allow_upload_deletions() != changeset.allow_deletions:
+            raise StaleChangeset(
+                "Upload settings have changed since this preview. "
+                "Please upload the file again to preview the current changes."
+            )
+        sheets = {
+            name: (headers, [tuple(row) for row in rows])
+            for name, (headers, rows) in changeset.sheets.items()
+        }
+        versions = DataVersion.get_versions(DataVersion.ITEM, DataVersion.SHOP_ITEM)
+        if list(versions) != changeset.data_versions:
+            conflicts = conflicting_rows(tools, changeset, sheets)
+            if conflicts:
+                shown = ", ".join(
+                    f"{sku} ({shop_user})" if shop_user else sku
+                    for sku, shop_user in conflicts[:MAX_CONFLICTS_SHOWN]
+                )
+                more = len(conflicts) - MAX_CONFLICTS_SHOWN
+                raise StaleChangeset(
+                    f"{len(conflicts)} row(s) in this preview changed since it was made: "
+                    f"{shown}{f' and {more} more' if more > 0 else ''}. "
+                    "Please upload the file again to preview the current changes."
+                )
+        result = tools.import_sheets(sheets)
+        changeset.status = ImportChangeset.Status.APPLIED
+        changeset.applied_at = timezone.now()
+        changeset.save(update_fields=["status", "applied_at"])
+    logger.info(f"Import changeset {changeset.pk} applied by {tools.user.username}")
+    return result
+
+
+def purge_changesets():
+    """
+    Delete changesets past CHANGESET_MAX_AGE. Returns the number deleted.
+    """
+    cutoff = timezone.now() - CHANGESET_MAX_AGE
+    deleted, _ = ImportChangeset.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,53 @@
+"""
+SQLite backend that reuses connections through a small per-process pool.
+
+Django's own persistent connections (CONN_MAX_AGE) are stored per thread. Under the
+gevent gunicorn worker every request runs in a fresh greenlet, so a "persistent"
+connection is never picked up again and is only closed when garbage collected.
+Instead, connections are handed back to a pool when Django closes them at the end
+of a request and handed out again to the next greenlet, keeping the connection
+setup (and the PRAGMAs from the "init_command" option) off the request path.
+"""
+import logging
+import os
+import queue
+
+from django.db.backends.sqlite3 import base
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    _pools = {}
+
+    def _pool(self):
+        # Key on the pid so a forked worker never reuses its parent's connections.
+        key = (self.alias, os.getpid())
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools.setdefault(
+                key, queue.LifoQueue(maxsize=self.settings_dict.get("POOL_SIZE", 8))
+            )
+        return pool
+
+    def _pooling_enabled(self):
+        return self.settings_dict.get("POOL_SIZE", 8) > 0 and not self.is_in_memory_db()
+
+    def get_new_connection(self, conn_params):
+        if self._pooling_enabled():
+            try:
+                return self._pool().get_nowait()
+            except queue.Empty:
+                pass
+        return super().get_new_connection(conn_params)
+
+    def _close(self):
+        if self.connection is None or not self._pooling_enabled():
+            return super()._close()
+        with self.wrap_database_errors:
+            if self.connection.in_transaction:
+                self.connection.rollback()
+        try:
+            self._pool().put_nowait(self.connection)
+        except queue.Full:
+            return super()._close()
@@ -0,0 +1,134 @@
+"""
+In-memory edit lock shared by every worker on the host.
+
+Admin.edit_lock stays the source of truth. Its state is mirrored in a one-byte
+file next to the database, which each worker maps into memory (MAP_SHARED).
+Reading the lock is then a byte read with no query or file access. A toggle
+writes the byte, and every worker sees it on its next read. The byte starts out
+UNKNOWN (a new file, or after a failed toggle), and the first read fills it in
+from the database.
+
+Admin.edit_lock can also change without a toggle: an Admin.save() (the admin
+site, a shell), a queryset update, a restored database or another host writing
+the same file. Saves re-read the lock once they commit (see sync_edit_lock). For
+the rest, each worker stats the database and its WAL at most every
+EDIT_LOCK_RECHECK seconds and re-reads the lock when either file changed.
+
+An in-memory database (as used by the tests) has no file to share, so the flag
+is then kept per process.
+"""
+import mmap
+import os
+import time
+
+from django.db import connections, transaction
+
+from .models import Admin
+
+UNKNOWN, UNLOCKED, LOCKED = 0, 1, 2
+EDIT_LOCK_RECHECK = 1.0
+
+
+class _State:
+    # The current process's mapping; a forked worker maps the file itself.
+    pid = None
+    flag = None
+    database = None
+    checked_at = 0.0
+    signature = None
+
+
+def _flag():
+    if _State.pid == os.getpid():
+        return _State.flag
+    connection = connections["default"]
+    if connection.is_in_memory_db():
+        flag, database = bytearray(1), None
+    else:
+        database = str(connection.settings_dict["NAME"])
+        descriptor = os.open(f"{database}-editlock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(descriptor).st_size < 1:
+                os.ftruncate(descriptor, 1)
+            flag = mmap.mmap(descriptor, 1)
+        finally:
+            os.close(descriptor)
+    _State.pid, _State.flag, _State.database = os.getpid(), flag, database
+    _State.checked_at, _State.signature = time.monotonic(), _signature(database)
+    return flag
+
+
+def _signature(database):
+    """
+    Identify the current contents of the database file and its WAL, or None for
+    an in-memory database.
+    """
+    if database is None:
+        return None
+    signature = []
+    for path in (database, f"{database}-wal"):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _reload(flag):
+    """
+    Copy Admin.edit_lock into the flag, unless a toggle wrote the flag meanwhile.
+    """
+    seen = flag[0]
+    state = LOCKED if Admin.is_edit_locked() else UNLOCKED
+    if flag[0] == seen:
+        flag[0] = state
+    return state
+
+
+def _recheck(flag):
+    now = time.monotonic()
+    if now - _State.checked_at < EDIT_LOCK_RECHECK:
+        return
+    _State.checked_at = now
+    signature = _signature(_State.database)
+    if signature != _State.signature:
+        _State.signature = signature
+        _reload(flag)
+
+
+def is_edit_locked():
+    flag = _flag()
+    _recheck(flag)
+    state = flag[0]
+    if state == UNKNOWN:
+        state = _reload(flag)
+    return state == LOCKED
+
+
+def set_edit_locked(locked):
+    """
+    Lock or unlock editing. Call outside a transaction. Locking shows in the flag
+    before the database write commits and unlocking only after, so no worker
+    allows an edit while the database says the warehouse is locked.
+    """
+    flag = _flag()
+    try:
+        with transaction.atomic():
+            if locked:
+                flag[0] = LOCKED
+            Admin.objects.get_or_create(id=1)
+            Admin.objects.filter(id=1).update(edit_lock=locked)
+    except BaseException:
+        flag[0] = UNKNOWN
+        raise
+    flag[0] = LOCKED if locked else UNLOCKED
+
+
+def sync_edit_lock(sender, **kwargs):
+    """
+    post_save handler for Admin: refresh the flag from the database once the save
+    commits.
+    """
+    transaction.on_commit(lambda: _reload(_flag()))
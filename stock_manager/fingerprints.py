@@ -0,0 +1,30 @@
+"""
+Content fingerprints of importable rows.
+
+Item.row_hash and ShopItem.row_hash hold a 64-bit hash of the fields a
+spreadsheet upload sets, as they were last written. The import hashes every
+incoming row and only loads and writes the rows whose hash differs. Writes that
+bypass save() (queryset update(), bulk_update) must set row_hash to None, which
+makes the next upload compare that row field by field.
+"""
+import hashlib
+
+# Separates fields in the hashed text; it cannot appear in a spreadsheet cell.
+SEPARATOR = "\x1f"
+
+
+def fingerprint(description, pence, quantity, *extra):
+    """
+    Hash one row. The price is given in whole pence, so 12.5 and 12.50 agree.
+    """
+    text = SEPARATOR.join(map(str, (description, pence, quantity, *extra)))
+    digest = hashlib.blake2b(text.encode(), digest_size=8).digest()
+    # Signed, to fit SQLite's 64-bit INTEGER.
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def fingerprints(descriptions, pence, quantities, *extra):
+    """
+    Hash whole columns at once; see fingerprint().
+    """
+    return [fingerprint(*row) for row in zip(descriptions, pence, quantities, *extra)]
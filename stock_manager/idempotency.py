@@ -0,0 +1,142 @@
+"""
+Idempotency-Key support for mutating API views.
+
+A client that may retry a POST sends a unique Idempotency-Key header. The first
+request with a key reserves it, runs the view and stores a successful response.
+A retry with the same key and the same request gets that response back from one
+indexed lookup, with an Idempotent-Replayed header. The view does not run again,
+so no stock tables, emails or locks are touched. Unsuccessful responses are not
+stored: the failed attempt left nothing behind, and the client may retry with
+the same key.
+
+A reservation without a stored response counts as in progress (409) for
+IDEMPOTENCY_LEASE. After that the first attempt is taken to have died with its
+worker (killed, timed out), and a retry may take the key over.
+
+Keys are scoped to the user and expire after IDEMPOTENCY_KEY_TTL. Expired
+records are purged by the maintain_database command.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+# Longer than any request runs.
+IDEMPOTENCY_LEASE = timedelta(minutes=5)
+KEY_MAX_LENGTH = IdempotencyRecord._meta.get_field("key").max_length
+
+
+def _request_hash(request):
+    data = request.data
+    if hasattr(data, "lists"):
+        data = dict(data.lists())
+    text = json.dumps(
+        [request.method, request.path, data], sort_keys=True, cls=DjangoJSONEncoder
+    )
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _reserve(request, key, request_hash):
+    """
+    Return (record, created). An expired record, or a reservation whose lease ran
+    out, is replaced by a fresh reservation.
+    """
+    now = timezone.now()
+    IdempotencyRecord.objects.filter(
+        Q(expires_at__lte=now)
+        | Q(status_code__isnull=True, created_at__lte=now - IDEMPOTENCY_LEASE),
+        user=request.user,
+        key=key,
+    ).delete()
+    try:
+        # A savepoint, so a taken key does not break an enclosing transaction.
+        with transaction.atomic():
+            record = IdempotencyRecord.objects.create(
+                user=request.user,
+                key=key,
+                request_hash=request_hash,
+                expires_at=now + IDEMPOTENCY_KEY_TTL,
+            )
+        return record, True
+    except IntegrityError:
+        return IdempotencyRecord.objects.get(user=request.user, key=key), False
+
+
+def idempotent(view):
+    """
+    Decorate an @api_view function so requests carrying an Idempotency-Key are run
+    at most once. Requests without the header are unaffected.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view(request, *args, **kwargs)
+        if not key or len(key) > KEY_MAX_LENGTH:
+            return Response(
+                {
+                    "detail": f"{IDEMPOTENCY_HEADER} must be 1 to {KEY_MAX_LENGTH} characters."
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        request_hash = _request_hash(request)
+        record, created = _reserve(request, key, request_hash)
+        if not created:
+            if record.request_hash != request_hash:
+                return Response(
+                    {
+                        "detail": f"This {IDEMPOTENCY_HEADER} was already used for a different request."
+                    },
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.status_code is None:
+                return Response(
+                    {"detail": "A request with this Idempotency-Key is still in progress."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            logger.debug("Replaying response for idempotency key %s", key)
+            return Response(
+                record.response_body,
+                status=record.status_code,
+                headers={"Idempotent-Replayed": "true"},
+            )
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if status.is_success(response.status_code) and hasattr(response, "data"):
+            # An update rather than save(): if this ran past its lease and a retry
+            # took the key over, the record is gone and there is nothing to store.
+            IdempotencyRecord.objects.filter(pk=record.pk).update(
+                status_code=response.status_code, response_body=response.data
+            )
+        else:
+            record.delete()
+        return response
+
+    return wrapper
+
+
+def purge_idempotency_records():
+    """
+    Delete expired idempotency records. Returns the number deleted.
+    """
+    deleted, _ = IdempotencyRecord.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,459 @@
+"""
+Write-side helpers that keep derived stock data in step with Item, ShopItem and
+TransferItem. Call them inside the same transaction as the change they follow.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    ArchivedItem,
+    ArchivedTransfer,
+    DataVersion,
+    Item,
+    ReorderThreshold,
+    ShopItem,
+    StockAlert,
+    StockMovement,
+    StockSnapshot,
+    StockTotal,
+    TransferItem,
+)
+
+logger = logging.getLogger(__name__)
+
+REFRESH_BATCH_SIZE = 5000
+LEDGER_BATCH_SIZE = 5000
+
+
+def _chunks(values, size=REFRESH_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def refresh_stock_totals(skus=None):
+    """
+    Recompute the StockTotal rows for the given SKUs (every SKU if None) with one
+    grouped query per source table, and upsert them.
+    """
+    if skus is None:
+        all_skus = Item.objects.order_by("sku").values_list("sku", flat=True).iterator()
+        batch = []
+        for sku in all_skus:
+            batch.append(sku)
+            if len(batch) >= REFRESH_BATCH_SIZE:
+                _refresh_batch(batch)
+                batch = []
+        if batch:
+            _refresh_batch(batch)
+        return
+    for batch in _chunks({sku for sku in skus if sku}):
+        _refresh_batch(batch)
+
+
+def _refresh_batch(skus):
+    warehouse = dict(Item.objects.filter(sku__in=skus).values_list("sku", "quantity"))
+    shops = {
+        row["item_id"]: row
+        for row in ShopItem.objects.filter(item_id__in=skus)
+        .values("item_id")
+        .annotate(total=Sum("quantity"), holders=Count("id", filter=Q(quantity__gt=0)))
+    }
+    pending = dict(
+        TransferItem.objects.filter(item_id__in=skus)
+        .values("item_id")
+        .annotate(total=Sum("quantity"))
+        .values_list("item_id", "total")
+    )
+    totals = [
+        StockTotal(
+            item_id=sku,
+            warehouse_quantity=quantity,
+            shop_quantity=shops.get(sku, {}).get("total") or 0,
+            shop_count=shops.get(sku, {}).get("holders") or 0,
+            pending_quantity=pending.get(sku) or 0,
+        )
+        for sku, quantity in warehouse.items()
+    ]
+    StockTotal.objects.bulk_create(
+        totals,
+        update_conflicts=True,
+        unique_fields=["item"],
+        update_fields=[
+            "warehouse_quantity",
+            "shop_quantity",
+            "pending_quantity",
+            "shop_count",
+            "last_updated",
+        ],
+    )
+
+
+def reserve(item, delta):
+    """
+    Adjust an Item's reserved_quantity by delta in SQL and mirror it on the instance.
+    """
+    if delta:
+        Item.objects.filter(pk=item.pk).update(
+            reserved_quantity=F("reserved_quantity") + delta
+        )
+        item.reserved_quantity += delta
+
+
+def refresh_reserved_quantities(skus=None):
+    """
+    Recompute Item.reserved_quantity from pending TransferItems with one UPDATE,
+    for the given SKUs or every Item.
+    """
+    pending = (
+        TransferItem.objects.filter(item=OuterRef("pk"))
+        .values("item")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    if skus is None:
+        return Item.objects.update(reserved_quantity=Coalesce(Subquery(pending), 0))
+    return sum(
+        Item.objects.filter(sku__in=batch).update(
+            reserved_quantity=Coalesce(Subquery(pending), 0)
+        )
+        for batch in _chunks(skus)
+    )
+
+
+def record_movements(movements):
+    """
+    Append (sku, shop_user_id, kind, delta) tuples to the stock ledger in bulk.
+    shop_user_id is None for the warehouse; zero deltas are dropped.
+    """
+    rows = [
+        StockMovement(sku=sku, shop_user_id=shop_user_id, kind=kind, delta=delta)
+        for sku, shop_user_id, kind, delta in movements
+        if delta
+    ]
+    if rows:
+        StockMovement.objects.bulk_create(rows, batch_size=LEDGER_BATCH_SIZE)
+        evaluate_alerts({(row.sku, row.shop_user_id) for row in rows})
+    return len(rows)
+
+
+def _alert_keys(keys):
+    """
+    Map changed (sku, shop_user_id) keys onto alert locations. Transfer requests and
+    cancellations only change the warehouse's reserved quantity, so every key also
+    touches the warehouse location of its SKU.
+    """
+    warehouse = {sku for sku, _ in keys}
+    shops = {(sku, shop_user_id) for sku, shop_user_id in keys if shop_user_id is not None}
+    return warehouse, shops
+
+
+def evaluate_alerts(keys):
+    """
+    Open, refresh or resolve StockAlerts for the given (sku, shop_user_id) keys only.
+    A location is low when its quantity (available quantity for the warehouse) is at
+    or below its ReorderThreshold. Returns the number of alerts opened.
+    """
+    warehouse_skus, shop_keys = _alert_keys(keys)
+    opened = 0
+    for batch in _chunks(warehouse_skus):
+        thresholds = dict(
+            ReorderThreshold.objects.filter(
+                item_id__in=batch, shop_user__isnull=True, item__is_active=True
+            ).values_list("item_id", "min_quantity")
+        )
+        quantities = {
+            sku: quantity - reserved
+            for sku, quantity, reserved in Item.objects.filter(
+                sku__in=list(thresholds)
+            ).values_list("sku", "quantity", "reserved_quantity")
+        }
+        opened += _apply_alerts(
+            {(sku, None): (quantities[sku], level) for sku, level in thresholds.items()},
+            StockAlert.objects.filter(item_id__in=batch, shop_user__isnull=True),
+        )
+    for batch in _chunks({sku for sku, _ in shop_keys}):
+        shop_user_ids = {shop_user_id for sku, shop_user_id in shop_keys if sku in batch}
+        thresholds = {
+            (sku, shop_user_id): level
+            for sku, shop_user_id, level in ReorderThreshold.objects.filter(
+                item_id__in=batch, shop_user_id__in=shop_user_ids
+            ).values_list("item_id", "shop_user_id", "min_quantity")
+            if (sku, shop_user_id) in shop_keys
+        }
+        quantities = {
+            (sku, shop_user_id): quantity
+            for sku, shop_user_id, quantity in ShopItem.objects.filter(
+                item_id__in=batch, shop_user_id__in=shop_user_ids
+            ).values_list("item_id", "shop_user_id", "quantity")
+        }
+        opened += _apply_alerts(
+            {key: (quantities.get(key, 0), level) for key, level in thresholds.items()},
+            StockAlert.objects.filter(item_id__in=batch, shop_user_id__in=shop_user_ids),
+            keys={key for key in shop_keys if key[0] in batch},
+        )
+    return opened
+
+
+def _apply_alerts(levels, alerts, keys=None):
+    """
+    levels maps (sku, shop_user_id) -> (quantity, min_quantity) for locations with a
+    threshold; open alerts among `alerts` whose key is absent or no longer low are
+    resolved. `keys` restricts which open alerts may be touched.
+    """
+    open_alerts = {
+        (alert.item_id, alert.shop_user_id): alert
+        for alert in alerts.filter(resolved_at__isnull=True)
+        if keys is None or (alert.item_id, alert.shop_user_id) in keys
+    }
+    now = timezone.now()
+    new, changed, resolved = [], [], []
+    for key, (quantity, level) in levels.items():
+        alert = open_alerts.pop(key, None)
+        if quantity > level:
+            if alert:
+                resolved.append(alert.pk)
+        elif alert is None:
+            new.append(
+                StockAlert(
+                    item_id=key[0], shop_user_id=key[1], quantity=quantity, threshold=level
+                )
+            )
+        elif (alert.quantity, alert.threshold) != (quantity, level):
+            alert.quantity, alert.threshold = quantity, level
+            changed.append(alert)
+    # Whatever is left lost its threshold (or its Item was deactivated).
+    resolved.extend(alert.pk for alert in open_alerts.values())
+    if new:
+        StockAlert.objects.bulk_create(new, batch_size=LEDGER_BATCH_SIZE)
+    if changed:
+        StockAlert.objects.bulk_update(
+            changed, ["quantity", "threshold"], batch_size=LEDGER_BATCH_SIZE
+        )
+    if resolved:
+        StockAlert.objects.filter(pk__in=resolved).update(resolved_at=now)
+    return len(new)
+
+
+def _location(queryset, shop_user_id):
+    if shop_user_id is None:
+        return queryset.filter(shop_user_id__isnull=True)
+    return queryset.filter(shop_user_id=shop_user_id)
+
+
+def take_stock_snapshots():
+    """
+    Snapshot the current quantity of every location that has ledger movements
+    since the previous snapshot run (every location on the first run), so that
+    point-in-time lookups only replay movements since the last run.
+    Returns the number of snapshot rows written.
+    """
+    with transaction.atomic():
+        previous = StockSnapshot.objects.aggregate(last=Max("movement_id"))["last"]
+        high_water = StockMovement.objects.aggregate(last=Max("id"))["last"] or 0
+        taken_at = timezone.now()
+        if previous is None:
+            warehouse = list(Item.objects.values_list("sku", "quantity"))
+            shops = list(
+                ShopItem.objects.exclude(item=None).values_list(
+                    "item_id", "shop_user_id", "quantity"
+                )
+            )
+        else:
+            if high_water <= previous:
+                return 0
+            changed = set(
+                StockMovement.objects.filter(
+                    id__gt=previous,
+                    id__lte=high_water,
+                    kind__in=StockMovement.STOCK_KINDS,
+                )
+                .values_list("sku", "shop_user_id")
+                .distinct()
+            )
+            warehouse_skus = {sku for sku, shop_user_id in changed if shop_user_id is None}
+            shop_keys = {key for key in changed if key[1] is not None}
+            warehouse = []
+            for batch in _chunks(warehouse_skus):
+                warehouse.extend(
+                    Item.objects.filter(sku__in=batch).values_list("sku", "quantity")
+                )
+            current = {}
+            for batch in _chunks({sku for sku, _ in shop_keys}):
+                for sku, shop_user_id, quantity in ShopItem.objects.filter(
+                    item_id__in=batch
+                ).values_list("item_id", "shop_user_id", "quantity"):
+                    if (sku, shop_user_id) in shop_keys:
+                        current[(sku, shop_user_id)] = quantity
+            # A key with movements but no ShopItem row was deleted: it now holds 0.
+            shops = [(sku, shop_user_id, current.get((sku, shop_user_id), 0)) for sku, shop_user_id in shop_keys]
+        snapshots = [
+            StockSnapshot(
+                sku=sku,
+                shop_user_id=None,
+                quantity=quantity,
+                movement_id=high_water,
+                taken_at=taken_at,
+            )
+            for sku, quantity in warehouse
+        ] + [
+            StockSnapshot(
+                sku=sku,
+                shop_user_id=shop_user_id,
+                quantity=quantity,
+                movement_id=high_water,
+                taken_at=taken_at,
+            )
+            for sku, shop_user_id, quantity in shops
+        ]
+        StockSnapshot.objects.bulk_create(snapshots, batch_size=LEDGER_BATCH_SIZE)
+    return len(snapshots)
+
+
+def stock_at(at, shop_user_id=None, sku=None):
+    """
+    Return {sku: quantity} for one location (shop_user_id None = warehouse) at
+    time `at`, optionally for a single SKU: the latest snapshot at or before `at`
+    plus the ledger movements recorded after it.
+    """
+    snapshots = _location(StockSnapshot.objects.filter(taken_at__lte=at), shop_user_id)
+    if sku is not None:
+        snapshots = snapshots.filter(sku=sku)
+    base = {}
+    for snap_sku, quantity, movement_id in snapshots.order_by(
+        "sku", "-taken_at"
+    ).values_list("sku", "quantity", "movement_id"):
+        base.setdefault(snap_sku, (quantity, movement_id))
+
+    movements = _location(
+        StockMovement.objects.filter(
+            created_at__lte=at, kind__in=StockMovement.STOCK_KINDS
+        ),
+        shop_user_id,
+    )
+    if sku is not None:
+        movements = movements.filter(sku=sku)
+    if base:
+        movements = movements.filter(id__gt=min(mid for _, mid in base.values()))
+    quantities = {key: quantity for key, (quantity, _) in base.items()}
+    for move_id, move_sku, delta in movements.values_list("id", "sku", "delta"):
+        after = base.get(move_sku, (0, 0))[1]
+        if move_id > after:
+            quantities[move_sku] = quantities.get(move_sku, 0) + delta
+    return quantities
+
+
+def archive_transfers(transfers, status, quantity=None):
+    """
+    Move TransferItems into ArchivedTransfer with one bulk INSERT and one DELETE.
+    `quantity` overrides the recorded quantity (e.g. the amount actually dispatched).
+    """
+    transfers = list(transfers)
+    if not transfers:
+        return 0
+    completed_at = timezone.now()
+    ArchivedTransfer.objects.bulk_create(
+        [
+            ArchivedTransfer(
+                shop_user_id=transfer.shop_user_id,
+                sku=transfer.item_id,
+                quantity=transfer.quantity if quantity is None else quantity,
+                status=status,
+                ordered=transfer.ordered,
+                created_at=transfer.created_at,
+                completed_at=completed_at,
+                completed_month=completed_at.year * 100 + completed_at.month,
+            )
+            for transfer in transfers
+        ],
+        batch_size=LEDGER_BATCH_SIZE,
+    )
+    TransferItem.objects.filter(pk__in=[transfer.pk for transfer in transfers]).delete()
+    return len(transfers)
+
+
+ARCHIVED_ITEM_FIELDS = ("sku", "description", "retail_price", "quantity", "last_updated")
+
+
+def archivable_items(cutoff):
+    """
+    Inactive Items last updated before `cutoff` that nothing else refers to: no
+    ShopItem (whose FK would be nulled), pending TransferItem or ReorderThreshold.
+    """
+    return Item.objects.filter(is_active=False, last_updated__lt=cutoff).exclude(
+        Exists(ShopItem.objects.filter(item=OuterRef("pk")))
+        | Exists(TransferItem.objects.filter(item=OuterRef("pk")))
+        | Exists(ReorderThreshold.objects.filter(item=OuterRef("pk")))
+    )
+
+
+def archive_items(cutoff):
+    """
+    Move archivable Items into ArchivedItem in batches: one INSERT and one DELETE
+    per batch. Returns the number of items archived.
+    """
+    archived = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                archivable_items(cutoff).values(*ARCHIVED_ITEM_FIELDS)[:REFRESH_BATCH_SIZE]
+            )
+            if not rows:
+                break
+            ArchivedItem.objects.bulk_create(
+                [ArchivedItem(**row) for row in rows],
+                update_conflicts=True,
+                unique_fields=["sku"],
+                update_fields=[
+                    "description",
+                    "retail_price",
+                    "quantity",
+                    "last_updated",
+                    "archived_at",
+                ],
+            )
+            Item.objects.filter(sku__in=[row["sku"] for row in rows]).delete()
+            DataVersion.bump(DataVersion.ITEM)
+        archived += len(rows)
+    return archived
+
+
+def restore_archived_items(skus):
+    """
+    Move any of the given SKUs found in ArchivedItem back into Item as inactive
+    items, so the caller's usual reactivate-or-update logic applies to them.
+    Returns the set of SKUs restored.
+    """
+    restored = set()
+    for batch in _chunks({sku for sku in skus if sku}):
+        rows = list(
+            ArchivedItem.objects.filter(sku__in=batch).values(*ARCHIVED_ITEM_FIELDS)
+        )
+        if not rows:
+            continue
+        Item.objects.bulk_create(
+            [Item(is_active=False, **row) for row in rows], ignore_conflicts=True
+        )
+        ArchivedItem.objects.filter(sku__in=[row["sku"] for row in rows]).delete()
+        restored.update(row["sku"] for row in rows)
+    if restored:
+        refresh_stock_totals(restored)
+    return restored
+
+
+def cleanup_orphaned_shop_items():
+    """
+    Delete ShopItems whose Item is gone, either nulled by SET_NULL or pointing at a
+    SKU missing from Item, with an indexed NOT EXISTS anti-join. Returns the count.
+    """
+    deleted, _ = ShopItem.objects.filter(
+        Q(item__isnull=True) | ~Exists(Item.objects.filter(sku=OuterRef("item_id")))
+    ).delete()
+    if deleted:
+        DataVersion.bump(DataVersion.SHOP_ITEM)
+        logger.warning("Deleted %d orphaned ShopItem rows", deleted)
+    return deleted
@@ -0,0 +1,44 @@
+"""Apply buffered POS sale events to shop stock."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stock_manager.sales import APPLY_BATCH_SIZE, apply_sales
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply pending sale events to ShopItem quantities, summed per shop and SKU, "
+        "in batches of one transaction each. Schedule from cron, e.g. every minute, "
+        "or keep running with --interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=APPLY_BATCH_SIZE)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep running, checking for new events every this many seconds.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        while True:
+            started = time.perf_counter()
+            events = shop_items = 0
+            while True:
+                applied, changed = apply_sales(options["batch_size"])
+                events += applied
+                shop_items += changed
+                if applied < options["batch_size"]:
+                    break
+            if events or not options["interval"]:
+                self.stdout.write(
+                    f"Applied {events} sale events to {shop_items} shop items "
+                    f"in {time.perf_counter() - started:.1f}s."
+                )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,42 @@
+"""Move long-inactive items out of the Item table into ArchivedItem."""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from stock_manager.inventory import archivable_items, archive_items
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive inactive items not updated within the retention window that have "
+        "no shop stock, pending transfers or reorder thresholds. Archived SKUs are "
+        "restored automatically when created, edited or imported again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ITEM_ARCHIVE_AFTER_DAYS,
+            help="Retention window in days (default: ITEM_ARCHIVE_AFTER_DAYS).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many items would be archived.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        if options["dry_run"]:
+            count = archivable_items(cutoff).count()
+            self.stdout.write(f"{count} items would be archived.")
+            return
+        started = time.perf_counter()
+        archived = archive_items(cutoff)
+        self.stdout.write(
+            f"Archived {archived} items in {time.perf_counter() - started:.1f}s."
+        )
@@ -0,0 +1,411 @@
+"""Repeatable latency/throughput benchmark for the stock API."""
+import json
+import random
+import statistics
+import string
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.throttling import SimpleRateThrottle
+
+from stock_manager.models import Admin, Item, TransferItem
+
+
+def percentile(samples, pct):
+    """
+    Nearest-rank percentile of an already sorted list of samples.
+    """
+    if not samples:
+        return None
+    rank = max(0, min(len(samples) - 1, int(round(pct / 100 * len(samples))) - 1))
+    return samples[rank]
+
+
+class LiveClient:
+    """
+    Minimal stand-in for django.test.Client that sends requests to a running server
+    (e.g. a local gunicorn) using a session created directly in the database.
+    """
+
+    def __init__(self, base_url, user):
+        import requests
+
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[-1]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        csrf_token = "".join(random.choices(string.ascii_letters + string.digits, k=32))
+        self.base_url = base_url.rstrip("/")
+        self.http = requests.Session()
+        self.http.cookies.set(settings.SESSION_COOKIE_NAME, session.session_key)
+        self.http.cookies.set(settings.CSRF_COOKIE_NAME, csrf_token)
+        self.http.headers["X-CSRFToken"] = csrf_token
+
+    def get(self, path, data=None):
+        return self.http.get(self.base_url + path, params=data)
+
+    def post(self, path, data=None):
+        files = {}
+        form = {}
+        for key, value in (data or {}).items():
+            if hasattr(value, "read"):
+                files[key] = (Path(value.name).name, value)
+            else:
+                form[key] = value
+        return self.http.post(self.base_url + path, data=form, files=files or None)
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the list/search/sort, transfer, export and import endpoints and report "
+        "p50/p95/p99 latency and throughput, optionally saving or comparing a JSON baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument(
+            "--heavy-iterations",
+            type=int,
+            default=3,
+            help="Iterations for the export and import scenarios.",
+        )
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--scenarios",
+            default="",
+            help="Comma separated scenario names to run (default: all).",
+        )
+        parser.add_argument(
+            "--manager",
+            default=None,
+            help="Username of a member of 'managers' (default: first found).",
+        )
+        parser.add_argument(
+            "--shop-user",
+            default=None,
+            help="Username of a member of 'shop_users' (default: first found).",
+        )
+        parser.add_argument(
+            "--upload-file",
+            default=None,
+            help="Workbook posted by the import scenario (skipped if omitted).",
+        )
+        parser.add_argument(
+            "--base-url",
+            default=None,
+            help="Benchmark a running server (e.g. http://127.0.0.1:8000) instead of "
+            "the in-process test client.",
+        )
+        parser.add_argument(
+            "--keep-throttling",
+            action="store_true",
+            help="Leave DRF rate throttling enabled for in-process runs.",
+        )
+        parser.add_argument(
+            "--contention",
+            action="store_true",
+            help="Also measure items_list reads while --upload-file is imported "
+            "repeatedly in the background, to show whether reads stall on the writer.",
+        )
+        parser.add_argument("--output", default=None, help="Write results as JSON.")
+        parser.add_argument(
+            "--baseline",
+            default=None,
+            help="JSON results of an earlier run to compare against.",
+        )
+        parser.add_argument(
+            "--fail-over",
+            type=float,
+            default=None,
+            help="Exit with an error if any scenario's p95 regresses by more than this "
+            "percentage against --baseline.",
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options["seed"])
+        manager = self._user(options["manager"], "managers")
+        shop_user = self._user(options["shop_user"], "shop_users")
+        if not Admin.objects.exists():
+            raise CommandError("No app configuration row exists; run generate_stock_data first.")
+
+        scenarios = self._scenarios(manager, shop_user)
+        wanted = {s for s in options["scenarios"].split(",") if s}
+        unknown = wanted - {name for name, *_ in scenarios}
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        results = {}
+        with ExitStack() as stack:
+            if not options["base_url"] and not options["keep_throttling"]:
+                stack.enter_context(
+                    mock.patch.object(SimpleRateThrottle, "allow_request", return_value=True)
+                )
+            allow_uploads = Admin.is_allow_updoads()
+            Admin.objects.filter(id=1).update(allow_uploads=True)
+            try:
+                for name, user, iterations, request_fn in scenarios:
+                    if wanted and name not in wanted:
+                        continue
+                    results[name] = self._run(name, user, iterations, request_fn)
+                    self._print_result(name, results[name])
+                if options["contention"]:
+                    if not options["upload_file"]:
+                        raise CommandError("--contention requires --upload-file.")
+                    name = "items_list_during_import"
+                    results[name] = self._run_contended(manager, scenarios)
+                    self._print_result(name, results[name])
+            finally:
+                Admin.objects.filter(id=1).update(allow_uploads=allow_uploads)
+
+        report = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "target": options["base_url"] or "django.test.Client",
+                "concurrency": options["concurrency"],
+                "items": Item.objects.count(),
+                "transfer_items": TransferItem.objects.count(),
+            },
+            "scenarios": results,
+        }
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(report, indent=2))
+            self.stdout.write(f"Results written to {options['output']}")
+        if options["baseline"]:
+            self._compare(results, options["baseline"], options["fail_over"])
+
+    def _user(self, username, group):
+        queryset = User.objects.filter(groups__name=group).order_by("id")
+        if username:
+            queryset = queryset.filter(username=username)
+        user = queryset.first()
+        if user is None:
+            raise CommandError(f"No user found in the '{group}' group.")
+        return user
+
+    def _client(self, user):
+        if self.options["base_url"]:
+            return LiveClient(self.options["base_url"], user)
+        host = next(
+            (h for h in settings.ALLOWED_HOSTS if h and "*" not in h and not h.startswith(".")),
+            "localhost",
+        )
+        client = Client(SERVER_NAME=host)
+        client.force_login(user)
+        return client
+
+    def _scenarios(self, manager, shop_user):
+        """
+        Return (name, user, iterations, request_fn) tuples. request_fn takes a client
+        and returns a response.
+        """
+        iterations = self.options["iterations"]
+        heavy = self.options["heavy_iterations"]
+        words = list(
+            Item.objects.filter(is_active=True)
+            .values_list("description", flat=True)[:200]
+        ) or ["a"]
+        search_terms = [w.split()[0] for w in words if w.split()]
+        transfer_skus = list(
+            Item.objects.filter(is_active=True, quantity__gt=10)
+            .exclude(transferitem__shop_user=shop_user, transferitem__ordered=True)
+            .values_list("sku", flat=True)[:500]
+        )
+        dispatch_queue = list(
+            TransferItem.objects.filter(ordered=True, item__quantity__gte=1)
+            .values_list("shop_user__username", "item__sku", "quantity")[: iterations * 2]
+        )
+        dispatch_lock = threading.Lock()
+        rng = self.rng
+
+        def pages(path, **params):
+            def request_fn(client):
+                query = dict(params, page=rng.randint(1, 5), page_size=25)
+                return client.get(path, query)
+
+            return request_fn
+
+        def search(client):
+            return client.get(
+                "/api/items/", {"search": rng.choice(search_terms), "page_size": 25}
+            )
+
+        def transfer(client):
+            return client.post(
+                "/api/transfer/",
+                {"sku": rng.choice(transfer_skus), "transfer_quantity": "1"},
+            )
+
+        def dispatch(client):
+            with dispatch_lock:
+                if not dispatch_queue:
+                    return None
+                username, sku, quantity = dispatch_queue.pop()
+            return client.post(
+                "/api/complete-transfer/",
+                {"sku": sku, "quantity": str(quantity), "shop_user_id": username},
+            )
+
+        def export(client):
+            response = client.get("/api/export_data/")
+            # Drain streamed content so the workbook is fully produced.
+            if hasattr(response, "streaming_content"):
+                for _ in response.streaming_content:
+                    pass
+            return response
+
+        def upload(client):
+            with open(self.options["upload_file"], "rb") as fh:
+                return client.post("/api/import_data/", {"file": fh})
+
+        scenarios = [
+            ("items_list", manager, iterations, pages("/api/items/")),
+            ("items_search", manager, iterations, search),
+            ("items_sort_sku", manager, iterations, pages("/api/items/", ordering="sku")),
+            (
+                "items_sort_description",
+                manager,
+                iterations,
+                pages("/api/items/", ordering="-description"),
+            ),
+            (
+                "items_sort_quantity",
+                manager,
+                iterations,
+                pages("/api/items/", ordering="quantity"),
+            ),
+            ("shop_items_list", shop_user, iterations, pages("/api/shop_items/")),
+            ("transfer_items_list", manager, iterations, pages("/api/transfer_items/")),
+            ("edit_lock_status", shop_user, iterations, lambda c: c.get("/api/get_edit_lock_status/")),
+        ]
+        if transfer_skus:
+            scenarios.append(("transfer", shop_user, iterations, transfer))
+        if dispatch_queue:
+            scenarios.append(("dispatch", manager, min(iterations, len(dispatch_queue)), dispatch))
+        scenarios.append(("export_manager", manager, heavy, export))
+        scenarios.append(("export_shop", shop_user, heavy, export))
+        if self.options["upload_file"]:
+            scenarios.append(("import", manager, heavy, upload))
+        return scenarios
+
+    def _run(self, name, user, iterations, request_fn):
+        concurrency = max(1, min(self.options["concurrency"], iterations))
+        warm_client = self._client(user)
+        for _ in range(min(self.options["warmup"], max(1, iterations // 10))):
+            request_fn(warm_client)
+
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        per_worker = [iterations // concurrency] * concurrency
+        for i in range(iterations % concurrency):
+            per_worker[i] += 1
+
+        def worker(count):
+            client = self._client(user)
+            local_latencies = []
+            local_errors = []
+            for _ in range(count):
+                started = time.perf_counter()
+                response = request_fn(client)
+                elapsed = time.perf_counter() - started
+                if response is None:
+                    continue
+                local_latencies.append(elapsed)
+                if response.status_code >= 400:
+                    local_errors.append(response.status_code)
+            with lock:
+                latencies.extend(local_latencies)
+                errors.extend(local_errors)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in per_worker]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        latencies.sort()
+        to_ms = lambda value: round(value * 1000, 3) if value is not None else None
+        return {
+            "requests": len(latencies),
+            "errors": len(errors),
+            "error_statuses": sorted(set(errors)),
+            "p50_ms": to_ms(percentile(latencies, 50)),
+            "p95_ms": to_ms(percentile(latencies, 95)),
+            "p99_ms": to_ms(percentile(latencies, 99)),
+            "mean_ms": to_ms(statistics.fmean(latencies)) if latencies else None,
+            "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        }
+
+    def _run_contended(self, manager, scenarios):
+        """
+        Time items_list reads while a background thread keeps importing the upload
+        workbook, then report the import count alongside the read latencies.
+        """
+        scenario = {name: (iterations, fn) for name, _, iterations, fn in scenarios}
+        iterations, read_fn = scenario["items_list"]
+        _, import_fn = scenario["import"]
+        stop = threading.Event()
+        imports = []
+
+        def writer():
+            client = self._client(manager)
+            while not stop.is_set():
+                imports.append(import_fn(client).status_code)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            # Give the writer a head start so reads overlap its transaction.
+            time.sleep(0.5)
+            result = self._run("items_list_during_import", manager, iterations, read_fn)
+        finally:
+            stop.set()
+            thread.join()
+        result["background_imports"] = len(imports)
+        result["background_import_errors"] = sum(1 for code in imports if code >= 400)
+        return result
+
+    def _print_result(self, name, result):
+        self.stdout.write(
+            f"{name:<24} n={result['requests']:<5} err={result['errors']:<4} "
+            f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms "
+            f"{result['throughput_rps']} req/s"
+        )
+
+    def _compare(self, results, baseline_path, fail_over):
+        try:
+            baseline = json.loads(Path(baseline_path).read_text())["scenarios"]
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Could not read baseline {baseline_path}: {e}")
+        regressions = []
+        self.stdout.write(f"\nComparison against {baseline_path} (p95):")
+        for name, result in results.items():
+            before = baseline.get(name, {}).get("p95_ms")
+            after = result["p95_ms"]
+            if not before or after is None:
+                self.stdout.write(f"{name:<24} no baseline")
+                continue
+            change = (after - before) / before * 100
+            self.stdout.write(f"{name:<24} {before}ms -> {after}ms ({change:+.1f}%)")
+            if fail_over is not None and change > fail_over:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(
+                f"p95 regressed by more than {fail_over}% in: {', '.join(regressions)}"
+            )
@@ -0,0 +1,243 @@
+"""Generate a synthetic, production-sized dataset for local load testing."""
+import logging
+import random
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from openpyxl import Workbook
+
+from stock_manager.inventory import refresh_reserved_quantities
+from stock_manager.models import Admin, Item, ShopItem, TransferItem
+
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "oak", "pine", "steel", "linen", "cotton", "brass", "glass", "clay",
+    "round", "square", "large", "small", "blue", "green", "red", "black",
+    "lamp", "chair", "table", "vase", "mug", "plate", "rug", "frame",
+    "candle", "basket", "mirror", "clock", "shelf", "bowl", "stool", "hook",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic Items, shop users, ShopItems and pending TransferItems, "
+        "plus a matching .xlsx upload file, for benchmarking at production scale."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=100_000)
+        parser.add_argument("--shops", type=int, default=500)
+        parser.add_argument(
+            "--shop-items-per-shop",
+            type=int,
+            default=4_000,
+            help="Distinct SKUs stocked by each shop (shops x this = ShopItem rows).",
+        )
+        parser.add_argument(
+            "--transfers-per-shop",
+            type=int,
+            default=20,
+            help="Pending TransferItems per shop (roughly half are marked ordered).",
+        )
+        parser.add_argument("--sku-prefix", default="SYN")
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--xlsx-dir",
+            default=None,
+            help="Directory to write synthetic upload workbooks into (skipped if omitted).",
+        )
+        parser.add_argument(
+            "--xlsx-shop-rows",
+            type=int,
+            default=200_000,
+            help="Maximum rows written to the 'Shop Stock' sheet of the upload workbook.",
+        )
+        parser.add_argument(
+            "--flush",
+            action="store_true",
+            help="Delete previously generated synthetic rows (matching --sku-prefix) first.",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        prefix = options["sku_prefix"]
+        n_items = options["items"]
+        n_shops = options["shops"]
+        per_shop = min(options["shop_items_per_shop"], n_items)
+        batch_size = options["batch_size"]
+        if n_items <= 0 or n_shops < 0:
+            raise CommandError("--items must be positive and --shops non-negative.")
+
+        Admin.objects.get_or_create(id=1)
+        if options["flush"]:
+            self._flush(prefix)
+
+        started = time.perf_counter()
+        skus = self._create_items(rng, prefix, n_items, batch_size)
+        shop_users = self._create_shop_users(prefix, n_shops, batch_size)
+        shop_rows = self._create_shop_items(rng, skus, shop_users, per_shop, batch_size)
+        self._create_transfers(
+            rng, skus, shop_users, options["transfers_per_shop"], batch_size
+        )
+        self.stdout.write(
+            f"Generated {len(skus)} items, {len(shop_users)} shop users and "
+            f"{shop_rows} shop items in {time.perf_counter() - started:.1f}s."
+        )
+
+        if options["xlsx_dir"]:
+            self._write_workbook(
+                Path(options["xlsx_dir"]), prefix, options["xlsx_shop_rows"]
+            )
+
+    def _flush(self, prefix):
+        with transaction.atomic():
+            ShopItem.objects.filter(item__sku__startswith=prefix).delete()
+            TransferItem.objects.filter(item__sku__startswith=prefix).delete()
+            Item.objects.filter(sku__startswith=prefix).delete()
+            User.objects.filter(username__startswith=f"{prefix.lower()}_shop_").delete()
+        self.stdout.write(f"Flushed synthetic rows with prefix '{prefix}'.")
+
+    def _create_items(self, rng, prefix, n_items, batch_size):
+        width = len(str(n_items))
+        skus = [f"{prefix}-{i:0{width}d}" for i in range(1, n_items + 1)]
+        existing = set(
+            Item.objects.filter(sku__startswith=prefix).values_list("sku", flat=True)
+        )
+        batch = []
+        with transaction.atomic():
+            for sku in skus:
+                if sku in existing:
+                    continue
+                batch.append(
+                    Item(
+                        sku=sku,
+                        description=" ".join(rng.choices(WORDS, k=3)).title(),
+                        retail_price=Decimal(rng.randint(99, 49_999)) / 100,
+                        quantity=rng.randint(0, 500),
+                        is_active=rng.random() > 0.02,
+                    )
+                )
+                if len(batch) >= batch_size:
+                    Item.objects.bulk_create(batch)
+                    batch = []
+            if batch:
+                Item.objects.bulk_create(batch)
+        return skus
+
+    def _create_shop_users(self, prefix, n_shops, batch_size):
+        shop_group, _ = Group.objects.get_or_create(name="shop_users")
+        Group.objects.get_or_create(name="managers")
+        usernames = [f"{prefix.lower()}_shop_{i:04d}" for i in range(1, n_shops + 1)]
+        existing = set(
+            User.objects.filter(username__in=usernames).values_list("username", flat=True)
+        )
+        new_users = []
+        for username in usernames:
+            if username in existing:
+                continue
+            user = User(username=username, email=f"{username}@example.com")
+            user.set_unusable_password()
+            new_users.append(user)
+        with transaction.atomic():
+            User.objects.bulk_create(new_users, batch_size=batch_size)
+            users = list(User.objects.filter(username__in=usernames).order_by("username"))
+            membership = User.groups.through
+            in_group = set(
+                membership.objects.filter(group=shop_group, user__in=users).values_list(
+                    "user_id", flat=True
+                )
+            )
+            membership.objects.bulk_create(
+                [
+                    membership(user_id=user.id, group_id=shop_group.id)
+                    for user in users
+                    if user.id not in in_group
+                ],
+                batch_size=batch_size,
+            )
+        return users
+
+    def _create_shop_items(self, rng, skus, shop_users, per_shop, batch_size):
+        total = 0
+        batch = []
+        with transaction.atomic():
+            for user in shop_users:
+                for sku in rng.sample(skus, per_shop):
+                    batch.append(
+                        ShopItem(shop_user_id=user.id, item_id=sku, quantity=rng.randint(0, 50))
+                    )
+                    if len(batch) >= batch_size:
+                        ShopItem.objects.bulk_create(batch, ignore_conflicts=True)
+                        total += len(batch)
+                        batch = []
+            if batch:
+                ShopItem.objects.bulk_create(batch, ignore_conflicts=True)
+                total += len(batch)
+        return total
+
+    def _create_transfers(self, rng, skus, shop_users, per_shop, batch_size):
+        # transfer_to_shop assumes one TransferItem per (shop_user, item), so never
+        # duplicate a pair left behind by an earlier run.
+        existing = set(
+            TransferItem.objects.filter(shop_user__in=shop_users).values_list(
+                "shop_user_id", "item_id"
+            )
+        )
+        batch = []
+        with transaction.atomic():
+            for user in shop_users:
+                for sku in rng.sample(skus, min(per_shop, len(skus))):
+                    if (user.id, sku) in existing:
+                        continue
+                    batch.append(
+                        TransferItem(
+                            shop_user_id=user.id,
+                            item_id=sku,
+                            quantity=rng.randint(1, 5),
+                            ordered=rng.random() < 0.5,
+                        )
+                    )
+            TransferItem.objects.bulk_create(batch, batch_size=batch_size)
+            refresh_reserved_quantities({transfer.item_id for transfer in batch})
+
+    def _write_workbook(self, directory, prefix, max_shop_rows):
+        """
+        Write an upload workbook with the same sheets and headers as the export, using
+        openpyxl's write-only mode so large sheets do not have to be held in memory.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{prefix.lower()}_upload.xlsx"
+        started = time.perf_counter()
+        workbook = Workbook(write_only=True)
+        item_sheet = workbook.create_sheet("Warehouse Stock")
+        item_sheet.append(["SKU", "Description", "Retail Price", "Quantity"])
+        for row in (
+            Item.objects.filter(sku__startswith=prefix, is_active=True)
+            .values_list("sku", "description", "retail_price", "quantity")
+            .iterator(chunk_size=10_000)
+        ):
+            item_sheet.append(list(row))
+        shop_sheet = workbook.create_sheet("Shop Stock")
+        shop_sheet.append(["Shop User", "SKU", "Description", "Retail Price", "Quantity"])
+        for row in (
+            ShopItem.objects.filter(item__sku__startswith=prefix)
+            .values_list(
+                "shop_user__username",
+                "item__sku",
+                "item__description",
+                "item__retail_price",
+                "quantity",
+            )[:max_shop_rows]
+            .iterator(chunk_size=10_000)
+        ):
+            shop_sheet.append(list(row))
+        workbook.save(path)
+        self.stdout.write(
+            f"Wrote {path} in {time.perf_counter() - started:.1f}s."
+        )
@@ -0,0 +1,146 @@
+"""Import a stock workbook from the command line, outside the web tier."""
+import math
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from openpyxl import load_workbook
+
+from stock_manager import xlsx_reader
+from stock_manager.roles import is_manager
+from stock_manager.utils import (
+    FIRST_DATA_ROW,
+    ITEM_HEADERS,
+    ITEM_SHEET,
+    SHOP_HEADERS,
+    SHOP_SHEET,
+    SheetConversionError,
+    SpreadsheetTools,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a Warehouse Stock / Shop Stock workbook with the same semantics as "
+        "the upload page. Sheets are parsed in row ranges across a process pool and "
+        "applied by a single writer in one transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="Path to the .xlsx workbook.")
+        parser.add_argument(
+            "--user",
+            required=True,
+            help="Manager username the import is made as (used for logging).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Parser processes (default: CPU count).",
+        )
+        parser.add_argument(
+            "--chunk-mb",
+            type=int,
+            default=16,
+            help="Uncompressed sheet XML per parse task, in MB.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["file"]
+        if not path.endswith(".xlsx") or not os.path.isfile(path):
+            raise CommandError("Please give the path of an existing .xlsx file.")
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+        if not is_manager(user):
+            raise CommandError(f"User '{user.username}' is not in the managers group.")
+        tools = SpreadsheetTools(user=user)
+
+        started = time.perf_counter()
+        try:
+            sheets = self._parse_parallel(
+                path, max(options["workers"], 1), options["chunk_mb"] * 1024 * 1024
+            )
+        except xlsx_reader.UnsupportedSheet as e:
+            self.stdout.write(f"Falling back to openpyxl ({e}).")
+            sheets = None
+        if sheets is None:
+            try:
+                sheets = tools.load_sheets(load_workbook(path, read_only=True))
+            except SheetConversionError as e:
+                raise CommandError(str(e))
+        rows = sum(len(rows) for _, rows in sheets.values())
+        self._report("parse", rows, started)
+
+        started = time.perf_counter()
+        skipped_skus, row_errors = tools.import_sheets(sheets)
+        self._report("write", rows, started)
+        if skipped_skus:
+            self.stdout.write(
+                f"Skipped invalid retail_price values for: {', '.join(map(str, skipped_skus))}"
+            )
+        for error in row_errors:
+            self.stdout.write(
+                f"{error['sheet']} row {error['row']} ({error['sku']}): {error['error']}"
+            )
+
+    def _report(self, phase, rows, started):
+        elapsed = time.perf_counter() - started
+        rate = rows / elapsed if elapsed else rows
+        self.stdout.write(f"{phase}: {rows} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+
+    def _parse_parallel(self, path, workers, chunk_bytes):
+        """
+        Parse both sheets in byte ranges of whole rows across a process pool.
+        Returns None when the workbook needs the custom conversion (a sheet is
+        missing or lacks the default headers), which only openpyxl can feed.
+        """
+        members = xlsx_reader.sheet_paths(path)
+        with zipfile.ZipFile(path) as archive:
+            sizes = {
+                name: archive.getinfo(member).file_size for name, member in members.items()
+            }
+        plans = {}
+        for name, required in ((ITEM_SHEET, ITEM_HEADERS), (SHOP_SHEET, SHOP_HEADERS)):
+            if name not in members:
+                return None
+            headers = xlsx_reader.read_header(path, members[name])
+            if not all(col in headers for col in required):
+                return None
+            parts = max(1, math.ceil(sizes[name] / chunk_bytes))
+            plans[name] = (headers, xlsx_reader.split_points(path, members[name], parts))
+
+        # Workers only touch the zip file, so spawn them clean rather than forking
+        # a process that holds database connections.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {
+                name: [
+                    pool.submit(
+                        xlsx_reader.read_numbered_rows,
+                        path,
+                        members[name],
+                        start,
+                        stop,
+                        len(headers),
+                    )
+                    for start, stop in zip(points, points[1:])
+                ]
+                for name, (headers, points) in plans.items()
+            }
+            sheets = {}
+            for name, (headers, _) in plans.items():
+                numbered = []
+                for future in futures[name]:
+                    numbered.extend(future.result())
+                # Missing rows read as blank ones, as with openpyxl, so row
+                # numbers in import errors match the sheet.
+                rows = xlsx_reader.fill_gaps(numbered, FIRST_DATA_ROW, len(headers))
+                sheets[name] = (headers, rows)
+        return sheets
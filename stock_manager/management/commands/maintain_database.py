@@ -0,0 +1,126 @@
+"""Periodic database housekeeping, kept off the request path."""
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from stock_manager.changesets import purge_changesets
+from stock_manager.idempotency import purge_idempotency_records
+from stock_manager.inventory import cleanup_orphaned_shop_items
+from stock_manager.sales import purge_sale_events
+
+# PRAGMA auto_vacuum value for INCREMENTAL mode.
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class Command(BaseCommand):
+    help = (
+        "Run database housekeeping: delete orphaned ShopItems, expired import "
+        "changesets and idempotency keys and old sale events, refresh planner statistics (ANALYZE / PRAGMA optimize), "
+        "reclaim free pages with an incremental VACUUM and prune caches. Schedule "
+        "from cron, e.g. nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--vacuum-pages",
+            type=int,
+            default=10_000,
+            help="Free pages to reclaim per run with PRAGMA incremental_vacuum (0 = all).",
+        )
+        parser.add_argument(
+            "--full-vacuum",
+            action="store_true",
+            help=(
+                "Switch the database to auto_vacuum=INCREMENTAL and run a full VACUUM. "
+                "Needed once on databases created before incremental vacuum was "
+                "enabled; takes an exclusive lock for the duration."
+            ),
+        )
+        parser.add_argument("--skip-analyze", action="store_true")
+
+    def handle(self, *args, **options):
+        self._timed("orphaned shop items", self._cleanup)
+        self._timed("expired import changesets", self._purge_changesets)
+        self._timed("processed sale events", self._purge_sale_events)
+        self._timed("expired idempotency keys", self._purge_idempotency_records)
+        if not options["skip_analyze"]:
+            self._timed("analyze", self._analyze)
+        if options["full_vacuum"]:
+            self._timed("full vacuum", self._full_vacuum)
+        else:
+            self._timed(
+                "incremental vacuum", self._incremental_vacuum, options["vacuum_pages"]
+            )
+        self._timed("cache prune", self._prune_caches)
+
+    def _timed(self, label, func, *args):
+        started = time.perf_counter()
+        detail = func(*args)
+        self.stdout.write(f"{label}: {detail} ({time.perf_counter() - started:.2f}s)")
+
+    def _cleanup(self):
+        return f"deleted {cleanup_orphaned_shop_items()} rows"
+
+    def _purge_changesets(self):
+        return f"deleted {purge_changesets()} changesets"
+
+    def _purge_sale_events(self):
+        return f"deleted {purge_sale_events()} events"
+
+    def _purge_idempotency_records(self):
+        return f"deleted {purge_idempotency_records()} records"
+
+    def _analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+            if connection.vendor == "sqlite":
+                # There is no full-text index in this schema, so PRAGMA optimize is
+                # the SQLite-side index upkeep left to do.
+                cursor.execute("PRAGMA optimize")
+        return "done"
+
+    def _pragma(self, cursor, name):
+        cursor.execute(f"PRAGMA {name}")
+        return cursor.fetchone()[0]
+
+    def _incremental_vacuum(self, pages):
+        if connection.vendor != "sqlite":
+            return "skipped (not SQLite)"
+        with connection.cursor() as cursor:
+            if self._pragma(cursor, "auto_vacuum") != AUTO_VACUUM_INCREMENTAL:
+                return "skipped (auto_vacuum is not INCREMENTAL; run once with --full-vacuum)"
+            free_before = self._pragma(cursor, "freelist_count")
+            # sqlite3's execute() only steps the statement once, freeing a single
+            # page, so it is run once per page. executescript() would run it to
+            # completion but commits any open transaction first.
+            with transaction.atomic():
+                for _ in range(min(pages, free_before) if pages else free_before):
+                    connection.connection.execute("PRAGMA incremental_vacuum(1)")
+            free_after = self._pragma(cursor, "freelist_count")
+        return f"reclaimed {free_before - free_after} of {free_before} free pages"
+
+    def _full_vacuum(self):
+        if connection.vendor != "sqlite":
+            return "skipped (not SQLite)"
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA auto_vacuum={AUTO_VACUUM_INCREMENTAL}")
+            size_before = self._pragma(cursor, "page_count")
+            cursor.execute("VACUUM")
+            size_after = self._pragma(cursor, "page_count")
+        return f"{size_before} -> {size_after} pages"
+
+    def _prune_caches(self):
+        """
+        Drop expired and superseded entries from caches whose backend supports it.
+        Report entries are keyed by data version, so stale ones are never read again.
+        """
+        results = []
+        for alias in caches:
+            prune = getattr(caches[alias], "prune", None)
+            if prune is None:
+                results.append(f"{alias}: skipped (backend cannot be pruned)")
+            else:
+                results.append(f"{alias}: removed {prune()} entries")
+        return "; ".join(results)
@@ -0,0 +1,30 @@
+"""Compute replenishment transfer suggestions for every shop."""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from stock_manager.planner import plan_replenishment
+
+
+class Command(BaseCommand):
+    help = (
+        "Replace the draft transfer suggestions of every shop (or the given shop "
+        "usernames) with a fresh replenishment plan. Schedule from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("shop_users", nargs="*", help="Shop usernames to plan.")
+
+    def handle(self, *args, **options):
+        shop_user_ids = None
+        if options["shop_users"]:
+            shop_user_ids = list(
+                User.objects.filter(username__in=options["shop_users"]).values_list(
+                    "id", flat=True
+                )
+            )
+        summary = plan_replenishment(shop_user_ids)
+        self.stdout.write(
+            f"Planned {summary['locations']} shop locations: {summary['suggestions']} "
+            f"suggestions for {summary['units']} units ({summary['short_skus']} SKUs "
+            f"short) in {summary['seconds']:.1f}s."
+        )
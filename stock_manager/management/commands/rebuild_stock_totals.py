@@ -0,0 +1,27 @@
+"""Rebuild the denormalised StockTotal table from scratch."""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from stock_manager.inventory import refresh_reserved_quantities, refresh_stock_totals
+from stock_manager.models import DataVersion, StockTotal
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Item.reserved_quantity and the StockTotal rows for every SKU from "
+        "Item, ShopItem and TransferItem."
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            refresh_reserved_quantities()
+            StockTotal.objects.all().delete()
+            refresh_stock_totals()
+            DataVersion.bump(DataVersion.ITEM, DataVersion.TRANSFER_ITEM)
+        self.stdout.write(
+            f"Rebuilt {StockTotal.objects.count()} stock totals in "
+            f"{time.perf_counter() - started:.1f}s."
+        )
@@ -0,0 +1,42 @@
+"""Email a digest of low-stock alerts that have not been notified yet."""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from email_service.email import SendEmail
+from stock_manager.models import StockAlert
+
+
+class Command(BaseCommand):
+    help = (
+        "Send one email digest listing every open low-stock alert raised since the "
+        "last digest, then mark them as notified. Schedule from cron."
+    )
+
+    def handle(self, *args, **options):
+        alerts = list(
+            StockAlert.objects.filter(resolved_at__isnull=True, notified_at__isnull=True)
+            .select_related("item", "shop_user")
+            .order_by("created_at")
+        )
+        if not alerts:
+            self.stdout.write("No new low-stock alerts.")
+            return
+        records = [
+            {
+                "sku": alert.item_id,
+                "description": alert.item.description,
+                "location": alert.shop_user.username if alert.shop_user else "warehouse",
+                "quantity": alert.quantity,
+                "threshold": alert.threshold,
+            }
+            for alert in alerts
+        ]
+        if not SendEmail().compose(
+            records=records, notification_type=SendEmail.EmailType.LOW_STOCK_DIGEST
+        ):
+            self.stderr.write("Low-stock digest was not sent; alerts left pending.")
+            return
+        StockAlert.objects.filter(pk__in=[alert.pk for alert in alerts]).update(
+            notified_at=timezone.now()
+        )
+        self.stdout.write(f"Sent low-stock digest with {len(alerts)} alert(s).")
@@ -0,0 +1,20 @@
+"""Write periodic stock snapshots for fast point-in-time lookups."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from stock_manager.inventory import take_stock_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Snapshot the quantity of every SKU/location changed since the last run "
+        "(everything on the first run). Schedule from cron, e.g. hourly."
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = take_stock_snapshots()
+        self.stdout.write(
+            f"Wrote {written} stock snapshots in {time.perf_counter() - started:.1f}s."
+        )
@@ -1,8 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 import re
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from django.core.validators import MinValueValidator
+from django.db.models.functions import Lower
+
+from .fingerprints import fingerprint
 
 # Override the __str__ method of the User model to return the username
 User.add_to_class("__str__", lambda self: self.username)
@@ -43,17 +47,84 @@ class Admin(models.Model):
         return f"Configuration Options"
 
 
+class DataVersion(models.Model):
+    """
+    Monotonic per-table version counters, bumped by every write path so derived
+    results (reports, cached responses) can be keyed on the data they were built from.
+    """
+
+    ITEM = "item"
+    SHOP_ITEM = "shopitem"
+    TRANSFER_ITEM = "transferitem"
+
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    @staticmethod
+    def get_versions(*names):
+        versions = dict(
+            DataVersion.objects.filter(name__in=names).values_list("name", "version")
+        )
+        return tuple(versions.get(name, 0) for name in names)
+
+    @staticmethod
+    def bump(*names):
+        updated = DataVersion.objects.filter(name__in=names).update(
+            version=models.F("version") + 1
+        )
+        if updated < len(names):
+            for name in names:
+                DataVersion.objects.get_or_create(name=name, defaults={"version": 1})
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
 class Item(models.Model):
     sku = models.CharField(primary_key=True, unique=True, editable=True, max_length=100)
     description = models.CharField(max_length=250)
     retail_price = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.IntegerField(validators=[MinValueValidator(0)])
+    # Units promised to pending TransferItems. Only ever changed with F()
+    # expressions (see transfer_to_shop), and never written back by save().
+    reserved_quantity = models.IntegerField(default=0)
     last_updated = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)  # Soft-delete flag
+    # Fingerprint of description, retail_price and quantity, kept by save() and
+    # compared by the spreadsheet import (see stock_manager.fingerprints).
+    row_hash = models.BigIntegerField(null=True, blank=True, editable=False)
+
+    # Fields covered by row_hash.
+    HASHED_FIELDS = ("description", "retail_price", "quantity")
+
+    class Meta:
+        # Every list query filters is_active=True, so these are partial indexes over
+        # active rows, one per ordering offered by ItemViewSet. Django renders the
+        # filter as a bare WHERE "is_active", which SQLite matches against the
+        # partial index condition but not against a leading is_active column.
+        indexes = [
+            models.Index(fields=["-last_updated"], name="item_active_updated_idx", condition=models.Q(is_active=True)),
+            models.Index(fields=["quantity"], name="item_active_qty_idx", condition=models.Q(is_active=True)),
+            models.Index(fields=["retail_price"], name="item_active_price_idx", condition=models.Q(is_active=True)),
+            models.Index(Lower("description"), name="item_active_desc_idx", condition=models.Q(is_active=True)),
+        ]
 
     def __str__(self):
         return f"{self.sku} ({'Active' if self.is_active else 'Inactive'})"
 
+    @property
+    def available_quantity(self):
+        """
+        Warehouse quantity not yet promised to pending transfers.
+        """
+        return self.quantity - self.reserved_quantity
+
+    def content_fingerprint(self):
+        """
+        Fingerprint of the fields covered by row_hash, from the current values.
+        """
+        return fingerprint(self.description, int(self.retail_price * 100), self.quantity)
+
     def save(self, *args, **kwargs):
         """
         Coerce retail_price to a Decimal with 2 decimal places and validate.
@@ -76,6 +147,17 @@ class Item(models.Model):
             )
 
         self.retail_price = dec
+        self.row_hash = self.content_fingerprint()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & set(self.HASHED_FIELDS):
+            kwargs["update_fields"] = [*update_fields, "row_hash"]
+        if not self._state.adding and update_fields is None:
+            # Don't overwrite reserved_quantity with a possibly stale in-memory copy.
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "reserved_quantity"
+            ]
         super().save(*args, **kwargs)
 
 
@@ -88,16 +170,34 @@ class ShopItem(models.Model):
     )  # Relates ShopItem to Item, allows null if Item is deleted
     quantity = models.IntegerField(default=0)
     last_updated = models.DateTimeField(auto_now=True)
+    # Fingerprint of the Shop Stock row last imported into this ShopItem and its
+    # Item; cleared by any other write (see stock_manager.fingerprints).
+    row_hash = models.BigIntegerField(null=True, blank=True, editable=False)
 
     class Meta:
         unique_together = (
             "shop_user",
             "item",
         )  # Ensure unique combination of shop_user and item
+        indexes = [
+            models.Index(fields=["shop_user", "-last_updated"], name="shopitem_user_updated_idx"),
+            models.Index(fields=["shop_user", "quantity"], name="shopitem_user_qty_idx"),
+        ]
 
     def __str__(self):
         return f"{self.shop_user.username} - {self.item.sku if self.item else 'Item Deleted'}"
 
+    def save(self, *args, row_hash=None, **kwargs):
+        """
+        Only the spreadsheet import knows the row a ShopItem now matches; every
+        other save clears the fingerprint.
+        """
+        self.row_hash = row_hash
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = [*update_fields, "row_hash"]
+        super().save(*args, **kwargs)
+
 
 class TransferItem(models.Model):
     shop_user = models.ForeignKey(
@@ -111,5 +211,387 @@ class TransferItem(models.Model):
     last_updated = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Managers list ordered transfers; shop users list (and submit) their own.
+            models.Index(fields=["-last_updated"], name="xfer_ordered_updated_idx", condition=models.Q(ordered=True)),
+            models.Index(fields=["shop_user", "-last_updated"], name="xfer_user_updated_idx"),
+        ]
+
     def __str__(self):
         return f"{self.shop_user.username} - {self.item.sku}"
+
+
+class StockTotal(models.Model):
+    """
+    Denormalised per-SKU stock position across the warehouse and every shop.
+    Maintained by stock_manager.inventory.refresh_stock_totals() whenever the
+    underlying rows change, and rebuilt with `manage.py rebuild_stock_totals`.
+    """
+
+    item = models.OneToOneField(
+        Item, on_delete=models.CASCADE, primary_key=True, related_name="stock_total"
+    )
+    warehouse_quantity = models.IntegerField(default=0)
+    shop_quantity = models.IntegerField(default=0)
+    pending_quantity = models.IntegerField(default=0)  # sum of open TransferItems
+    shop_count = models.IntegerField(default=0)  # shops holding a positive quantity
+    last_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.item_id}: {self.warehouse_quantity} + {self.shop_quantity}"
+
+
+class StockMovement(models.Model):
+    """
+    Append-only ledger of stock quantity changes. Rows are never updated or deleted.
+    sku and shop_user_id are plain columns rather than foreign keys so history
+    outlives the rows it describes; shop_user_id is NULL for the warehouse.
+    """
+
+    class Kind(models.IntegerChoices):
+        TRANSFER = 1, "Transfer request"
+        DISPATCH = 2, "Dispatch"
+        IMPORT = 3, "Import"
+        EDIT = 4, "Manual edit"
+        CANCEL = 5, "Cancel"
+        SALE = 6, "Sale"
+
+    # Kinds that change on-hand quantity. TRANSFER and CANCEL record changes to
+    # pending transfer quantities and are skipped when replaying stock levels.
+    STOCK_KINDS = (Kind.DISPATCH, Kind.IMPORT, Kind.EDIT, Kind.SALE)
+
+    sku = models.CharField(max_length=100)
+    shop_user_id = models.IntegerField(null=True, blank=True)
+    kind = models.PositiveSmallIntegerField(choices=Kind.choices)
+    delta = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["sku", "shop_user_id", "id"], name="movement_key_idx"),
+            models.Index(fields=["shop_user_id", "id"], name="movement_shop_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.sku} {self.delta:+d}"
+
+
+class StockSnapshot(models.Model):
+    """
+    Quantity of one SKU at one location (shop_user_id NULL = warehouse) as of
+    the ledger row movement_id. Written by `manage.py snapshot_stock`.
+    """
+
+    sku = models.CharField(max_length=100)
+    shop_user_id = models.IntegerField(null=True, blank=True)
+    quantity = models.IntegerField()
+    movement_id = models.BigIntegerField()
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["sku", "shop_user_id", "taken_at"], name="snapshot_key_idx"),
+            models.Index(fields=["shop_user_id", "taken_at"], name="snapshot_shop_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.sku} @ {self.taken_at}: {self.quantity}"
+
+
+class ArchivedTransfer(models.Model):
+    """
+    Completed or cancelled transfer requests, moved out of TransferItem so the live
+    table only holds pending rows. sku is a plain column so history outlives the
+    Item. completed_month (YYYYMM) partitions the archive for month-based queries.
+    """
+
+    class Status(models.IntegerChoices):
+        COMPLETED = 1, "Completed"
+        CANCELLED = 2, "Cancelled"
+
+    shop_user = models.ForeignKey(User, on_delete=models.CASCADE)
+    sku = models.CharField(max_length=100)
+    quantity = models.IntegerField()
+    status = models.PositiveSmallIntegerField(choices=Status.choices)
+    ordered = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    completed_at = models.DateTimeField()
+    completed_month = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["completed_month", "shop_user"], name="archxfer_month_shop_idx"),
+            models.Index(fields=["shop_user", "-completed_at"], name="archxfer_shop_done_idx"),
+            models.Index(fields=["sku", "-completed_at"], name="archxfer_sku_done_idx"),
+            models.Index(fields=["-completed_at"], name="archxfer_done_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.shop_user_id} - {self.sku} ({self.get_status_display()})"
+
+
+class ReorderThreshold(models.Model):
+    """
+    Low-stock level for a SKU in the warehouse (shop_user NULL) or in one shop.
+    Warehouse levels are compared against available (unreserved) quantity; shop
+    levels with a max_quantity also drive the replenishment planner.
+    """
+
+    item = models.ForeignKey(Item, on_delete=models.CASCADE)
+    shop_user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    min_quantity = models.PositiveIntegerField()
+    # Shop levels only: the replenishment planner tops a low shop back up to this.
+    max_quantity = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["item", "shop_user"], name="threshold_item_shop_uniq"
+            ),
+            models.UniqueConstraint(
+                fields=["item"],
+                condition=models.Q(shop_user__isnull=True),
+                name="threshold_item_warehouse_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        location = self.shop_user.username if self.shop_user else "warehouse"
+        return f"{self.item_id} @ {location} <= {self.min_quantity}"
+
+
+class StockAlert(models.Model):
+    """
+    A low-stock alert. Opened when a location's quantity falls to or below its
+    ReorderThreshold, resolved when it recovers. notified_at is set once the alert
+    has gone out in an email digest.
+    """
+
+    item = models.ForeignKey(Item, on_delete=models.CASCADE)
+    shop_user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    quantity = models.IntegerField()
+    threshold = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    notified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["item", "shop_user"],
+                name="alert_open_key_idx",
+                condition=models.Q(resolved_at__isnull=True),
+            ),
+            models.Index(
+                fields=["shop_user", "-created_at"],
+                name="alert_open_shop_idx",
+                condition=models.Q(resolved_at__isnull=True),
+            ),
+            models.Index(
+                fields=["created_at"],
+                name="alert_unnotified_idx",
+                condition=models.Q(resolved_at__isnull=True, notified_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        location = self.shop_user.username if self.shop_user else "warehouse"
+        return f"{self.item_id} @ {location}: {self.quantity} <= {self.threshold}"
+
+
+class TransferSuggestion(models.Model):
+    """
+    Draft transfer produced by the replenishment planner. A shop user accepts their
+    suggestions in one call, which turns them into (unordered) TransferItems.
+    """
+
+    shop_user = models.ForeignKey(User, on_delete=models.CASCADE)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("shop_user", "item")
+
+    def __str__(self):
+        return f"{self.shop_user.username} - {self.item_id} x {self.quantity}"
+
+
+class ArchivedItem(models.Model):
+    """
+    Cold storage for soft-deleted Items. Rows are moved here by archive_items and
+    moved back into Item (still inactive) as soon as their SKU is created, edited or
+    imported again.
+    """
+
+    sku = models.CharField(primary_key=True, max_length=100)
+    description = models.CharField(max_length=250)
+    retail_price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.IntegerField()
+    last_updated = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["archived_at"], name="archived_item_at_idx")]
+
+    def __str__(self):
+        return f"{self.sku} (archived)"
+
+
+class ImportChangeset(models.Model):
+    """
+    A previewed (dry-run) spreadsheet upload. Holds the parsed sheets so confirming
+    applies exactly the previewed file without re-parsing it, and the data versions
+    it was diffed against so a confirm with no writes since can skip re-diffing.
+    """
+
+    class Status(models.IntegerChoices):
+        PENDING = 1, "Pending"
+        APPLIED = 2, "Applied"
+
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+    status = models.PositiveSmallIntegerField(choices=Status.choices, default=Status.PENDING)
+    # DataVersion (item, shopitem) and the deletions setting at preview time.
+    data_versions = models.JSONField()
+    allow_deletions = models.BooleanField()
+    sheets = models.JSONField(encoder=DjangoJSONEncoder)
+    summary = models.JSONField(encoder=DjangoJSONEncoder)
+    row_errors = models.JSONField(encoder=DjangoJSONEncoder, default=list)
+
+    class Meta:
+        indexes = [models.Index(fields=["created_at"], name="changeset_created_idx")]
+
+    def __str__(self):
+        return f"Import changeset {self.pk} ({self.get_status_display()})"
+
+
+class ImportChange(models.Model):
+    """
+    One line of an ImportChangeset's diff. before/after hold only the changed
+    fields for updates, and the whole row for creates and deletions.
+    """
+
+    class Kind(models.IntegerChoices):
+        CREATE = 1, "Create"
+        UPDATE = 2, "Update"
+        REACTIVATE = 3, "Reactivate"
+        DEACTIVATE = 4, "Deactivate"
+        SHOP_CREATE = 5, "Shop item create"
+        SHOP_UPDATE = 6, "Shop item update"
+        SHOP_DELETE = 7, "Shop item delete"
+
+    changeset = models.ForeignKey(
+        ImportChangeset, on_delete=models.CASCADE, related_name="changes"
+    )
+    kind = models.PositiveSmallIntegerField(choices=Kind.choices)
+    sku = models.CharField(max_length=100)
+    shop_user = models.CharField(max_length=150, blank=True)  # username
+    before = models.JSONField(encoder=DjangoJSONEncoder, null=True)
+    after = models.JSONField(encoder=DjangoJSONEncoder, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["changeset", "kind"], name="change_changeset_kind_idx")]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.sku}"
+
+
+class SaleEvent(models.Model):
+    """
+    A sale reported by a shop's POS (a return when quantity is negative). Events are
+    stored as they arrive and later applied to ShopItem quantities in aggregated
+    batches (see stock_manager.sales). event_id is chosen by the POS, so a batch
+    that is sent again is not counted twice.
+    """
+
+    class Status(models.IntegerChoices):
+        PENDING = 1, "Pending"
+        APPLIED = 2, "Applied"
+        UNMATCHED = 3, "No matching shop item"
+
+    event_id = models.CharField(max_length=100, unique=True)
+    shop_user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Plain column: a sale may name a SKU the shop does not (yet) stock.
+    sku = models.CharField(max_length=100)
+    quantity = models.IntegerField()
+    occurred_at = models.DateTimeField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    status = models.PositiveSmallIntegerField(choices=Status.choices, default=Status.PENDING)
+    applied_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The applier only ever reads the pending backlog, in arrival order.
+            models.Index(
+                fields=["id"],
+                name="sale_pending_idx",
+                condition=models.Q(status=1),  # Status.PENDING
+            ),
+            models.Index(fields=["applied_at"], name="sale_applied_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.shop_user.username} {self.sku} x{self.quantity} ({self.event_id})"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    The response to a request sent with an Idempotency-Key header, so a retry with
+    the same key gets it back without running the view again (see
+    stock_manager.idempotency). status_code is NULL while the first request is
+    still running.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    # Hash of the method, path and body, to refuse a key reused for another request.
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(encoder=DjangoJSONEncoder, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="idempotency_user_key_unique")
+        ]
+        indexes = [models.Index(fields=["expires_at"], name="idempotency_expires_idx")]
+
+    def __str__(self):
+        return f"{self.user.username} {self.key}"
+
+
+class ChangeLog(models.Model):
+    """
+    The latest change to each Item and ShopItem, kept by SQLite triggers (see
+    stock_manager.changelog). The id is the change sequence: every change replaces
+    the object's row with a new, higher id, so "id > cursor" finds every object
+    changed since the cursor. Deleted objects keep a row with deleted=True.
+    """
+
+    class Source(models.IntegerChoices):
+        ITEM = 1, "Item"
+        SHOP_ITEM = 2, "Shop item"
+
+    source = models.PositiveSmallIntegerField(choices=Source.choices)
+    # The Item's SKU or the ShopItem's id.
+    object_key = models.CharField(max_length=100)
+    # Plain column, so tombstones outlive the shop user; NULL for items.
+    shop_user_id = models.IntegerField(null=True, blank=True)
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source", "object_key"], name="changelog_object_unique"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["shop_user_id", "id"], name="changelog_shop_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.pk}: {self.get_source_display()} {self.object_key}"
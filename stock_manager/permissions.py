@@ -0,0 +1,14 @@
+from rest_framework.permissions import BasePermission
+
+from .roles import is_manager
+
+
+class IsManager(BasePermission):
+    """
+    Allow access only to members of the 'managers' group.
+    """
+
+    message = "Permission denied."
+
+    def has_permission(self, request, view):
+        return is_manager(request.user)
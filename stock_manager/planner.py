@@ -0,0 +1,227 @@
+"""
+Replenishment planner: suggests transfers that top every shop back up to its
+reorder levels, computed for all shops and SKUs at once with NumPy.
+
+A shop location is planned when it has a ReorderThreshold with a max_quantity.
+When its position (shop quantity plus pending transfers) is at or below
+min_quantity, it needs max_quantity - position units. Needs are capped by the
+warehouse's available quantity. When a SKU is short, the stock is shared in
+proportion to each shop's need, and leftover units go to the largest remainders.
+"""
+import logging
+import time
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .inventory import (
+    LEDGER_BATCH_SIZE,
+    record_movements,
+    refresh_reserved_quantities,
+    refresh_stock_totals,
+)
+from .models import (
+    DataVersion,
+    Item,
+    ReorderThreshold,
+    ShopItem,
+    StockMovement,
+    TransferItem,
+    TransferSuggestion,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _load_levels(shop_user_ids=None):
+    """
+    Return the item ids, shop ids, min and max levels and current positions of every
+    planned shop location, as arrays built from one query.
+    """
+    shop_quantity = ShopItem.objects.filter(
+        shop_user=OuterRef("shop_user"), item=OuterRef("item")
+    ).values("quantity")[:1]
+    pending = (
+        TransferItem.objects.filter(shop_user=OuterRef("shop_user"), item=OuterRef("item"))
+        .values("item")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    levels = ReorderThreshold.objects.filter(
+        shop_user__isnull=False, max_quantity__isnull=False, item__is_active=True
+    )
+    if shop_user_ids is not None:
+        levels = levels.filter(shop_user_id__in=shop_user_ids)
+    rows = list(
+        levels.annotate(
+            position=Coalesce(Subquery(shop_quantity), 0)
+            + Coalesce(Subquery(pending), 0)
+        ).values_list("item_id", "shop_user_id", "min_quantity", "max_quantity", "position")
+    )
+    if not rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return [], empty, empty, empty, empty
+    item_ids, shop_ids, minimum, maximum, position = zip(*rows)
+    return (
+        item_ids,
+        np.array(shop_ids, dtype=np.int64),
+        np.array(minimum, dtype=np.int64),
+        np.array(maximum, dtype=np.int64),
+        np.array(position, dtype=np.int64),
+    )
+
+
+def allocate(need, sku_index, available):
+    """
+    Split each SKU's available quantity over the rows needing it. Rows get their
+    full need when stock allows, otherwise a need-proportional share rounded down,
+    with the leftover units going to the rows with the largest fractional share.
+    """
+    n_skus = len(available)
+    demand = np.bincount(sku_index, weights=need, minlength=n_skus)
+    supply = np.minimum(np.maximum(available, 0), demand)
+    ratio = np.divide(supply, demand, out=np.zeros(n_skus), where=demand > 0)
+    share = need * ratio[sku_index]
+    allocation = np.floor(share).astype(np.int64)
+    leftover = np.rint(
+        supply - np.bincount(sku_index, weights=allocation, minlength=n_skus)
+    ).astype(np.int64)
+    # Rank rows within each SKU by descending fractional share.
+    order = np.lexsort((allocation - share, sku_index))
+    sorted_skus = sku_index[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_skus, sorted_skus)
+    allocation[order] += rank < leftover[sorted_skus]
+    return allocation
+
+
+def _insert_suggestions(shop_user_ids, item_ids, quantities):
+    """
+    Insert planner output with executemany rather than bulk_create: a full plan is
+    hundreds of thousands of rows and building model instances dominates the run.
+    """
+    meta = TransferSuggestion._meta
+    columns = [
+        meta.get_field(name).column
+        for name in ("shop_user", "item", "quantity", "created_at")
+    ]
+    created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    sql = "INSERT INTO {} ({}) VALUES (%s, %s, %s, %s)".format(
+        connection.ops.quote_name(meta.db_table),
+        ", ".join(connection.ops.quote_name(column) for column in columns),
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(item_ids), LEDGER_BATCH_SIZE):
+            end = start + LEDGER_BATCH_SIZE
+            cursor.executemany(
+                sql,
+                zip(
+                    shop_user_ids[start:end],
+                    item_ids[start:end],
+                    quantities[start:end],
+                    [created_at] * len(item_ids[start:end]),
+                ),
+            )
+
+
+def plan_replenishment(shop_user_ids=None):
+    """
+    Replace the TransferSuggestions of every shop (or the given shops) with a fresh
+    plan. Returns a summary of the run.
+    """
+    started = time.perf_counter()
+    item_ids, shop_ids, minimum, maximum, position = _load_levels(shop_user_ids)
+    need = np.where(position <= minimum, np.maximum(maximum - position, 0), 0)
+    wanted = need > 0
+
+    skus = sorted({item_ids[i] for i in np.flatnonzero(wanted)})
+    index = {sku: i for i, sku in enumerate(skus)}
+    available = np.zeros(len(skus), dtype=np.int64)
+    for start in range(0, len(skus), LEDGER_BATCH_SIZE):
+        for sku, quantity in Item.objects.filter(
+            sku__in=skus[start : start + LEDGER_BATCH_SIZE]
+        ).values_list("sku", F("quantity") - F("reserved_quantity")):
+            available[index[sku]] = quantity
+
+    rows = np.flatnonzero(wanted)
+    sku_index = np.fromiter(
+        (index[item_ids[i]] for i in rows), dtype=np.int64, count=len(rows)
+    )
+    allocation = allocate(need[rows], sku_index, available)
+    planned = allocation > 0
+    with transaction.atomic():
+        existing = TransferSuggestion.objects.all()
+        if shop_user_ids is not None:
+            existing = existing.filter(shop_user_id__in=shop_user_ids)
+        existing.delete()
+        _insert_suggestions(
+            shop_ids[rows[planned]].tolist(),
+            [item_ids[row] for row in rows[planned]],
+            allocation[planned].tolist(),
+        )
+
+    demand = np.bincount(sku_index, weights=need[rows], minlength=len(skus))
+    summary = {
+        "locations": len(item_ids),
+        "suggestions": int(planned.sum()),
+        "units": int(allocation.sum()),
+        "short_skus": int((demand > np.maximum(available, 0)).sum()),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    logger.info(f"Replenishment plan: {summary}")
+    return summary
+
+
+@transaction.atomic
+def accept_suggestions(shop_user, suggestion_ids=None):
+    """
+    Turn a shop user's suggestions into unordered TransferItems in one go, adding to
+    any request already in their basket. Quantities are re-capped by the stock
+    available now. Suggestions for SKUs already ordered and awaiting dispatch are
+    skipped. Returns (accepted, skipped) lists of SKUs.
+    """
+    suggestions = TransferSuggestion.objects.filter(shop_user=shop_user)
+    if suggestion_ids is not None:
+        suggestions = suggestions.filter(pk__in=suggestion_ids)
+    suggestions = list(suggestions)
+    skus = [suggestion.item_id for suggestion in suggestions]
+    available = dict(
+        Item.objects.filter(sku__in=skus, is_active=True).values_list(
+            "sku", F("quantity") - F("reserved_quantity")
+        )
+    )
+    basket = {
+        transfer.item_id: transfer
+        for transfer in TransferItem.objects.filter(shop_user=shop_user, item_id__in=skus)
+    }
+    accepted, skipped, created, updated, movements = [], [], [], [], []
+    now = timezone.now()
+    for suggestion in suggestions:
+        sku = suggestion.item_id
+        quantity = min(suggestion.quantity, max(available.get(sku, 0), 0))
+        transfer = basket.get(sku)
+        if quantity <= 0 or (transfer and transfer.ordered):
+            skipped.append(sku)
+            continue
+        if transfer:
+            transfer.quantity += quantity
+            transfer.last_updated = now
+            updated.append(transfer)
+        else:
+            created.append(TransferItem(shop_user=shop_user, item_id=sku, quantity=quantity))
+        movements.append((sku, shop_user.pk, StockMovement.Kind.TRANSFER, quantity))
+        accepted.append(sku)
+
+    TransferItem.objects.bulk_create(created, batch_size=LEDGER_BATCH_SIZE)
+    TransferItem.objects.bulk_update(
+        updated, ["quantity", "last_updated"], batch_size=LEDGER_BATCH_SIZE
+    )
+    TransferSuggestion.objects.filter(pk__in=[s.pk for s in suggestions]).delete()
+    if accepted:
+        refresh_reserved_quantities(accepted)
+        record_movements(movements)
+        refresh_stock_totals(accepted)
+        DataVersion.bump(DataVersion.TRANSFER_ITEM)
+    return accepted, skipped
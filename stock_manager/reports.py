@@ -0,0 +1,115 @@
+"""
+Stock valuation reports (quantity x retail_price), computed with grouped SQL
+aggregates and kept in the shared response cache against the current data
+versions. Only active items are valued, in the warehouse and in the shops alike,
+so the totals reconcile.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Substr
+
+from .models import DataVersion, Item, ShopItem
+from .response_cache import response_cache
+
+REPORT_CACHE_TIMEOUT = 60 * 60
+
+VALUE_FIELD = DecimalField(max_digits=20, decimal_places=2)
+
+
+def _money(value):
+    return Decimal(value or 0).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def _summary(row):
+    return {
+        "skus": row["skus"] or 0,
+        "units": row["units"] or 0,
+        "value": _money(row["value"]),
+    }
+
+
+def _aggregates(value_expression, quantity_field="quantity"):
+    return {
+        "skus": Count("pk", filter=Q(**{f"{quantity_field}__gt": 0})),
+        "units": Sum(quantity_field),
+        "value": Sum(ExpressionWrapper(value_expression, output_field=VALUE_FIELD)),
+    }
+
+
+def warehouse_summary(prefix_length=None):
+    queryset = Item.objects.filter(is_active=True)
+    aggregates = _aggregates(F("quantity") * F("retail_price"))
+    summary = _summary(queryset.aggregate(**aggregates))
+    if prefix_length:
+        summary["by_prefix"] = {
+            row["prefix"]: _summary(row)
+            for row in queryset.annotate(prefix=Substr("sku", 1, prefix_length))
+            .values("prefix")
+            .annotate(**aggregates)
+            .order_by("prefix")
+        }
+    return summary
+
+
+def shop_summaries(shop_user_id=None, prefix_length=None):
+    """
+    Return {username: summary} for every shop, or only the given shop, in one
+    grouped query (plus one more for the optional SKU prefix breakdown).
+    """
+    queryset = ShopItem.objects.filter(item__is_active=True)
+    if shop_user_id is not None:
+        queryset = queryset.filter(shop_user_id=shop_user_id)
+    aggregates = _aggregates(F("quantity") * F("item__retail_price"))
+    shops = {
+        row["shop_user__username"]: _summary(row)
+        for row in queryset.values("shop_user__username")
+        .annotate(**aggregates)
+        .order_by("shop_user__username")
+    }
+    if prefix_length:
+        for shop in shops.values():
+            shop["by_prefix"] = {}
+        for row in (
+            queryset.annotate(prefix=Substr("item_id", 1, prefix_length))
+            .values("shop_user__username", "prefix")
+            .annotate(**aggregates)
+            .order_by("shop_user__username", "prefix")
+        ):
+            shops[row["shop_user__username"]]["by_prefix"][row["prefix"]] = _summary(row)
+    return shops
+
+
+def stock_value_report(shop_user=None, prefix_length=None):
+    """
+    Stock value for one shop (shop_user given) or for the warehouse, every shop and
+    overall. Results are cached under the current Item/ShopItem data versions, so
+    any write makes the next call recompute.
+    """
+    versions = DataVersion.get_versions(DataVersion.ITEM, DataVersion.SHOP_ITEM)
+    scope = shop_user.pk if shop_user else "all"
+    key = f"report:stock_value:{scope}:{prefix_length or 0}:{versions[0]}:{versions[1]}"
+    cache = response_cache()
+    report = cache.get(key)
+    if report is not None:
+        return report
+
+    if shop_user:
+        shops = shop_summaries(shop_user.pk, prefix_length)
+        report = shops.get(
+            shop_user.username, {"skus": 0, "units": 0, "value": _money(0)}
+        )
+        report["shop_user"] = shop_user.username
+    else:
+        warehouse = warehouse_summary(prefix_length)
+        shops = shop_summaries(prefix_length=prefix_length)
+        report = {
+            "warehouse": warehouse,
+            "shops": shops,
+            "overall": {
+                "units": warehouse["units"] + sum(s["units"] for s in shops.values()),
+                "value": warehouse["value"] + sum(s["value"] for s in shops.values()),
+            },
+        }
+    cache.set(key, report, REPORT_CACHE_TIMEOUT)
+    return report
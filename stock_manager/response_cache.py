@@ -0,0 +1,92 @@
+"""
+Shared cache of list and retrieve responses for the stock viewsets.
+
+A cached response is keyed on the request URL and normalised query parameters,
+the caller's scope (everyone, managers, or one user), the page size setting and
+the DataVersion of every table the response is built from. A write bumps the
+version, so later requests build a new key and stale entries are never read
+again; the cache backend evicts them as space is needed.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from .models import Admin, DataVersion
+
+RESPONSE_CACHE_ALIAS = "responses"
+RESPONSE_CACHE_TIMEOUT = 10 * 60
+
+# Scopes for responses that do not depend on who is asking, or only on whether
+# they are a manager.
+SCOPE_ALL = "all"
+SCOPE_MANAGERS = "managers"
+
+
+def response_cache():
+    alias = RESPONSE_CACHE_ALIAS if RESPONSE_CACHE_ALIAS in settings.CACHES else "default"
+    return caches[alias]
+
+
+class CachedResponseMixin:
+    """
+    Viewset mixin serving list and retrieve from the response cache. Set
+    cache_tables to the DataVersion names the serialized data depends on, and
+    override cache_scope() when responses can be shared between users.
+    """
+
+    cache_tables = ()
+
+    def cache_scope(self):
+        return f"user:{self.request.user.pk}"
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
+
+    def _cache_key(self, request):
+        params = sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            for value in values
+            if value != ""
+        )
+        parts = [
+            request.build_absolute_uri(request.path),
+            params,
+            self.cache_scope(),
+            # Versions are read before the response is built, so data written
+            # meanwhile can only end up under an already outdated key.
+            DataVersion.get_versions(*self.cache_tables),
+        ]
+        if self.action == "list":
+            parts.append(Admin.get_records_per_page())
+        digest = hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+        return f"response:{digest}"
+
+    def _cached_response(self, build, request, *args, **kwargs):
+        cache = response_cache()
+        key = self._cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data, headers={"X-Cache": "HIT"})
+        response = build(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, RESPONSE_CACHE_TIMEOUT)
+        response["X-Cache"] = "MISS"
+        return response
+
+
+def cache_stats():
+    """
+    Return {alias: stats} for every configured cache whose backend reports them.
+    """
+    return {
+        alias: caches[alias].stats()
+        for alias in settings.CACHES
+        if hasattr(caches[alias], "stats")
+    }
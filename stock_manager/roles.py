@@ -0,0 +1,28 @@
+"""
+Group-based roles. Views ask is_manager() / is_shop_user() instead of querying
+user.groups each time: the user's group names are loaded at most once per user
+object, and CachedModelBackend hands out users with them already filled in.
+"""
+MANAGERS = "managers"
+SHOP_USERS = "shop_users"
+
+
+def user_roles(user):
+    """
+    Return the names of the user's groups as a frozenset (empty when anonymous).
+    """
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, "_roles", None)
+    if roles is None:
+        roles = frozenset(user.groups.values_list("name", flat=True))
+        user._roles = roles
+    return roles
+
+
+def is_manager(user):
+    return MANAGERS in user_roles(user)
+
+
+def is_shop_user(user):
+    return SHOP_USERS in user_roles(user)
@@ -0,0 +1,58 @@
+"""
+Database routing between the writable "default" connection and the read-only
+"readonly" connection opened on the same SQLite file.
+
+Reads only go to "readonly" inside a read_replica() block, so anything that reads
+as part of a write (transfers, imports, edits) keeps using "default".
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+READ_ALIAS = "readonly"
+
+_use_read_replica = ContextVar("use_read_replica", default=False)
+
+
+@contextmanager
+def read_replica():
+    """
+    Route ORM reads made within the block to the read-only connection.
+    """
+    token = _use_read_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_read_replica.reset(token)
+
+
+class ReadReplicaMixin:
+    """
+    Viewset mixin serving list and retrieve from the read-only connection.
+    """
+
+    def list(self, request, *args, **kwargs):
+        with read_replica():
+            return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        with read_replica():
+            return super().retrieve(request, *args, **kwargs)
+
+
+class ReadWriteRouter:
+    def db_for_read(self, model, **hints):
+        if _use_read_replica.get() and READ_ALIAS in settings.DATABASES:
+            return READ_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases point at the same database file.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != READ_ALIAS
@@ -0,0 +1,217 @@
+"""
+Sales reported by shop POS systems.
+
+record_sales() validates a batch of sale events and stores the new ones with a
+single bulk INSERT. Events whose event_id is already stored are dropped, so a
+POS can safely resend a batch it is unsure about. Nothing touches ShopItem on the
+request path.
+
+apply_sales() runs from the apply_sales command. It takes the pending backlog,
+sums it per (shop, SKU) in SQL and writes each total as one quantity change.
+A burst of thousands of events for a few hundred products costs a few hundred
+row updates, one ledger row per product and one StockTotal refresh, instead of
+a write per event. Quantities do not go below zero: when sales exceed the stock
+on record, the quantity becomes zero and the ledger records the change actually
+made.
+"""
+import logging
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .inventory import LEDGER_BATCH_SIZE, record_movements, refresh_stock_totals
+from .models import DataVersion, SaleEvent, ShopItem, StockMovement
+
+logger = logging.getLogger(__name__)
+
+MAX_EVENTS_PER_REQUEST = 10_000
+# Pending events applied per transaction.
+APPLY_BATCH_SIZE = 50_000
+# Applied events are kept this long, which is also how long a resent event_id is
+# recognised as a duplicate.
+SALE_EVENT_RETENTION = timedelta(days=30)
+
+EVENT_ID_MAX_LENGTH = SaleEvent._meta.get_field("event_id").max_length
+SKU_MAX_LENGTH = SaleEvent._meta.get_field("sku").max_length
+
+
+def _clean_event(entry, user, is_manager):
+    """
+    Return (values, errors) for one incoming event; values is None when invalid.
+    """
+    if not isinstance(entry, dict):
+        return None, {"non_field_errors": ["Expected an object."]}
+    errors = {}
+    event_id = entry.get("event_id")
+    if isinstance(event_id, int) and not isinstance(event_id, bool):
+        event_id = str(event_id)
+    if not isinstance(event_id, str) or not event_id.strip():
+        errors["event_id"] = ["This field is required."]
+    elif len(event_id.strip()) > EVENT_ID_MAX_LENGTH:
+        errors["event_id"] = [f"Ensure this field has no more than {EVENT_ID_MAX_LENGTH} characters."]
+    shop = entry.get("shop") or (None if is_manager else user.username)
+    if not shop:
+        errors["shop"] = ["This field is required."]
+    elif not is_manager and shop != user.username:
+        errors["shop"] = ["You can only report sales for your own shop."]
+    sku = entry.get("sku")
+    if not isinstance(sku, str) or not sku.strip():
+        errors["sku"] = ["This field is required."]
+    elif len(sku.strip()) > SKU_MAX_LENGTH:
+        errors["sku"] = [f"Ensure this field has no more than {SKU_MAX_LENGTH} characters."]
+    quantity = entry.get("qty")
+    if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity == 0:
+        errors["qty"] = ["Must be a non-zero whole number (negative for a return)."]
+    occurred_at = entry.get("ts")
+    occurred_at = parse_datetime(occurred_at) if isinstance(occurred_at, str) else None
+    if occurred_at is None:
+        errors["ts"] = ["Must be an ISO 8601 datetime."]
+    elif timezone.is_naive(occurred_at):
+        occurred_at = timezone.make_aware(occurred_at)
+    if errors:
+        return None, errors
+    return (event_id.strip(), shop, sku.strip(), quantity, occurred_at), None
+
+
+def record_sales(user, entries, is_manager):
+    """
+    Store new sale events. Shop users report for their own shop (the "shop" field
+    may be left out); managers name the shop. Returns (accepted, duplicates,
+    errors), where errors lists {"index", "event_id", "errors"} for rejected events.
+    """
+    errors, events = [], {}
+    duplicates = 0
+    for index, entry in enumerate(entries):
+        values, entry_errors = _clean_event(entry, user, is_manager)
+        if entry_errors:
+            event_id = entry.get("event_id") if isinstance(entry, dict) else None
+            errors.append({"index": index, "event_id": event_id, "errors": entry_errors})
+        elif values[0] in events:
+            duplicates += 1
+        else:
+            events[values[0]] = (index, values)
+
+    shops = {values[1] for _, values in events.values()}
+    shop_ids = dict(User.objects.filter(username__in=shops).values_list("username", "id"))
+    for event_id, (index, values) in list(events.items()):
+        if values[1] not in shop_ids:
+            errors.append(
+                {
+                    "index": index,
+                    "event_id": event_id,
+                    "errors": {"shop": [f"Shop user '{values[1]}' not found."]},
+                }
+            )
+            del events[event_id]
+    errors.sort(key=lambda error: error["index"])
+
+    known = set()
+    event_ids = list(events)
+    for start in range(0, len(event_ids), LEDGER_BATCH_SIZE):
+        known.update(
+            SaleEvent.objects.filter(
+                event_id__in=event_ids[start : start + LEDGER_BATCH_SIZE]
+            ).values_list("event_id", flat=True)
+        )
+    rows = [
+        SaleEvent(
+            event_id=event_id,
+            shop_user_id=shop_ids[shop],
+            sku=sku,
+            quantity=quantity,
+            occurred_at=occurred_at,
+        )
+        for event_id, (_, (_, shop, sku, quantity, occurred_at)) in events.items()
+        if event_id not in known
+    ]
+    # ignore_conflicts also covers the same event arriving in a concurrent request.
+    SaleEvent.objects.bulk_create(rows, batch_size=LEDGER_BATCH_SIZE, ignore_conflicts=True)
+    return len(rows), duplicates + len(known), errors
+
+
+def apply_sales(batch_size=APPLY_BATCH_SIZE):
+    """
+    Apply up to batch_size pending sale events, oldest first, in one transaction.
+    Events for a (shop, SKU) without a ShopItem are marked UNMATCHED and change
+    nothing. Returns (events applied or unmatched, ShopItems changed).
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+    with transaction.atomic():
+        pending = SaleEvent.objects.filter(status=SaleEvent.Status.PENDING)
+        boundary = list(
+            pending.order_by("id").values_list("id", flat=True)[batch_size - 1 : batch_size]
+        )
+        last_id = boundary[0] if boundary else pending.aggregate(last=Max("id"))["last"]
+        if last_id is None:
+            return 0, 0
+        batch = pending.filter(id__lte=last_id)
+        totals = {
+            (shop_user_id, sku): total
+            for shop_user_id, sku, total in batch.values("shop_user_id", "sku")
+            .annotate(total=Sum("quantity"))
+            .values_list("shop_user_id", "sku", "total")
+        }
+
+        now = timezone.now()
+        changed, movements = [], []
+        shop_user_ids = {shop_user_id for shop_user_id, _ in totals}
+        skus = sorted({sku for _, sku in totals})
+        for start in range(0, len(skus), LEDGER_BATCH_SIZE):
+            shop_items = ShopItem.objects.filter(
+                shop_user_id__in=shop_user_ids,
+                item_id__in=skus[start : start + LEDGER_BATCH_SIZE],
+            ).only("id", "shop_user", "item", "quantity")
+            for shop_item in shop_items:
+                total = totals.get((shop_item.shop_user_id, shop_item.item_id))
+                if total is None:
+                    continue
+                quantity = max(shop_item.quantity - total, 0)
+                if quantity == shop_item.quantity:
+                    continue
+                movements.append(
+                    (
+                        shop_item.item_id,
+                        shop_item.shop_user_id,
+                        StockMovement.Kind.SALE,
+                        quantity - shop_item.quantity,
+                    )
+                )
+                shop_item.quantity = quantity
+                shop_item.last_updated = now
+                # bulk_update skips save(), so drop the import fingerprint.
+                shop_item.row_hash = None
+                changed.append(shop_item)
+
+        if changed:
+            ShopItem.objects.bulk_update(
+                changed, ["quantity", "last_updated", "row_hash"], batch_size=500
+            )
+            record_movements(movements)
+            refresh_stock_totals({shop_item.item_id for shop_item in changed})
+            DataVersion.bump(DataVersion.SHOP_ITEM)
+        unmatched = batch.filter(
+            ~Exists(
+                ShopItem.objects.filter(
+                    shop_user_id=OuterRef("shop_user_id"), item_id=OuterRef("sku")
+                )
+            )
+        ).update(status=SaleEvent.Status.UNMATCHED, applied_at=now)
+        applied = batch.update(status=SaleEvent.Status.APPLIED, applied_at=now)
+    if unmatched:
+        logger.warning(f"{unmatched} sale events had no matching shop item.")
+    return applied + unmatched, len(changed)
+
+
+def purge_sale_events():
+    """
+    Delete processed sale events older than SALE_EVENT_RETENTION. Returns the
+    number deleted.
+    """
+    cutoff = timezone.now() - SALE_EVENT_RETENTION
+    deleted, _ = SaleEvent.objects.filter(applied_at__lt=cutoff).delete()
+    return deleted
@@ -1,5 +1,16 @@
 from rest_framework import serializers
-from .models import Item, ShopItem, TransferItem
+from .models import (
+    ArchivedTransfer,
+    ImportChange,
+    ImportChangeset,
+    Item,
+    ReorderThreshold,
+    ShopItem,
+    StockAlert,
+    StockTotal,
+    TransferItem,
+    TransferSuggestion,
+)
 from django.contrib.auth.models import User
 import re
 
@@ -11,9 +22,19 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class ItemSerializer(serializers.ModelSerializer):
+    available_quantity = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Item
-        fields = ["sku", "description", "retail_price", "quantity"]
+        fields = [
+            "sku",
+            "description",
+            "retail_price",
+            "quantity",
+            "reserved_quantity",
+            "available_quantity",
+        ]
+        read_only_fields = ["reserved_quantity"]
 
     def validate_quantity(self, value):
         if not re.match(r"^\d+$", str(value)):
@@ -62,3 +83,159 @@ class TransferItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = TransferItem
         fields = ["shop_user", "item", "quantity", "ordered", "last_updated"]
+
+
+class StockTotalSerializer(serializers.ModelSerializer):
+    sku = serializers.CharField(source="item_id")
+    description = serializers.CharField(source="item.description")
+    total_quantity = serializers.SerializerMethodField()
+
+    class Meta:
+        model = StockTotal
+        fields = [
+            "sku",
+            "description",
+            "warehouse_quantity",
+            "shop_quantity",
+            "pending_quantity",
+            "shop_count",
+            "total_quantity",
+            "last_updated",
+        ]
+
+    def get_total_quantity(self, obj):
+        return obj.warehouse_quantity + obj.shop_quantity
+
+
+class StockTotalDetailSerializer(StockTotalSerializer):
+    shops = serializers.SerializerMethodField()
+
+    class Meta(StockTotalSerializer.Meta):
+        fields = StockTotalSerializer.Meta.fields + ["shops"]
+
+    def get_shops(self, obj):
+        return [
+            {"shop_user": username, "quantity": quantity}
+            for username, quantity in ShopItem.objects.filter(
+                item_id=obj.item_id, quantity__gt=0
+            )
+            .order_by("shop_user__username")
+            .values_list("shop_user__username", "quantity")
+        ]
+
+
+class ArchivedTransferSerializer(serializers.ModelSerializer):
+    shop_user = serializers.CharField(source="shop_user.username")
+    status = serializers.CharField(source="get_status_display")
+
+    class Meta:
+        model = ArchivedTransfer
+        fields = [
+            "shop_user",
+            "sku",
+            "quantity",
+            "status",
+            "ordered",
+            "created_at",
+            "completed_at",
+        ]
+
+
+class ReorderThresholdSerializer(serializers.ModelSerializer):
+    sku = serializers.PrimaryKeyRelatedField(source="item", queryset=Item.objects.all())
+    shop_user = serializers.SlugRelatedField(
+        slug_field="username",
+        queryset=User.objects.all(),
+        required=False,
+        allow_null=True,
+    )
+
+    class Meta:
+        model = ReorderThreshold
+        fields = ["id", "sku", "shop_user", "min_quantity", "max_quantity"]
+        # Uniqueness of (item, warehouse) is enforced by a partial constraint.
+        validators = []
+
+    def validate(self, data):
+        item = data.get("item", getattr(self.instance, "item", None))
+        shop_user = data.get("shop_user", getattr(self.instance, "shop_user", None))
+        duplicates = ReorderThreshold.objects.filter(item=item, shop_user=shop_user)
+        if self.instance:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError(
+                "A reorder threshold already exists for this SKU and location."
+            )
+        min_quantity = data.get("min_quantity", getattr(self.instance, "min_quantity", 0))
+        max_quantity = data.get("max_quantity", getattr(self.instance, "max_quantity", None))
+        if max_quantity is not None:
+            if shop_user is None:
+                raise serializers.ValidationError(
+                    "max_quantity only applies to shop reorder thresholds."
+                )
+            if max_quantity < min_quantity:
+                raise serializers.ValidationError(
+                    "max_quantity must not be less than min_quantity."
+                )
+        return data
+
+
+class StockAlertSerializer(serializers.ModelSerializer):
+    sku = serializers.CharField(source="item_id")
+    description = serializers.CharField(source="item.description")
+    shop_user = serializers.CharField(source="shop_user.username", default=None)
+
+    class Meta:
+        model = StockAlert
+        fields = [
+            "id",
+            "sku",
+            "description",
+            "shop_user",
+            "quantity",
+            "threshold",
+            "created_at",
+            "resolved_at",
+            "notified_at",
+        ]
+
+
+class TransferSuggestionSerializer(serializers.ModelSerializer):
+    sku = serializers.CharField(source="item_id")
+    description = serializers.CharField(source="item.description")
+    retail_price = serializers.DecimalField(
+        source="item.retail_price", max_digits=10, decimal_places=2
+    )
+
+    class Meta:
+        model = TransferSuggestion
+        fields = ["id", "sku", "description", "retail_price", "quantity", "created_at"]
+
+
+class ImportChangesetSerializer(serializers.ModelSerializer):
+    created_by = serializers.CharField(source="created_by.username")
+    status = serializers.CharField(source="get_status_display")
+
+    class Meta:
+        model = ImportChangeset
+        fields = [
+            "id",
+            "created_by",
+            "created_at",
+            "applied_at",
+            "status",
+            "allow_deletions",
+            "summary",
+            "row_errors",
+        ]
+
+
+class ImportChangeSerializer(serializers.ModelSerializer):
+    kind = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportChange
+        fields = ["kind", "sku", "shop_user", "before", "after"]
+
+    def get_kind(self, obj):
+        return ImportChange.Kind(obj.kind).name.lower()
@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from stock_manager import edit_lock
+from stock_manager.models import Admin, Item, ShopItem
+from stock_manager.utils import ITEM_HEADERS, ITEM_SHEET, SHOP_SHEET, SpreadsheetTools
+
+
+# Every configured cache, in memory, so tests never touch the cache files in
+# BASE_DIR. Each alias keeps its own store, as the files would.
+TEST_CACHES = {
+    alias: {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": f"stock-manager-tests-{alias}",
+    }
+    for alias in settings.CACHES
+}
+
+
+@override_settings(DATABASE_ROUTERS=[], CACHES=TEST_CACHES)
+class StockTestCase(TestCase):
+    """
+    Base for the stock_manager tests: an Admin row, a manager and a shop user, and
+    empty caches. Cached entries are keyed on data versions that start again at
+    the same numbers and outlive a test's rolled-back transaction, so the caches
+    are cleared before every test. The read-only alias is a second connection
+    that cannot see a test's uncommitted transaction, so reads are not routed to
+    it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Admin.objects.create(id=1, allow_uploads=True)
+        cls.manager = User.objects.create_user("manager", password="x")
+        cls.manager.groups.add(Group.objects.create(name="managers"))
+        cls.shop_user = User.objects.create_user("shop1", password="x")
+        cls.shop_user.groups.add(Group.objects.create(name="shop_users"))
+
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        # The edit lock flag of an in-memory test database lives in this process.
+        edit_lock._State.pid = None
+        self.manager_client = self.client_class()
+        self.manager_client.force_login(self.manager)
+        self.shop_client = self.client_class()
+        self.shop_client.force_login(self.shop_user)
+
+    @staticmethod
+    def make_item(sku, quantity=10, price="1.00", description=None, **kwargs):
+        return Item.objects.create(
+            sku=sku,
+            description=description or f"Item {sku}",
+            retail_price=Decimal(price),
+            quantity=quantity,
+            **kwargs,
+        )
+
+    @staticmethod
+    def make_shop_item(item, shop_user, quantity):
+        return ShopItem.objects.create(item=item, shop_user=shop_user, quantity=quantity)
+
+    @staticmethod
+    def sheets(items=None, shop_items=None):
+        """
+        Parsed workbook sheets as load_sheets() returns them. items are
+        (sku, description, price, quantity) rows, shop_items the same with the
+        shop username appended.
+        """
+        sheets = {}
+        if items is not None:
+            sheets[ITEM_SHEET] = (list(ITEM_HEADERS), [tuple(row) for row in items])
+        if shop_items is not None:
+            sheets[SHOP_SHEET] = (
+                [*ITEM_HEADERS, "Shop User"],
+                [tuple(row) for row in shop_items],
+            )
+        return sheets
+
+    def import_sheets(self, items=None, shop_items=None):
+        return SpreadsheetTools(user=self.manager).import_sheets(
+            self.sheets(items, shop_items)
+        )
@@ -0,0 +1,69 @@
+from stock_manager.models import Admin, StockAlert
+
+from .base import StockTestCase
+
+
+class StockAlertTests(StockTestCase):
+    """
+    Alerts open and resolve as the locations they watch change, including changes
+    to reservations, thresholds and item visibility.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.item = self.make_item("SKU-1", quantity=10)
+        self.make_item("SKU-2", quantity=10)
+        response = self.manager_client.post(
+            "/api/reorder_thresholds/",
+            {"sku": "SKU-1", "min_quantity": 5},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def open_alerts(self):
+        return list(
+            StockAlert.objects.filter(resolved_at__isnull=True).values_list(
+                "item_id", "shop_user_id", "quantity"
+            )
+        )
+
+    def test_reservation_opens_and_cancel_resolves(self):
+        self.assertEqual(self.open_alerts(), [])
+        self.shop_client.post("/api/transfer/", {"sku": "SKU-1", "transfer_quantity": "6"})
+        self.assertEqual(self.open_alerts(), [("SKU-1", None, 4)])
+        self.shop_client.post(
+            "/api/complete-transfer/",
+            {"sku": "SKU-1", "quantity": "6", "shop_user_id": "shop1", "cancel": "true"},
+        )
+        self.assertEqual(self.open_alerts(), [])
+
+    def test_shop_threshold(self):
+        self.make_shop_item(self.item, self.shop_user, 1)
+        self.manager_client.post(
+            "/api/reorder_thresholds/",
+            {"sku": "SKU-1", "shop_user": "shop1", "min_quantity": 2},
+            content_type="application/json",
+        )
+        self.assertEqual(self.open_alerts(), [("SKU-1", self.shop_user.pk, 1)])
+        self.shop_client.post("/api/transfer/", {"sku": "SKU-1", "transfer_quantity": "3"})
+        self.manager_client.post(
+            "/api/complete-transfer/",
+            {"sku": "SKU-1", "quantity": "3", "shop_user_id": "shop1"},
+        )
+        self.assertEqual(self.open_alerts(), [])
+
+    def test_deactivation_by_import_resolves(self):
+        self.manager_client.patch(
+            "/api/items/SKU-1/", {"sku": "SKU-1", "quantity": 2}, content_type="application/json"
+        )
+        self.assertEqual(self.open_alerts(), [("SKU-1", None, 2)])
+        Admin.objects.update(allow_upload_deletions=True)
+        self.import_sheets(items=[("SKU-2", "Item SKU-2", "1.00", 10)])
+        self.assertFalse(type(self.item).objects.get(sku="SKU-1").is_active)
+        self.assertEqual(self.open_alerts(), [])
+
+    def test_removing_the_threshold_resolves(self):
+        self.shop_client.post("/api/transfer/", {"sku": "SKU-1", "transfer_quantity": "6"})
+        threshold_id = self.manager_client.get("/api/reorder_thresholds/").json()["results"][0]["id"]
+        self.manager_client.delete(f"/api/reorder_thresholds/{threshold_id}/")
+        self.assertEqual(self.open_alerts(), [])
@@ -0,0 +1,116 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from stock_manager.inventory import restore_archived_items
+from stock_manager.models import (
+    ArchivedItem,
+    Item,
+    ReorderThreshold,
+    ShopItem,
+    StockMovement,
+    StockTotal,
+)
+
+from .base import StockTestCase
+
+
+class ArchiveTests(StockTestCase):
+    """
+    Long-inactive items nothing refers to move to ArchivedItem, and come back
+    transparently when their SKU is created, edited or imported again.
+    """
+
+    def setUp(self):
+        super().setUp()
+        old = timezone.now() - timedelta(days=200)
+        self.make_item("OLD", quantity=3, price="4.50", description="Old item", is_active=False)
+        self.make_item("RECENT", is_active=False)
+        self.make_item("ACTIVE")
+        shop_stocked = self.make_item("SHOP-STOCKED", is_active=False)
+        self.make_shop_item(shop_stocked, self.shop_user, 1)
+        ReorderThreshold.objects.create(
+            item=self.make_item("THRESHOLD", is_active=False), min_quantity=1
+        )
+        Item.objects.exclude(sku="RECENT").update(last_updated=old)
+
+    def archive(self):
+        call_command("archive_items", days=90, stdout=StringIO())
+
+    def test_only_unreferenced_inactive_items_are_archived(self):
+        out = StringIO()
+        call_command("archive_items", days=90, dry_run=True, stdout=out)
+        self.assertEqual(out.getvalue().strip(), "1 items would be archived.")
+        self.assertTrue(Item.objects.filter(sku="OLD").exists())
+
+        self.archive()
+        self.assertFalse(Item.objects.filter(sku="OLD").exists())
+        self.assertEqual(
+            set(Item.objects.values_list("sku", flat=True)),
+            {"RECENT", "ACTIVE", "SHOP-STOCKED", "THRESHOLD"},
+        )
+        archived = ArchivedItem.objects.get()
+        self.assertEqual(
+            (archived.sku, archived.description, archived.retail_price, archived.quantity),
+            ("OLD", "Old item", Decimal("4.50"), 3),
+        )
+
+    def test_restore_on_create(self):
+        self.archive()
+        response = self.manager_client.post(
+            "/api/items/",
+            {"sku": "OLD", "description": "Back again", "retail_price": "5.00", "quantity": 8},
+        )
+        self.assertEqual(response.status_code, 200)
+        item = Item.objects.get(sku="OLD")
+        self.assertEqual(
+            (item.is_active, item.description, item.retail_price, item.quantity),
+            (True, "Back again", Decimal("5.00"), 8),
+        )
+        self.assertFalse(ArchivedItem.objects.exists())
+        self.assertEqual(StockTotal.objects.get(item_id="OLD").warehouse_quantity, 8)
+        self.assertEqual(
+            StockMovement.objects.get(sku="OLD", kind=StockMovement.Kind.EDIT).delta, 5
+        )
+
+    def test_restore_on_update(self):
+        self.archive()
+        response = self.manager_client.patch(
+            "/api/items/OLD/", {"sku": "OLD", "quantity": 6}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        item = Item.objects.get(sku="OLD")
+        self.assertEqual((item.is_active, item.description, item.quantity), (True, "Old item", 6))
+        self.assertFalse(ArchivedItem.objects.exists())
+        self.assertEqual(StockTotal.objects.get(item_id="OLD").warehouse_quantity, 6)
+
+    def test_restore_on_import(self):
+        self.archive()
+        self.import_sheets(
+            items=[("OLD", "Imported", "4.75", 2), ("ACTIVE", "Item ACTIVE", "1.00", 10)],
+            shop_items=[("OLD", "Imported", "4.75", 5, "shop1")],
+        )
+        item = Item.objects.get(sku="OLD")
+        self.assertEqual(
+            (item.is_active, item.description, item.retail_price, item.quantity),
+            (True, "Imported", Decimal("4.75"), 2),
+        )
+        self.assertFalse(ArchivedItem.objects.exists())
+        self.assertEqual(
+            ShopItem.objects.get(item_id="OLD", shop_user=self.shop_user).quantity, 5
+        )
+        total = StockTotal.objects.get(item_id="OLD")
+        self.assertEqual(
+            (total.warehouse_quantity, total.shop_quantity, total.shop_count), (2, 5, 1)
+        )
+
+    def test_restore_ignores_unknown_skus(self):
+        self.archive()
+        self.assertEqual(restore_archived_items(["NOPE", None, "OLD"]), {"OLD"})
+        item = Item.objects.get(sku="OLD")
+        # Restored as it was archived; callers reactivate it.
+        self.assertEqual((item.is_active, item.quantity), (False, 3))
+        self.assertEqual(restore_archived_items(["OLD"]), set())
@@ -0,0 +1,89 @@
+import time
+
+from django.contrib.auth.models import Group
+from django.utils import timezone
+
+from stock_manager import auth_backends
+from stock_manager.auth_backends import CachedModelBackend
+from stock_manager.roles import MANAGERS, SHOP_USERS, is_manager, is_shop_user
+
+from .base import StockTestCase
+
+
+class CachedModelBackendTests(StockTestCase):
+    """
+    Users and their roles are served from the worker cache until a user, group or
+    membership change, and the next request sees the change.
+    """
+
+    def setUp(self):
+        super().setUp()
+        auth_backends._users.clear()
+        self.backend = CachedModelBackend()
+
+    def get_user(self):
+        return self.backend.get_user(self.manager.pk)
+
+    def assertStaysManager(self):
+        self.assertEqual(self.manager_client.get("/api/cache_stats/").status_code, 200)
+
+    def assertNoLongerManager(self):
+        self.assertEqual(self.manager_client.get("/api/cache_stats/").status_code, 403)
+
+    def test_cached_users_cost_no_queries(self):
+        self.assertTrue(is_manager(self.get_user()))
+        with self.assertNumQueries(0):
+            user = self.get_user()
+            self.assertTrue(is_manager(user))
+        # Each request gets its own instance.
+        self.assertIsNot(user, self.get_user())
+
+    def test_membership_change(self):
+        self.assertStaysManager()
+        self.manager.groups.remove(Group.objects.get(name=MANAGERS))
+        self.assertFalse(is_manager(self.get_user()))
+        self.assertNoLongerManager()
+        self.manager.groups.add(Group.objects.get(name=SHOP_USERS))
+        self.assertTrue(is_shop_user(self.get_user()))
+
+    def test_group_change(self):
+        self.assertStaysManager()
+        group = Group.objects.get(name=MANAGERS)
+        group.name = "former-managers"
+        group.save()
+        self.assertEqual(self.get_user()._roles, frozenset({"former-managers"}))
+        self.assertNoLongerManager()
+        group.delete()
+        self.assertEqual(self.get_user()._roles, frozenset())
+
+    def test_user_change(self):
+        self.get_user()
+        self.manager.first_name = "Renamed"
+        self.manager.save()
+        self.assertEqual(self.get_user().first_name, "Renamed")
+        self.manager.is_active = False
+        self.manager.save()
+        self.assertIsNone(self.get_user())
+
+    def test_last_login_is_ignored(self):
+        self.get_user()
+        self.manager.last_login = timezone.now()
+        self.manager.save(update_fields=["last_login"])
+        with self.assertNumQueries(0):
+            self.get_user()
+
+    def test_rows_cached_before_commit_are_dropped(self):
+        self.get_user()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manager.groups.remove(Group.objects.get(name=MANAGERS))
+            # Another worker reading before the commit still sees the old rows
+            # and caches them under the new generation.
+            user = self.get_user()
+            auth_backends._users[self.manager.pk] = (
+                auth_backends._generation(),
+                time.monotonic(),
+                tuple(getattr(user, f.attname) for f in user._meta.concrete_fields),
+                frozenset({MANAGERS}),
+            )
+            self.assertTrue(is_manager(self.get_user()))
+        self.assertFalse(is_manager(self.get_user()))
@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from stock_manager.models import DataVersion, Item, StockMovement, StockTotal
+
+from .base import StockTestCase
+
+
+class BulkUpdateTests(StockTestCase):
+    """
+    PATCH /api/items/bulk/ applies the valid rows as one write, with the same
+    ledger, StockTotal and version effects as single updates, and reports the
+    rest by index.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.make_item("SKU-1", quantity=10, price="1.00")
+        self.make_item("SKU-2", quantity=5, price="2.00")
+
+    def patch(self, entries, client=None):
+        return (client or self.manager_client).patch(
+            "/api/items/bulk/", entries, content_type="application/json"
+        )
+
+    def test_valid_rows_are_applied(self):
+        version = DataVersion.get_versions(DataVersion.ITEM)
+        response = self.patch(
+            [
+                {"sku": "SKU-1", "quantity": 7, "retail_price": "19.99"},
+                {"sku": "SKU-2", "description": "Renamed"},
+            ]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"updated": ["SKU-1", "SKU-2"], "errors": []})
+        first, second = Item.objects.order_by("sku")
+        self.assertEqual((first.quantity, first.retail_price), (7, Decimal("19.99")))
+        self.assertEqual(str(first.retail_price), "19.99")
+        self.assertEqual((second.quantity, second.description), (5, "Renamed"))
+        self.assertEqual(
+            list(
+                StockMovement.objects.filter(kind=StockMovement.Kind.EDIT).values_list(
+                    "sku", "delta"
+                )
+            ),
+            [("SKU-1", -3)],
+        )
+        self.assertEqual(StockTotal.objects.get(item_id="SKU-1").warehouse_quantity, 7)
+        self.assertNotEqual(DataVersion.get_versions(DataVersion.ITEM), version)
+
+    def test_per_row_errors(self):
+        response = self.patch(
+            {
+                "items": [
+                    {"sku": "SKU-1", "quantity": 4},
+                    {"sku": "SKU-1", "quantity": 2},
+                    {"sku": "NO-SUCH-SKU", "quantity": 1},
+                    {"quantity": 1},
+                    {"sku": "SKU-2", "retail_price": "1.234"},
+                ]
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["updated"], ["SKU-1"])
+        self.assertEqual(
+            [(error["index"], list(error["errors"])) for error in body["errors"]],
+            [(1, ["sku"]), (2, ["sku"]), (3, ["sku"]), (4, ["retail_price"])],
+        )
+        self.assertEqual(body["errors"][0]["errors"]["sku"], ["Duplicate SKU in request."])
+        self.assertEqual(body["errors"][1]["errors"]["sku"], ["Item not found."])
+        self.assertEqual(Item.objects.get(sku="SKU-1").quantity, 4)
+        self.assertEqual(Item.objects.get(sku="SKU-2").retail_price, Decimal("2.00"))
+
+    def test_nothing_valid(self):
+        version = DataVersion.get_versions(DataVersion.ITEM)
+        response = self.patch([{"sku": "NO-SUCH-SKU", "quantity": 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(DataVersion.get_versions(DataVersion.ITEM), version)
+        self.assertEqual(self.patch([]).status_code, 400)
+
+    def test_inactive_items_are_reactivated(self):
+        Item.objects.filter(sku="SKU-2").update(is_active=False)
+        self.patch([{"sku": "SKU-2", "quantity": 6}])
+        self.assertTrue(Item.objects.get(sku="SKU-2").is_active)
+
+    def test_managers_only(self):
+        self.assertEqual(self.patch([{"sku": "SKU-1"}], self.shop_client).status_code, 403)
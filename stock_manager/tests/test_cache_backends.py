@@ -0,0 +1,78 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from stock_manager.cache_backends import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    """
+    cache_total tracks the entry count and size through every write path, and
+    writes evict the least recently used entries to stay within both bounds.
+    """
+
+    def make_cache(self, **options):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = SQLiteCache(os.path.join(directory.name, "cache.sqlite3"), {"OPTIONS": options})
+        self.addCleanup(self.close_pool, cache)
+        return cache
+
+    @staticmethod
+    def close_pool(cache):
+        pool = SQLiteCache._pools.pop(cache._key(), None)
+        while pool is not None and not pool.empty():
+            pool.get_nowait().close()
+
+    def assertTotalsMatch(self, cache):
+        with cache._connection() as connection:
+            actual = connection.execute(
+                "SELECT count(*), total(size) FROM cache_entry"
+            ).fetchone()
+            self.assertEqual(tuple(cache._totals(connection)), actual)
+
+    def test_totals_follow_every_write(self):
+        cache = self.make_cache()
+        cache.set("a", "x" * 10)
+        cache.set("b", "y" * 100)
+        self.assertTotalsMatch(cache)
+        cache.set("a", "x" * 1000)
+        self.assertFalse(cache.add("b", "z"))
+        self.assertTotalsMatch(cache)
+        cache.set("c", 1, timeout=-1)
+        self.assertTrue(cache.add("c", 2))
+        self.assertEqual(cache.get("c"), 2)
+        cache.delete("a")
+        self.assertTotalsMatch(cache)
+        self.assertEqual(cache.stats()["entries"], 2)
+        cache.clear()
+        self.assertEqual(cache.stats()["entries"], 0)
+        self.assertTotalsMatch(cache)
+
+    def test_entry_bound_evicts_least_recently_used(self):
+        cache = self.make_cache(MAX_ENTRIES=10, CULL_FREQUENCY=2)
+        for n in range(25):
+            cache.set(f"key-{n}", n)
+        stats = cache.stats()
+        self.assertLessEqual(stats["entries"], 10)
+        self.assertEqual(cache.get("key-24"), 24)
+        self.assertIsNone(cache.get("key-0"))
+        self.assertTotalsMatch(cache)
+
+    def test_size_bound(self):
+        cache = self.make_cache(MAX_ENTRIES=1000, MAX_SIZE=5000)
+        for n in range(20):
+            cache.set(f"key-{n}", "x" * 1000)
+        self.assertLessEqual(cache.stats()["size_bytes"], 5000)
+        self.assertIsNotNone(cache.get("key-19"))
+        self.assertTotalsMatch(cache)
+
+    def test_expired_entries_are_evicted_first(self):
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        cache.set("old", 1)
+        cache.set("stale", 2, timeout=-1)
+        cache.set("b", 3)
+        cache.set("c", 4)
+        self.assertEqual(cache.get("old"), 1)
+        self.assertEqual(cache.stats()["entries"], 3)
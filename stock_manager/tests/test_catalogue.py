@@ -0,0 +1,113 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from stock_manager.catalogue import apply_operation, filter_items
+from stock_manager.models import DataVersion, Item, StockAlert
+
+from .base import StockTestCase
+
+
+class CatalogueOperationTests(StockTestCase):
+    """
+    Set-based operations give the same prices as Decimal ROUND_HALF_UP, never go
+    below zero or past the description length, and write nothing on a dry run.
+    """
+
+    PRICES = ("0.05", "0.15", "1.05", "2.25", "3.35", "9.99", "10.00")
+
+    def setUp(self):
+        super().setUp()
+        for n, price in enumerate(self.PRICES):
+            self.make_item(f"SKU-{n}", price=price)
+
+    def apply(self, operation, value=None, dry_run=False, **filters):
+        return apply_operation(filter_items(filters), operation, value, dry_run=dry_run)
+
+    def prices(self):
+        return dict(Item.objects.values_list("sku", "retail_price"))
+
+    def expected(self, percent):
+        factor = 1 + Decimal(percent) / 100
+        return {
+            f"SKU-{n}": (Decimal(price) * factor).quantize(Decimal("0.01"), ROUND_HALF_UP)
+            for n, price in enumerate(self.PRICES)
+        }
+
+    def test_percent_rounds_half_up(self):
+        # Several of the prices land on half a penny.
+        for percent in ("10", "-50", "12.5", "-33.33"):
+            with self.subTest(percent=percent):
+                for n, price in enumerate(self.PRICES):
+                    Item.objects.filter(sku=f"SKU-{n}").update(retail_price=Decimal(price))
+                self.apply("price_percent", percent)
+                self.assertEqual(self.prices(), self.expected(percent))
+
+    def test_half_penny_boundaries(self):
+        self.apply("price_percent", "10")
+        prices = self.prices()
+        self.assertEqual(prices["SKU-0"], Decimal("0.06"))  # 0.055
+        self.assertEqual(prices["SKU-2"], Decimal("1.16"))  # 1.155
+        self.assertEqual(prices["SKU-3"], Decimal("2.48"))  # 2.475
+
+    def test_reductions_stop_at_zero(self):
+        self.apply("price_absolute", "-1.00")
+        prices = self.prices()
+        self.assertEqual(prices["SKU-1"], Decimal("0.00"))
+        self.assertEqual(prices["SKU-2"], Decimal("0.05"))
+        self.apply("price_percent", "-100")
+        self.assertEqual(set(self.prices().values()), {Decimal("0.00")})
+        with self.assertRaises(ValueError):
+            self.apply("price_percent", "-100.01")
+        # Nothing left to change.
+        self.assertEqual(self.apply("price_percent", "10")["affected"], 0)
+
+    def test_overlong_suffixes_are_skipped(self):
+        suffix = " (discontinued)"
+        room = Item._meta.get_field("description").max_length - len(suffix)
+        Item.objects.filter(sku="SKU-0").update(description="x" * room)
+        Item.objects.filter(sku="SKU-1").update(description="x" * (room + 1))
+        Item.objects.filter(sku="SKU-2").update(description=f"Old{suffix}")
+        result = self.apply("description_suffix", suffix, sku_prefix="SKU-")
+        self.assertEqual((result["matched"], result["affected"]), (7, 5))
+        descriptions = dict(Item.objects.values_list("sku", "description"))
+        self.assertEqual(descriptions["SKU-0"], "x" * room + suffix)
+        self.assertEqual(descriptions["SKU-1"], "x" * (room + 1))
+        self.assertEqual(descriptions["SKU-2"], f"Old{suffix}")
+
+    def test_deactivate_and_activate_evaluate_alerts(self):
+        self.manager_client.post(
+            "/api/reorder_thresholds/",
+            {"sku": "SKU-0", "min_quantity": 50},
+            content_type="application/json",
+        )
+        open_alerts = StockAlert.objects.filter(resolved_at__isnull=True)
+        self.assertEqual(list(open_alerts.values_list("item_id", flat=True)), ["SKU-0"])
+        self.assertEqual(self.apply("deactivate", sku_prefix="SKU-0")["affected"], 1)
+        self.assertFalse(open_alerts.exists())
+        self.assertEqual(
+            self.apply("activate", sku_prefix="SKU-0", is_active="false")["affected"], 1
+        )
+        self.assertEqual(list(open_alerts.values_list("item_id", flat=True)), ["SKU-0"])
+
+    def test_dry_run_writes_nothing(self):
+        before = self.prices()
+        version = DataVersion.get_versions(DataVersion.ITEM)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.manager_client.post(
+                "/api/items/bulk_operation/",
+                {"operation": "price_percent", "value": "10", "dry_run": True},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            [q["sql"] for q in queries if q["sql"].startswith(("UPDATE", "INSERT", "DELETE"))]
+        )
+        self.assertEqual(self.prices(), before)
+        self.assertEqual(DataVersion.get_versions(DataVersion.ITEM), version)
+
+        preview = {row["sku"]: row["retail_price"] for row in response.data["preview"]}
+        self.assertEqual(preview["SKU-2"], {"old": Decimal("1.05"), "new": Decimal("1.16")})
+        self.apply("price_percent", "10")
+        self.assertEqual({sku: change["new"] for sku, change in preview.items()}, self.prices())
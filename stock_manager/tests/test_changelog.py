@@ -0,0 +1,96 @@
+import json
+
+from django.contrib.auth.models import Group, User
+from django.db.models import F
+
+from stock_manager.models import Item, ShopItem
+
+from .base import StockTestCase
+
+
+class ChangesSinceTests(StockTestCase):
+    """
+    The trigger-maintained change log sends every changed object once, with its
+    current state, whatever write path changed it.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.item = self.make_item("SKU-1", quantity=10)
+        self.make_item("SKU-2", quantity=5)
+        self.shop_item = self.make_shop_item(self.item, self.shop_user, 3)
+        other = User.objects.create_user("shop2", password="x")
+        other.groups.add(Group.objects.get(name="shop_users"))
+        self.make_shop_item(self.item, other, 4)
+
+    def sync(self, cursor=0, client=None, **params):
+        response = (client or self.manager_client).get(
+            "/api/changes_since/", {"cursor": cursor, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        return lines[:-1], lines[-1]
+
+    def keys(self, lines):
+        return [(line["type"], line.get("sku"), line["op"]) for line in lines]
+
+    def test_full_sync_then_nothing(self):
+        lines, end = self.sync()
+        self.assertEqual(
+            self.keys(lines),
+            [
+                ("item", "SKU-1", "upsert"),
+                ("item", "SKU-2", "upsert"),
+                ("shop_item", "SKU-1", "upsert"),
+                ("shop_item", "SKU-1", "upsert"),
+            ],
+        )
+        self.assertEqual(lines[0]["quantity"], 10)
+        self.assertFalse(end["has_more"])
+        self.assertEqual(self.sync(end["cursor"])[0], [])
+
+    def test_every_write_path_is_logged_once(self):
+        _, end = self.sync()
+        Item.objects.filter(sku="SKU-1").update(quantity=F("quantity") - 1)
+        Item.objects.filter(sku="SKU-1").update(description="Renamed")
+        ShopItem.objects.bulk_update([ShopItem(pk=self.shop_item.pk, quantity=9)], ["quantity"])
+        lines, end = self.sync(end["cursor"])
+        self.assertEqual(
+            self.keys(lines), [("item", "SKU-1", "upsert"), ("shop_item", "SKU-1", "upsert")]
+        )
+        self.assertEqual((lines[0]["quantity"], lines[0]["description"]), (9, "Renamed"))
+        self.assertEqual(lines[1]["quantity"], 9)
+
+    def test_unsynced_columns_are_not_logged(self):
+        _, end = self.sync()
+        Item.objects.filter(sku="SKU-1").update(reserved_quantity=4, row_hash=None)
+        self.assertEqual(self.sync(end["cursor"])[0], [])
+
+    def test_deactivation_and_deletion(self):
+        _, end = self.sync()
+        shop_item_id = self.shop_item.pk
+        Item.objects.filter(sku="SKU-2").update(is_active=False)
+        self.shop_item.delete()
+        lines, _ = self.sync(end["cursor"])
+        self.assertEqual(
+            [(line["type"], line["op"]) for line in lines],
+            [("item", "deactivate"), ("shop_item", "delete")],
+        )
+        self.assertEqual(lines[1]["id"], shop_item_id)
+
+    def test_shop_users_get_only_their_own_stock(self):
+        lines, _ = self.sync(client=self.shop_client)
+        shop_lines = [line for line in lines if line["type"] == "shop_item"]
+        self.assertEqual([line["shop_user"] for line in shop_lines], ["shop1"])
+        self.assertEqual(len(lines), 3)
+
+    def test_limit_pages_through_changes(self):
+        seen = []
+        cursor, has_more = 0, True
+        while has_more:
+            lines, end = self.sync(cursor, limit=3)
+            self.assertLessEqual(len(lines), 3)
+            seen.extend(line["seq"] for line in lines)
+            cursor, has_more = end["cursor"], end["has_more"]
+        self.assertEqual(len(seen), 4)
+        self.assertEqual(seen, sorted(set(seen)))
@@ -0,0 +1,106 @@
+from decimal import Decimal
+
+from stock_manager.changesets import StaleChangeset, apply_changeset, create_changeset
+from stock_manager.models import Admin, DataVersion, ImportChange, Item, ShopItem
+from stock_manager.utils import SpreadsheetTools
+
+from .base import StockTestCase
+
+
+class ChangesetTests(StockTestCase):
+    """
+    A dry-run upload stores a diff without writing, and confirming it applies
+    exactly that diff unless a row it touches changed in between.
+    """
+
+    def setUp(self):
+        super().setUp()
+        Admin.objects.update(allow_upload_deletions=True)
+        self.tools = SpreadsheetTools(user=self.manager)
+        self.import_sheets(
+            [("SKU-1", "Widget", "2.50", 10), ("SKU-2", "Gadget", "4.00", 5)],
+            [("SKU-1", "Widget", "2.50", 3, "shop1")],
+        )
+        self.make_item("SKU-3", quantity=1)
+        self.upload = self.sheets(
+            [("SKU-1", "Widget", "2.75", 10), ("SKU-4", "New", "1.00", 2)],
+            [("SKU-4", "New", "1.00", 1, "shop1")],
+        )
+
+    def state(self):
+        return (
+            sorted(Item.objects.values_list("sku", "retail_price", "quantity", "is_active")),
+            sorted(ShopItem.objects.values_list("item_id", "shop_user__username", "quantity")),
+        )
+
+    def test_diff_without_writing(self):
+        before = self.state()
+        changeset = create_changeset(self.tools, self.upload)
+        self.assertEqual(self.state(), before)
+        changes = {
+            (ImportChange.Kind(kind).name, sku, shop_user)
+            for kind, sku, shop_user in changeset.changes.values_list("kind", "sku", "shop_user")
+        }
+        self.assertEqual(
+            changes,
+            {
+                ("UPDATE", "SKU-1", ""),
+                ("CREATE", "SKU-4", ""),
+                ("DEACTIVATE", "SKU-2", ""),
+                ("DEACTIVATE", "SKU-3", ""),
+                ("SHOP_CREATE", "SKU-4", "shop1"),
+                ("SHOP_DELETE", "SKU-1", "shop1"),
+            },
+        )
+        update = changeset.changes.get(kind=ImportChange.Kind.UPDATE)
+        self.assertEqual((update.before, update.after), ({"retail_price": "2.50"}, {"retail_price": "2.75"}))
+
+    def test_apply_runs_the_previewed_import(self):
+        changeset = create_changeset(self.tools, self.upload)
+        apply_changeset(self.tools, changeset)
+        self.assertEqual(
+            self.state(),
+            (
+                [
+                    ("SKU-1", Decimal("2.75"), 10, True),
+                    ("SKU-2", Decimal("4.00"), 5, False),
+                    ("SKU-3", Decimal("1.00"), 1, False),
+                    ("SKU-4", Decimal("1.00"), 2, True),
+                ],
+                [("SKU-4", "shop1", 1)],
+            ),
+        )
+        with self.assertRaisesMessage(StaleChangeset, "already been applied"):
+            apply_changeset(self.tools, changeset)
+
+    def test_unrelated_writes_do_not_block_confirm(self):
+        changeset = create_changeset(self.tools, self.upload)
+        # Neither row is part of the diff's outcome: SKU-3 is deactivated either way.
+        Item.objects.filter(sku="SKU-3").update(description="Renamed", row_hash=None)
+        DataVersion.bump(DataVersion.ITEM, DataVersion.SHOP_ITEM)
+        apply_changeset(self.tools, changeset)
+        self.assertEqual(Item.objects.get(sku="SKU-1").retail_price, Decimal("2.75"))
+
+    def test_changed_rows_refuse_confirm(self):
+        changeset = create_changeset(self.tools, self.upload)
+        item = Item.objects.get(sku="SKU-1")
+        item.quantity = 7
+        item.save()
+        DataVersion.bump(DataVersion.ITEM)
+        with self.assertRaisesMessage(StaleChangeset, "SKU-1"):
+            apply_changeset(self.tools, changeset)
+        self.assertEqual(Item.objects.get(sku="SKU-1").quantity, 7)
+
+    def test_changed_deletion_setting_refuses_confirm(self):
+        changeset = create_changeset(self.tools, self.upload)
+        Admin.objects.update(allow_upload_deletions=False)
+        with self.assertRaises(StaleChangeset):
+            apply_changeset(self.tools, changeset)
+
+    def test_confirm_endpoint_reports_conflicts(self):
+        changeset = create_changeset(self.tools, self.upload)
+        ShopItem.objects.update(quantity=0, row_hash=None)
+        DataVersion.bump(DataVersion.SHOP_ITEM)
+        response = self.manager_client.post(f"/api/import_changesets/{changeset.pk}/confirm/")
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("SKU-1 (shop1)", response.json()["detail"])
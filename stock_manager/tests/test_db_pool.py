@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import tempfile
+
+from django.db import connections
+from django.test import SimpleTestCase
+
+from stock_manager.db_backends.sqlite3.base import DatabaseWrapper
+
+ALIAS = "pool-test"
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """
+    Closed connections go back to the per-process pool, without an open
+    transaction, and the next connect takes them out again.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "pool.sqlite3")
+        self.addCleanup(self.drain)
+
+    def drain(self):
+        pool = DatabaseWrapper._pools.pop((ALIAS, os.getpid()), None)
+        while pool is not None and not pool.empty():
+            pool.get_nowait().close()
+
+    def wrapper(self, **settings):
+        settings_dict = {**connections["default"].settings_dict, "NAME": self.path, **settings}
+        wrapper = DatabaseWrapper(settings_dict, ALIAS)
+        wrapper.ensure_connection()
+        return wrapper
+
+    def pooled(self):
+        return DatabaseWrapper._pools[(ALIAS, os.getpid())].qsize()
+
+    def test_close_returns_and_connect_reuses(self):
+        first = self.wrapper()
+        raw = first.connection
+        first.close()
+        self.assertEqual(self.pooled(), 1)
+        raw.execute("SELECT 1")  # still open
+
+        second = self.wrapper()
+        self.assertIs(second.connection, raw)
+        self.assertEqual(self.pooled(), 0)
+        second.close()
+
+    def test_open_transaction_is_rolled_back(self):
+        first = self.wrapper()
+        with first.cursor() as cursor:
+            cursor.execute("CREATE TABLE t (x INTEGER)")
+        first.connection.execute("BEGIN")
+        first.connection.execute("INSERT INTO t VALUES (1)")
+        first.close()
+
+        second = self.wrapper()
+        self.assertFalse(second.connection.in_transaction)
+        with second.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM t")
+            self.assertEqual(cursor.fetchone(), (0,))
+        second.close()
+
+    def test_full_pool_closes_the_connection(self):
+        first, second = self.wrapper(POOL_SIZE=1), self.wrapper(POOL_SIZE=1)
+        raw = second.connection
+        first.close()
+        second.close()
+        self.assertEqual(self.pooled(), 1)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            raw.execute("SELECT 1")
+
+    def test_pooling_disabled(self):
+        wrapper = self.wrapper(POOL_SIZE=0)
+        raw = wrapper.connection
+        wrapper.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            raw.execute("SELECT 1")
+        # An in-memory database is never pooled (Django keeps it open itself).
+        wrapper = self.wrapper(NAME=":memory:")
+        wrapper.close()
+        self.assertNotIn((ALIAS, os.getpid()), DatabaseWrapper._pools)
@@ -0,0 +1,48 @@
+import tempfile
+
+from stock_manager import edit_lock
+from stock_manager.models import Admin
+
+from .base import StockTestCase
+
+
+class EditLockTests(StockTestCase):
+    """
+    The shared flag follows toggles at once, Admin saves once they commit, and
+    other writes once the database files change.
+    """
+
+    def test_toggle(self):
+        self.assertFalse(edit_lock.is_edit_locked())
+        edit_lock.set_edit_locked(True)
+        self.assertTrue(edit_lock.is_edit_locked())
+        self.assertTrue(Admin.is_edit_locked())
+        edit_lock.set_edit_locked(False)
+        self.assertFalse(edit_lock.is_edit_locked())
+
+    def test_admin_save_syncs_on_commit(self):
+        self.assertFalse(edit_lock.is_edit_locked())
+        admin = Admin.objects.get(id=1)
+        admin.edit_lock = True
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.save()
+            self.assertFalse(edit_lock.is_edit_locked())
+        self.assertTrue(edit_lock.is_edit_locked())
+
+    def test_changed_database_file_is_rechecked(self):
+        self.assertFalse(edit_lock.is_edit_locked())
+        with tempfile.NamedTemporaryFile() as database:
+            edit_lock._State.database = database.name
+            edit_lock._State.signature = edit_lock._signature(database.name)
+            Admin.objects.filter(id=1).update(edit_lock=True)
+
+            # Unchanged files: the flag is trusted.
+            edit_lock._State.checked_at = 0.0
+            self.assertFalse(edit_lock.is_edit_locked())
+
+            database.write(b"x")
+            database.flush()
+            # Within EDIT_LOCK_RECHECK of the last check nothing is stat'ed.
+            self.assertFalse(edit_lock.is_edit_locked())
+            edit_lock._State.checked_at = 0.0
+            self.assertTrue(edit_lock.is_edit_locked())
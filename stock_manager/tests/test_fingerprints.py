@@ -0,0 +1,65 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from stock_manager.models import Item, ShopItem, StockMovement
+
+from .base import StockTestCase
+
+ITEMS = [("SKU-1", "Widget", "2.50", 10), ("SKU-2", "Gadget", "4.00", 5)]
+SHOP_ITEMS = [("SKU-1", "Widget", "2.50", 3, "shop1")]
+
+
+class FingerprintSkipTests(StockTestCase):
+    """
+    A re-upload only writes rows whose content differs from what was last
+    imported or saved.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.import_sheets(ITEMS, SHOP_ITEMS)
+
+    def row_writes(self, items=ITEMS, shop_items=SHOP_ITEMS):
+        tables = (Item._meta.db_table, ShopItem._meta.db_table)
+        with CaptureQueriesContext(connection) as queries:
+            self.import_sheets(items, shop_items)
+        return [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith(("UPDATE", "INSERT"))
+            and any(f'"{table}"' in query["sql"].split("SET")[0] for table in tables)
+        ]
+
+    def test_unchanged_upload_writes_nothing(self):
+        movements = StockMovement.objects.count()
+        self.assertEqual(self.row_writes(), [])
+        self.assertEqual(StockMovement.objects.count(), movements)
+
+    def test_changed_rows_are_written(self):
+        items = [ITEMS[0], ("SKU-2", "Gadget", "4.00", 6)]
+        self.assertEqual(len(self.row_writes(items)), 1)
+        self.assertEqual(Item.objects.get(sku="SKU-2").quantity, 6)
+        self.assertEqual(self.row_writes(items), [])
+
+    def test_writes_outside_save_are_compared_field_by_field(self):
+        Item.objects.filter(sku="SKU-1").update(quantity=1, row_hash=None)
+        ShopItem.objects.update(quantity=0, row_hash=None)
+        self.import_sheets(ITEMS, SHOP_ITEMS)
+        self.assertEqual(Item.objects.get(sku="SKU-1").quantity, 10)
+        self.assertEqual(ShopItem.objects.get().quantity, 3)
+        # Loaded once and re-fingerprinted, the rows are skipped again.
+        self.assertEqual(self.row_writes(), [])
+
+    def test_unchanged_hash_but_stale_fingerprint_is_restored(self):
+        # Same content, but written by a path that clears the fingerprint.
+        Item.objects.filter(sku="SKU-2").update(row_hash=None)
+        self.import_sheets(ITEMS, SHOP_ITEMS)
+        item = Item.objects.get(sku="SKU-2")
+        self.assertEqual(item.row_hash, item.content_fingerprint())
+
+    def test_shop_fingerprints_follow_item_changes(self):
+        items = [("SKU-1", "Widget", "3.00", 10), ITEMS[1]]
+        shop_items = [("SKU-1", "Widget", "3.00", 3, "shop1")]
+        self.import_sheets(items, shop_items)
+        self.assertEqual(self.row_writes(items, shop_items), [])
+        self.assertEqual(str(Item.objects.get(sku="SKU-1").retail_price), "3.00")
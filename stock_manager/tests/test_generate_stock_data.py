@@ -0,0 +1,101 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Sum
+from openpyxl import load_workbook
+
+from stock_manager.models import Item, ShopItem, TransferItem
+
+from .base import StockTestCase
+
+
+class GenerateStockDataTests(StockTestCase):
+    """
+    generate_stock_data builds a consistent synthetic dataset at the requested
+    scale, can be re-run without duplicating rows and can be flushed.
+    """
+
+    def generate(self, **options):
+        options = {
+            "items": 20,
+            "shops": 2,
+            "shop_items_per_shop": 5,
+            "transfers_per_shop": 3,
+            "sku_prefix": "TST",
+            "stdout": StringIO(),
+            **options,
+        }
+        call_command("generate_stock_data", **options)
+
+    def test_creates_requested_rows(self):
+        self.generate()
+        self.assertEqual(Item.objects.filter(sku__startswith="TST-").count(), 20)
+        shops = User.objects.filter(username__startswith="tst_shop_")
+        self.assertEqual(shops.count(), 2)
+        for shop in shops:
+            self.assertTrue(shop.groups.filter(name="shop_users").exists())
+            self.assertFalse(shop.has_usable_password())
+            self.assertEqual(ShopItem.objects.filter(shop_user=shop).count(), 5)
+            self.assertEqual(TransferItem.objects.filter(shop_user=shop).count(), 3)
+
+    def test_reserved_quantity_matches_pending_transfers(self):
+        self.generate()
+        pending = dict(
+            TransferItem.objects.values("item").annotate(total=Sum("quantity")).values_list(
+                "item", "total"
+            )
+        )
+        for sku, reserved in Item.objects.values_list("sku", "reserved_quantity"):
+            self.assertEqual(reserved, pending.get(sku, 0), sku)
+
+    def test_rerun_does_not_duplicate(self):
+        self.generate()
+        self.generate()
+        self.assertEqual(Item.objects.filter(sku__startswith="TST-").count(), 20)
+        self.assertEqual(User.objects.filter(username__startswith="tst_shop_").count(), 2)
+        # transfer_to_shop relies on one TransferItem per (shop_user, item).
+        pairs = list(TransferItem.objects.values_list("shop_user_id", "item_id"))
+        self.assertEqual(len(pairs), len(set(pairs)))
+
+    def test_seed_is_deterministic(self):
+        def snapshot():
+            return list(
+                Item.objects.order_by("sku").values_list("sku", "retail_price", "quantity")
+            )
+
+        self.generate(seed=7)
+        first = snapshot()
+        self.generate(seed=7, flush=True)
+        self.assertEqual(snapshot(), first)
+
+    def test_flush_only_removes_prefixed_rows(self):
+        self.make_item("KEEP-1")
+        self.generate()
+        self.generate(items=3, shops=0, flush=True)
+        self.assertEqual(Item.objects.filter(sku__startswith="TST-").count(), 3)
+        self.assertFalse(User.objects.filter(username__startswith="tst_shop_").exists())
+        self.assertFalse(ShopItem.objects.filter(item__sku__startswith="TST-").exists())
+        self.assertTrue(Item.objects.filter(sku="KEEP-1").exists())
+        self.assertTrue(User.objects.filter(username="shop1").exists())
+
+    def test_writes_upload_workbook(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.generate(xlsx_dir=directory, xlsx_shop_rows=4)
+            workbook = load_workbook(Path(directory) / "tst_upload.xlsx", read_only=True)
+            items = list(workbook["Warehouse Stock"].values)
+            shop_rows = list(workbook["Shop Stock"].values)
+            workbook.close()
+        self.assertEqual(items[0], ("SKU", "Description", "Retail Price", "Quantity"))
+        self.assertEqual(
+            len(items) - 1, Item.objects.filter(sku__startswith="TST-", is_active=True).count()
+        )
+        self.assertEqual(shop_rows[0][0], "Shop User")
+        self.assertEqual(len(shop_rows) - 1, 4)
+
+    def test_rejects_empty_dataset(self):
+        with self.assertRaises(CommandError):
+            self.generate(items=0)
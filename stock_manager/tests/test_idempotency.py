@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from stock_manager.idempotency import IDEMPOTENCY_LEASE
+from stock_manager.models import IdempotencyRecord, TransferItem
+
+from .base import StockTestCase
+
+
+class IdempotencyTests(StockTestCase):
+    """
+    A retried request with the same Idempotency-Key replays the stored response
+    without running the view again.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.make_item("SKU-1", quantity=10)
+
+    def transfer(self, quantity="2", key="key-1"):
+        headers = {"Idempotency-Key": key} if key is not None else {}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.shop_client.post(
+                "/api/transfer/",
+                {"sku": "SKU-1", "transfer_quantity": quantity},
+                headers=headers,
+            )
+        table = TransferItem._meta.db_table
+        response.ran_view = any(table in query["sql"] for query in queries)
+        return response
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.transfer()
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.ran_view)
+        self.assertNotIn("Idempotent-Replayed", first)
+        second = self.transfer()
+        self.assertEqual((second.status_code, second.data), (200, first.data))
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertFalse(second.ran_view)
+        # Other keys, and requests without one, run as usual.
+        self.assertTrue(self.transfer(key="key-2").ran_view)
+        self.assertTrue(self.transfer(key=None).ran_view)
+
+    def test_key_reused_for_a_different_request(self):
+        self.transfer()
+        response = self.transfer(quantity="3")
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(response.ran_view)
+        self.assertEqual(TransferItem.objects.get().quantity, 2)
+
+    def test_request_in_progress(self):
+        self.transfer()
+        # A reserved key without a stored response: the first attempt is running.
+        IdempotencyRecord.objects.update(status_code=None, response_body=None)
+        response = self.transfer()
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.ran_view)
+
+    def test_stale_reservation_is_taken_over(self):
+        self.transfer()
+        # The first attempt's worker died before storing a response.
+        IdempotencyRecord.objects.update(
+            status_code=None,
+            response_body=None,
+            created_at=timezone.now() - IDEMPOTENCY_LEASE - timedelta(seconds=1),
+        )
+        response = self.transfer()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.ran_view)
+        self.assertEqual(IdempotencyRecord.objects.get().status_code, 200)
+        replay = self.transfer()
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+
+    def test_failed_requests_are_not_stored(self):
+        self.assertEqual(self.transfer(quantity="-1").status_code, 400)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+        response = self.transfer()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.ran_view)
+
+    def test_expired_keys_are_reused(self):
+        self.transfer()
+        IdempotencyRecord.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.transfer()
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertTrue(response.ran_view)
+        self.assertGreater(IdempotencyRecord.objects.get().expires_at, timezone.now())
+
+    def test_key_length_is_checked(self):
+        response = self.transfer(key="x" * 300)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TransferItem.objects.exists())
@@ -0,0 +1,67 @@
+from django.db import connection
+
+from stock_manager.models import Item, ShopItem, TransferItem
+from stock_manager.views import apply_ordering
+
+from .base import StockTestCase
+
+
+class OrderingIndexTests(StockTestCase):
+    """
+    Each ordering offered by the list views is served by an index, so SQLite walks
+    the index instead of sorting the table.
+    """
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return " | ".join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, queryset, index):
+        plan = self.query_plan(queryset)
+        self.assertIn(index, plan)
+        self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan)
+
+    def test_item_orderings(self):
+        active = Item.objects.filter(is_active=True)
+        for ordering, index in [
+            (None, "item_active_updated_idx"),
+            ("-last_updated", "item_active_updated_idx"),
+            ("quantity", "item_active_qty_idx"),
+            ("-quantity", "item_active_qty_idx"),
+            ("retail_price", "item_active_price_idx"),
+            ("-retail_price", "item_active_price_idx"),
+            ("description", "item_active_desc_idx"),
+            ("-description", "item_active_desc_idx"),
+        ]:
+            with self.subTest(ordering=ordering):
+                self.assertUsesIndex(apply_ordering(active, ordering)[:25], index)
+
+    def test_inactive_items_do_not_use_partial_indexes(self):
+        plan = self.query_plan(apply_ordering(Item.objects.all(), "quantity"))
+        self.assertNotIn("item_active_qty_idx", plan)
+
+    def test_shop_item_orderings(self):
+        own = ShopItem.objects.filter(shop_user=self.shop_user)
+        for ordering, index in [
+            (None, "shopitem_user_updated_idx"),
+            ("quantity", "shopitem_user_qty_idx"),
+            ("-quantity", "shopitem_user_qty_idx"),
+        ]:
+            with self.subTest(ordering=ordering):
+                self.assertUsesIndex(apply_ordering(own, ordering)[:25], index)
+
+    def test_transfer_item_orderings(self):
+        self.assertUsesIndex(
+            apply_ordering(TransferItem.objects.filter(ordered=True), None)[:25],
+            "xfer_ordered_updated_idx",
+        )
+        self.assertUsesIndex(
+            apply_ordering(TransferItem.objects.filter(shop_user=self.shop_user), None)[:25],
+            "xfer_user_updated_idx",
+        )
+
+    def test_unknown_ordering_falls_back_to_default(self):
+        queryset = apply_ordering(Item.objects.filter(is_active=True), "-row_hash__bogus")
+        self.assertEqual(queryset.query.order_by, ("-last_updated",))
@@ -0,0 +1,79 @@
+from django.db.models import Sum
+from django.utils import timezone
+
+from stock_manager.inventory import stock_at, take_stock_snapshots
+from stock_manager.models import Item, ShopItem, StockMovement, StockSnapshot
+
+from .base import StockTestCase
+
+
+class StockLedgerTests(StockTestCase):
+    """
+    Every quantity change is recorded as a StockMovement, so replaying the ledger
+    gives current and past stock, with or without snapshots.
+    """
+
+    def setUp(self):
+        super().setUp()
+        response = self.manager_client.post(
+            "/api/items/",
+            {"sku": "SKU-1", "description": "Widget", "retail_price": "2.50", "quantity": 10},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.before_dispatch = timezone.now()
+        self.shop_client.post("/api/transfer/", {"sku": "SKU-1", "transfer_quantity": "4"})
+        self.manager_client.post(
+            "/api/complete-transfer/",
+            {"sku": "SKU-1", "quantity": "4", "shop_user_id": "shop1"},
+        )
+
+    def ledger_total(self, shop_user_id):
+        movements = StockMovement.objects.filter(
+            sku="SKU-1", kind__in=StockMovement.STOCK_KINDS
+        )
+        if shop_user_id is None:
+            movements = movements.filter(shop_user_id__isnull=True)
+        else:
+            movements = movements.filter(shop_user_id=shop_user_id)
+        return movements.aggregate(total=Sum("delta"))["total"]
+
+    def test_ledger_replays_to_current_quantities(self):
+        self.assertEqual(Item.objects.get(sku="SKU-1").quantity, 6)
+        self.assertEqual(self.ledger_total(None), 6)
+        shop_item = ShopItem.objects.get(item_id="SKU-1", shop_user=self.shop_user)
+        self.assertEqual(self.ledger_total(self.shop_user.pk), shop_item.quantity)
+
+    def test_transfer_requests_are_not_stock_movements(self):
+        kinds = set(StockMovement.objects.values_list("kind", flat=True))
+        self.assertIn(StockMovement.Kind.TRANSFER, kinds)
+        self.assertNotIn(StockMovement.Kind.TRANSFER, StockMovement.STOCK_KINDS)
+
+    def test_stock_at_from_ledger(self):
+        self.assertEqual(stock_at(self.before_dispatch), {"SKU-1": 10})
+        self.assertEqual(stock_at(timezone.now()), {"SKU-1": 6})
+        self.assertEqual(stock_at(timezone.now(), shop_user_id=self.shop_user.pk), {"SKU-1": 4})
+
+    def test_stock_at_with_snapshots(self):
+        self.assertEqual(take_stock_snapshots(), 2)
+        # Nothing moved since, so nothing to snapshot.
+        self.assertEqual(take_stock_snapshots(), 0)
+        after_snapshot = timezone.now()
+        self.manager_client.patch(
+            "/api/items/SKU-1/",
+            {"sku": "SKU-1", "quantity": 20},
+            content_type="application/json",
+        )
+        self.assertEqual(stock_at(after_snapshot), {"SKU-1": 6})
+        self.assertEqual(stock_at(timezone.now()), {"SKU-1": 20})
+        self.assertEqual(stock_at(self.before_dispatch), {"SKU-1": 10})
+        # Only the warehouse location moved.
+        self.assertEqual(take_stock_snapshots(), 1)
+        self.assertEqual(
+            StockSnapshot.objects.filter(shop_user_id__isnull=True).latest("id").quantity, 20
+        )
+
+    def test_stock_at_endpoint(self):
+        response = self.manager_client.get("/api/stock_at/", {"shop_user": "shop1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["quantities"], {"SKU-1": 4})
+        self.assertEqual(self.shop_client.get("/api/stock_at/").status_code, 403)
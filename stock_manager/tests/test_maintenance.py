@@ -0,0 +1,86 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from stock_manager.changesets import CHANGESET_MAX_AGE
+from stock_manager.idempotency import IDEMPOTENCY_KEY_TTL
+from stock_manager.models import (
+    IdempotencyRecord,
+    ImportChangeset,
+    Item,
+    SaleEvent,
+    ShopItem,
+)
+from stock_manager.sales import SALE_EVENT_RETENTION
+
+from .base import StockTestCase
+
+
+class MaintainDatabaseTests(StockTestCase):
+    """
+    maintain_database removes orphaned shop stock and records past their
+    retention, and leaves everything else alone.
+    """
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        item = self.make_item("SKU-1")
+        self.kept_shop_item = self.make_shop_item(item, self.shop_user, 1)
+        orphan = self.make_shop_item(self.make_item("SKU-2"), self.shop_user, 1)
+        ShopItem.objects.filter(pk=orphan.pk).update(item=None)
+
+        for event_id, applied_at in (
+            ("old", now - SALE_EVENT_RETENTION - timedelta(days=1)),
+            ("recent", now),
+            ("pending", None),
+        ):
+            SaleEvent.objects.create(
+                event_id=event_id,
+                shop_user=self.shop_user,
+                sku="SKU-1",
+                quantity=1,
+                occurred_at=now,
+                applied_at=applied_at,
+            )
+        for key, expires_at in (("expired", now), ("live", now + IDEMPOTENCY_KEY_TTL)):
+            IdempotencyRecord.objects.create(
+                user=self.shop_user, key=key, request_hash="x", expires_at=expires_at
+            )
+        for age in (CHANGESET_MAX_AGE + timedelta(minutes=1), timedelta(0)):
+            changeset = ImportChangeset.objects.create(
+                created_by=self.manager,
+                data_versions={},
+                allow_deletions=False,
+                sheets={},
+                summary={},
+            )
+            ImportChangeset.objects.filter(pk=changeset.pk).update(created_at=now - age)
+
+    def test_housekeeping(self):
+        out = StringIO()
+        call_command("maintain_database", stdout=out)
+        output = out.getvalue()
+        for line in (
+            "orphaned shop items: deleted 1 rows",
+            "expired import changesets: deleted 1 changesets",
+            "processed sale events: deleted 1 events",
+            "expired idempotency keys: deleted 1 records",
+        ):
+            self.assertIn(line, output)
+        self.assertEqual(list(ShopItem.objects.all()), [self.kept_shop_item])
+        self.assertEqual(
+            set(SaleEvent.objects.values_list("event_id", flat=True)), {"recent", "pending"}
+        )
+        self.assertEqual(list(IdempotencyRecord.objects.values_list("key", flat=True)), ["live"])
+        self.assertEqual(ImportChangeset.objects.count(), 1)
+        self.assertEqual(Item.objects.count(), 2)
+
+    def test_second_run_finds_nothing(self):
+        call_command("maintain_database", stdout=StringIO())
+        out = StringIO()
+        call_command("maintain_database", skip_analyze=True, stdout=out)
+        self.assertIn("orphaned shop items: deleted 0 rows", out.getvalue())
+        self.assertNotIn("analyze", out.getvalue())
@@ -0,0 +1,63 @@
+from stock_manager.models import Item, ShopItem, TransferItem
+from stock_manager.views import apply_ordering
+
+from .base import StockTestCase
+
+
+class OrderingTests(StockTestCase):
+    """
+    ?ordering= accepts any concrete, non-relation field (also across relations),
+    sorts text case-insensitively and SKUs naturally, and falls back to the default
+    ordering for anything else.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for sku, description, quantity in (
+            ("SKU-10", "banana", 5),
+            ("SKU-2", "Apple", 7),
+            ("SKU-1", "cherry", 3),
+        ):
+            item = self.make_item(sku, quantity=quantity, description=description)
+            self.make_shop_item(item, self.shop_user, quantity)
+
+    def skus(self, ordering, **kwargs):
+        return [item.sku for item in apply_ordering(Item.objects.all(), ordering, **kwargs)]
+
+    def test_text_fields_ignore_case(self):
+        self.assertEqual(self.skus("description"), ["SKU-2", "SKU-10", "SKU-1"])
+        self.assertEqual(self.skus("-description"), ["SKU-1", "SKU-10", "SKU-2"])
+        self.assertIn("LOWER", str(apply_ordering(Item.objects.all(), "description").query))
+
+    def test_other_fields(self):
+        self.assertEqual(self.skus("quantity"), ["SKU-1", "SKU-10", "SKU-2"])
+        self.assertEqual(self.skus("-quantity"), ["SKU-2", "SKU-10", "SKU-1"])
+
+    def test_natural_sku_order(self):
+        key = {"natural_sort_key": lambda item: item.sku}
+        self.assertEqual(self.skus("sku", **key), ["SKU-1", "SKU-2", "SKU-10"])
+        self.assertEqual(self.skus("-sku", **key), ["SKU-10", "SKU-2", "SKU-1"])
+
+    def test_related_paths(self):
+        shop_items = apply_ordering(ShopItem.objects.all(), "-item__description")
+        self.assertEqual([s.item_id for s in shop_items], ["SKU-1", "SKU-10", "SKU-2"])
+
+    def test_unknown_and_relation_fields_fall_back(self):
+        Item.objects.filter(sku="SKU-2").update(last_updated="2020-01-01T00:00:00Z")
+        default = self.skus(None)
+        self.assertEqual(default[-1], "SKU-2")
+        for ordering in ("nope", "-nope", "description__nope", "stock_total", "shopitem"):
+            with self.subTest(ordering=ordering):
+                self.assertEqual(self.skus(ordering), default)
+        transfers = apply_ordering(TransferItem.objects.all(), "shop_user", default="-created_at")
+        self.assertEqual(transfers.query.order_by, ("-created_at",))
+
+    def test_list_endpoint(self):
+        response = self.manager_client.get("/api/items/", {"ordering": "-description"})
+        self.assertEqual(
+            [row["sku"] for row in response.json()["results"]], ["SKU-1", "SKU-10", "SKU-2"]
+        )
+        response = self.manager_client.get("/api/items/", {"ordering": "sku"})
+        self.assertEqual(
+            [row["sku"] for row in response.json()["results"]], ["SKU-1", "SKU-2", "SKU-10"]
+        )
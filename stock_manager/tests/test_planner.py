@@ -0,0 +1,88 @@
+import numpy as np
+from django.contrib.auth.models import Group, User
+from django.test import SimpleTestCase
+
+from stock_manager.models import Item, ReorderThreshold, StockTotal, TransferItem, TransferSuggestion
+from stock_manager.planner import allocate, plan_replenishment
+
+from .base import StockTestCase
+
+
+class AllocateTests(SimpleTestCase):
+    def allocate(self, need, sku_index, available):
+        return allocate(
+            np.array(need, dtype=np.int64),
+            np.array(sku_index, dtype=np.int64),
+            np.array(available, dtype=np.int64),
+        ).tolist()
+
+    def test_full_need_when_stock_allows(self):
+        self.assertEqual(self.allocate([4, 4, 2], [0, 0, 0], [20]), [4, 4, 2])
+
+    def test_shortage_goes_to_largest_remainders(self):
+        # Shares of 7 are 2.8, 2.8 and 1.4: floors give 5, the two .8s get the rest.
+        self.assertEqual(self.allocate([4, 4, 2], [0, 0, 0], [7]), [3, 3, 1])
+
+    def test_skus_are_allocated_independently(self):
+        self.assertEqual(
+            self.allocate([4, 4, 2, 5, 5], [0, 0, 0, 1, 1], [7, 20]), [3, 3, 1, 5, 5]
+        )
+
+    def test_negative_availability_allocates_nothing(self):
+        self.assertEqual(self.allocate([3, 1], [0, 0], [-2]), [0, 0])
+
+    def test_allocation_invariants(self):
+        rng = np.random.default_rng(7)
+        for _ in range(50):
+            n_skus = int(rng.integers(1, 6))
+            sku_index = rng.integers(0, n_skus, size=40)
+            need = rng.integers(0, 30, size=40)
+            available = rng.integers(-5, 200, size=n_skus)
+            allocation = allocate(need, sku_index, available)
+            demand = np.bincount(sku_index, weights=need, minlength=n_skus)
+            supply = np.minimum(np.maximum(available, 0), demand)
+            self.assertTrue((allocation >= 0).all())
+            self.assertTrue((allocation <= need).all())
+            np.testing.assert_array_equal(
+                np.bincount(sku_index, weights=allocation, minlength=n_skus), supply
+            )
+
+
+class PlannerTests(StockTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user("shop2", password="x")
+        self.other.groups.add(Group.objects.get(name="shop_users"))
+        item = self.make_item("SKU-1", quantity=10)
+        self.make_shop_item(item, self.other, 1)
+        for shop_user in (self.shop_user, self.other):
+            ReorderThreshold.objects.create(
+                item=item, shop_user=shop_user, min_quantity=2, max_quantity=10
+            )
+
+    def test_plan_shares_a_short_sku(self):
+        summary = plan_replenishment()
+        self.assertEqual((summary["suggestions"], summary["units"], summary["short_skus"]), (2, 10, 1))
+        # Needs of 10 and 9 for 10 units: shares 5.26 and 4.74.
+        self.assertEqual(
+            dict(TransferSuggestion.objects.values_list("shop_user__username", "quantity")),
+            {"shop1": 5, "shop2": 5},
+        )
+
+    def test_pending_transfers_count_towards_the_position(self):
+        self.shop_client.post("/api/transfer/", {"sku": "SKU-1", "transfer_quantity": "3"})
+        plan_replenishment()
+        # shop1 is above its minimum now; shop2 needs 9 of the 7 still available.
+        self.assertEqual(
+            dict(TransferSuggestion.objects.values_list("shop_user__username", "quantity")),
+            {"shop2": 7},
+        )
+
+    def test_accept_moves_suggestions_into_the_basket(self):
+        plan_replenishment()
+        response = self.shop_client.post("/api/transfer_suggestions/accept/")
+        self.assertEqual(response.json(), {"accepted": ["SKU-1"], "skipped": []})
+        self.assertEqual(TransferItem.objects.get(shop_user=self.shop_user).quantity, 5)
+        self.assertEqual(Item.objects.get(sku="SKU-1").reserved_quantity, 5)
+        self.assertEqual(StockTotal.objects.get(item_id="SKU-1").pending_quantity, 5)
+        self.assertFalse(TransferSuggestion.objects.filter(shop_user=self.shop_user).exists())
@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import Group, User
+
+from .base import StockTestCase
+
+
+class StockValueReportTests(StockTestCase):
+    """
+    /api/reports/stock_value/ values active stock at retail price in the
+    warehouse and each shop, optionally by SKU prefix, and follows every write.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user("shop2", password="x")
+        self.other.groups.add(Group.objects.get(name="shop_users"))
+        a1 = self.make_item("A1", quantity=3, price="2.50")
+        self.make_item("A2", quantity=0, price="1.00")
+        b1 = self.make_item("B1", quantity=2, price="1.25")
+        inactive = self.make_item("C1", quantity=10, price="1.00", is_active=False)
+        self.make_shop_item(a1, self.shop_user, 4)
+        self.make_shop_item(inactive, self.shop_user, 5)
+        self.make_shop_item(b1, self.other, 1)
+
+    def report(self, client=None, **params):
+        response = (client or self.manager_client).get("/api/reports/stock_value/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    @staticmethod
+    def summary(skus, units, value):
+        return {"skus": skus, "units": units, "value": Decimal(value)}
+
+    def test_totals(self):
+        report = self.report()
+        self.assertEqual(report["warehouse"], self.summary(2, 5, "10.00"))
+        self.assertEqual(
+            report["shops"],
+            {"shop1": self.summary(1, 4, "10.00"), "shop2": self.summary(1, 1, "1.25")},
+        )
+        self.assertEqual(report["overall"], {"units": 10, "value": Decimal("21.25")})
+
+    def test_prefix_breakdown(self):
+        report = self.report(prefix_length=1)
+        self.assertEqual(
+            report["warehouse"]["by_prefix"],
+            {"A": self.summary(1, 3, "7.50"), "B": self.summary(1, 2, "2.50")},
+        )
+        self.assertEqual(report["shops"]["shop1"]["by_prefix"], {"A": self.summary(1, 4, "10.00")})
+        self.assertEqual(report["shops"]["shop2"]["by_prefix"], {"B": self.summary(1, 1, "1.25")})
+
+    def test_single_shop(self):
+        expected = {**self.summary(1, 4, "10.00"), "shop_user": "shop1"}
+        self.assertEqual(self.report(shop_user="shop1"), expected)
+        self.assertEqual(self.report(self.shop_client), expected)
+        # Shop users cannot ask for another shop.
+        self.assertEqual(self.report(self.shop_client, shop_user="shop2"), expected)
+        self.assertEqual(
+            self.report(self.shop_client, prefix_length=2)["by_prefix"],
+            {"A1": self.summary(1, 4, "10.00")},
+        )
+
+    def test_bad_parameters(self):
+        for params in ({"prefix_length": "0"}, {"prefix_length": "x"}, {"shop_user": "nobody"}):
+            with self.subTest(params=params):
+                response = self.manager_client.get("/api/reports/stock_value/", params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_writes_invalidate_the_cached_report(self):
+        self.assertEqual(self.report()["warehouse"]["units"], 5)
+        self.manager_client.patch(
+            "/api/items/B1/", {"sku": "B1", "quantity": 6}, content_type="application/json"
+        )
+        report = self.report()
+        self.assertEqual(report["warehouse"], self.summary(2, 9, "15.00"))
+        self.assertEqual(report["overall"]["value"], Decimal("26.25"))
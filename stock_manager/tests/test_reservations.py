@@ -0,0 +1,114 @@
+from django.contrib.auth.models import Group, User
+
+from stock_manager.inventory import refresh_reserved_quantities
+from stock_manager.models import Item
+
+from .base import StockTestCase
+
+
+class ReservationTests(StockTestCase):
+    """
+    Item.reserved_quantity always equals the quantity of the SKU's pending
+    transfers, and requests are checked against the unreserved quantity.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.item = self.make_item("SKU-1", quantity=10)
+
+    def request(self, client, quantity):
+        return client.post(
+            "/api/transfer/", {"sku": "SKU-1", "transfer_quantity": str(quantity)}
+        )
+
+    def reserved(self):
+        return Item.objects.get(sku="SKU-1").reserved_quantity
+
+    def test_request_reserves_and_replaces(self):
+        self.assertEqual(self.request(self.shop_client, 4).status_code, 200)
+        self.assertEqual(self.reserved(), 4)
+        # A new request from the same shop replaces its pending one.
+        self.assertEqual(self.request(self.shop_client, 7).status_code, 200)
+        self.assertEqual(self.reserved(), 7)
+        self.assertEqual(Item.objects.get(sku="SKU-1").available_quantity, 3)
+
+    def other_shop(self):
+        other = User.objects.create_user("shop2", password="x")
+        other.groups.add(Group.objects.get(name="shop_users"))
+        other_client = self.client_class()
+        other_client.force_login(other)
+        return other_client
+
+    def complete(self, shop, quantity):
+        return self.manager_client.post(
+            "/api/complete-transfer/",
+            {"sku": "SKU-1", "quantity": str(quantity), "shop_user_id": shop},
+        )
+
+    def test_other_shops_reservations_limit_requests(self):
+        other_client = self.other_shop()
+        self.assertEqual(self.request(self.shop_client, 8).status_code, 200)
+        response = self.request(other_client, 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["detail"], "Not enough stock to transfer")
+        self.assertEqual(self.request(other_client, 2).status_code, 200)
+        self.assertEqual(self.reserved(), 10)
+
+    def test_dispatch_cannot_take_other_shops_reservations(self):
+        other_client = self.other_shop()
+        self.request(self.shop_client, 4)
+        self.request(other_client, 6)
+        response = self.complete("shop1", 5)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["detail"], "Not enough stock to transfer")
+        item = Item.objects.get(sku="SKU-1")
+        self.assertEqual((item.quantity, item.reserved_quantity), (10, 10))
+
+        self.assertEqual(self.complete("shop1", 4).status_code, 200)
+        self.assertEqual(self.complete("shop2", 6).status_code, 200)
+        item = Item.objects.get(sku="SKU-1")
+        self.assertEqual((item.quantity, item.reserved_quantity), (0, 0))
+
+    def test_cancel_and_dispatch_release_the_reservation(self):
+        self.request(self.shop_client, 4)
+        self.shop_client.post(
+            "/api/complete-transfer/",
+            {"sku": "SKU-1", "quantity": "4", "shop_user_id": "shop1", "cancel": "true"},
+        )
+        self.assertEqual(self.reserved(), 0)
+
+        self.request(self.shop_client, 5)
+        self.manager_client.post(
+            "/api/complete-transfer/",
+            {"sku": "SKU-1", "quantity": "5", "shop_user_id": "shop1"},
+        )
+        item = Item.objects.get(sku="SKU-1")
+        self.assertEqual((item.quantity, item.reserved_quantity), (5, 0))
+
+    def test_save_does_not_overwrite_reservations(self):
+        stale = Item.objects.get(sku="SKU-1")
+        self.request(self.shop_client, 4)
+        stale.description = "Renamed"
+        stale.save()
+        self.assertEqual(self.reserved(), 4)
+
+    def test_refresh_recomputes_from_pending_transfers(self):
+        self.request(self.shop_client, 4)
+        Item.objects.filter(sku="SKU-1").update(reserved_quantity=99)
+        refresh_reserved_quantities(["SKU-1"])
+        self.assertEqual(self.reserved(), 4)
+
+    def test_shop_and_transfer_items_are_read_only(self):
+        self.request(self.shop_client, 4)
+        self.make_shop_item(self.item, self.shop_user, 2)
+        for path in ("/api/shop_items/SKU-1/", "/api/transfer_items/SKU-1/"):
+            with self.subTest(path=path):
+                self.assertEqual(self.shop_client.get(path).status_code, 200)
+                self.assertEqual(self.shop_client.delete(path).status_code, 405)
+                self.assertEqual(
+                    self.shop_client.put(
+                        path, {"quantity": 1}, content_type="application/json"
+                    ).status_code,
+                    405,
+                )
+        self.assertEqual(self.reserved(), 4)
@@ -0,0 +1,79 @@
+from django.contrib.auth.models import Group, User
+
+from stock_manager.models import Admin, Item
+
+from .base import StockTestCase
+
+
+class ResponseCacheTests(StockTestCase):
+    """
+    Cached list and retrieve responses are shared only within their scope, and
+    keyed on the query, the page size and the data versions.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for n in range(3):
+            item = self.make_item(f"SKU-{n}", quantity=10)
+            self.make_shop_item(item, self.shop_user, n + 1)
+        self.other = User.objects.create_user("shop2", password="x")
+        self.other.groups.add(Group.objects.get(name="shop_users"))
+        self.other_client = self.client_class()
+        self.other_client.force_login(self.other)
+        self.make_shop_item(Item.objects.get(sku="SKU-0"), self.other, 9)
+
+    def get(self, client, path, **params):
+        response = client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response["X-Cache"], response.json()
+
+    def test_hit_until_a_write(self):
+        self.assertEqual(self.get(self.shop_client, "/api/items/")[0], "MISS")
+        cache, body = self.get(self.manager_client, "/api/items/")
+        # Items are the same for everyone.
+        self.assertEqual(cache, "HIT")
+        self.manager_client.patch(
+            "/api/items/SKU-1/", {"sku": "SKU-1", "quantity": 4}, content_type="application/json"
+        )
+        cache, body = self.get(self.shop_client, "/api/items/")
+        self.assertEqual(cache, "MISS")
+        self.assertIn(4, [row["quantity"] for row in body["results"]])
+
+    def test_query_parameters_are_normalised(self):
+        self.get(self.shop_client, "/api/items/", search="SKU", ordering="sku")
+        self.assertEqual(
+            self.get(self.shop_client, "/api/items/?ordering=sku&search=SKU&page_size=")[0],
+            "HIT",
+        )
+        self.assertEqual(self.get(self.shop_client, "/api/items/", search="SKU-1")[0], "MISS")
+
+    def test_shop_stock_is_cached_per_user(self):
+        cache, mine = self.get(self.shop_client, "/api/shop_items/")
+        self.assertEqual(cache, "MISS")
+        cache, theirs = self.get(self.other_client, "/api/shop_items/")
+        self.assertEqual(cache, "MISS")
+        self.assertEqual(len(mine["results"]), 3)
+        self.assertEqual(len(theirs["results"]), 1)
+        self.assertEqual(self.get(self.shop_client, "/api/shop_items/")[0], "HIT")
+
+    def test_managers_share_transfer_lists(self):
+        self.shop_client.post("/api/transfer/", {"sku": "SKU-0", "transfer_quantity": "1"})
+        self.assertEqual(
+            self.shop_client.post("/api/submit-transfer-request/").status_code, 200
+        )
+        second_manager = User.objects.create_user("manager2", password="x")
+        second_manager.groups.add(Group.objects.get(name="managers"))
+        second_client = self.client_class()
+        second_client.force_login(second_manager)
+        cache, body = self.get(self.manager_client, "/api/transfer_items/")
+        self.assertEqual((cache, len(body["results"])), ("MISS", 1))
+        self.assertEqual(self.get(second_client, "/api/transfer_items/")[0], "HIT")
+        self.assertEqual(self.get(self.other_client, "/api/transfer_items/")[0], "MISS")
+
+    def test_page_size_setting_is_part_of_the_key(self):
+        Admin.objects.update(records_per_page=2)
+        cache, body = self.get(self.shop_client, "/api/items/")
+        self.assertEqual((cache, len(body["results"])), ("MISS", 2))
+        Admin.objects.update(records_per_page=25)
+        cache, body = self.get(self.shop_client, "/api/items/")
+        self.assertEqual((cache, len(body["results"])), ("MISS", 3))
@@ -0,0 +1,58 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from stock_manager.models import Item
+from stock_manager.routers import READ_ALIAS, ReadReplicaMixin, ReadWriteRouter, read_replica
+
+
+class ReadWriteRouterTests(SimpleTestCase):
+    """
+    Reads go to the read-only alias only inside read_replica(), and only for the
+    current context; writes and migrations always use "default".
+    """
+
+    router = ReadWriteRouter()
+
+    def test_reads_inside_the_block(self):
+        self.assertIsNone(self.router.db_for_read(Item))
+        with read_replica():
+            self.assertEqual(self.router.db_for_read(Item), READ_ALIAS)
+            with read_replica():
+                pass
+            self.assertEqual(self.router.db_for_read(Item), READ_ALIAS)
+            self.assertEqual(self.router.db_for_write(Item), "default")
+        self.assertIsNone(self.router.db_for_read(Item))
+
+    def test_block_does_not_leak_to_other_threads(self):
+        seen = []
+        with read_replica():
+            thread = threading.Thread(target=lambda: seen.append(self.router.db_for_read(Item)))
+            thread.start()
+            thread.join()
+        self.assertEqual(seen, [None])
+
+    def test_no_migrations_on_the_read_alias(self):
+        self.assertFalse(self.router.allow_migrate(READ_ALIAS, "stock_manager"))
+        self.assertTrue(self.router.allow_migrate("default", "stock_manager"))
+
+    def test_mixin_routes_list_and_retrieve(self):
+        router = self.router
+
+        class View:
+            def list(self, request):
+                return router.db_for_read(Item)
+
+            retrieve = list
+
+            def create(self, request):
+                return router.db_for_read(Item)
+
+        class RoutedView(ReadReplicaMixin, View):
+            pass
+
+        view = RoutedView()
+        self.assertEqual(view.list(None), READ_ALIAS)
+        self.assertEqual(view.retrieve(None), READ_ALIAS)
+        self.assertIsNone(view.create(None))
+        self.assertIsNone(router.db_for_read(Item))
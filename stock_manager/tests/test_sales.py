@@ -0,0 +1,94 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Sum
+
+from stock_manager.models import SaleEvent, ShopItem, StockMovement
+from stock_manager.sales import apply_sales
+
+from .base import StockTestCase
+
+TS = "2026-01-05T10:00:00Z"
+
+
+class SalesTests(StockTestCase):
+    """
+    Sale events are stored once per event_id and applied later, summed per
+    (shop, SKU), as one quantity change and one ledger row each.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.item = self.make_item("SKU-1", quantity=20)
+        self.shop_item = self.make_shop_item(self.item, self.shop_user, 10)
+
+    def post(self, events, client=None):
+        return (client or self.shop_client).post(
+            "/api/sales/", events, content_type="application/json"
+        )
+
+    def event(self, event_id, qty, sku="SKU-1"):
+        return {"event_id": event_id, "sku": sku, "qty": qty, "ts": TS}
+
+    def test_resent_events_are_counted_as_duplicates(self):
+        response = self.post([self.event("e1", 2), self.event("e2", 1), self.event("e1", 2)])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.data["accepted"], response.data["duplicates"]), (2, 1))
+        response = self.post({"events": [self.event("e2", 1), self.event("e3", 1)]})
+        self.assertEqual((response.data["accepted"], response.data["duplicates"]), (1, 1))
+        self.assertEqual(SaleEvent.objects.count(), 3)
+        # Nothing touches stock on the request path.
+        self.shop_item.refresh_from_db()
+        self.assertEqual(self.shop_item.quantity, 10)
+
+    def test_invalid_events_are_reported_by_index(self):
+        bad = {**self.event("e2", 0), "shop": "someone-else"}
+        response = self.post([self.event("e1", 1), bad])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["accepted"], 1)
+        [error] = response.data["errors"]
+        self.assertEqual(error["index"], 1)
+        self.assertEqual(set(error["errors"]), {"qty", "shop"})
+        self.assertEqual(self.post([bad]).status_code, 400)
+
+    def test_apply_sums_per_shop_item(self):
+        self.post([self.event("e1", 3), self.event("e2", 2), self.event("e3", -1)])
+        self.post([self.event("e4", 5, sku="NO-SUCH-SKU")])
+        with self.assertLogs("stock_manager.sales", "WARNING"):
+            self.assertEqual(apply_sales(), (4, 1))
+        self.shop_item.refresh_from_db()
+        self.assertEqual(self.shop_item.quantity, 6)
+        sales = StockMovement.objects.filter(kind=StockMovement.Kind.SALE)
+        self.assertEqual(list(sales.values_list("sku", "delta")), [("SKU-1", -4)])
+        self.assertEqual(
+            SaleEvent.objects.filter(status=SaleEvent.Status.UNMATCHED).count(), 1
+        )
+        self.assertEqual(apply_sales(), (0, 0))
+
+    def test_quantity_stops_at_zero(self):
+        self.post([self.event("e1", 25)])
+        apply_sales()
+        self.assertEqual(ShopItem.objects.get(pk=self.shop_item.pk).quantity, 0)
+        total = StockMovement.objects.filter(kind=StockMovement.Kind.SALE).aggregate(
+            total=Sum("delta")
+        )["total"]
+        self.assertEqual(total, -10)
+
+    def test_batches_apply_oldest_first(self):
+        self.post([self.event(f"e{n}", 1) for n in range(5)])
+        self.assertEqual(apply_sales(batch_size=2), (2, 1))
+        self.assertEqual(
+            list(
+                SaleEvent.objects.filter(status=SaleEvent.Status.PENDING)
+                .order_by("id")
+                .values_list("event_id", flat=True)
+            ),
+            ["e2", "e3", "e4"],
+        )
+        self.assertEqual(apply_sales(batch_size=3), (3, 1))
+        self.assertEqual(ShopItem.objects.get(pk=self.shop_item.pk).quantity, 5)
+
+    def test_batch_size_must_be_positive(self):
+        with self.assertRaisesMessage(ValueError, "batch_size must be at least 1."):
+            apply_sales(batch_size=0)
+        with self.assertRaisesMessage(CommandError, "--batch-size must be at least 1."):
+            call_command("apply_sales", batch_size=0)
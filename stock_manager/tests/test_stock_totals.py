@@ -0,0 +1,83 @@
+from stock_manager.inventory import refresh_stock_totals
+from stock_manager.models import StockTotal
+
+from .base import StockTestCase
+
+
+class StockTotalTests(StockTestCase):
+    """
+    StockTotal is kept in step by every write path, and always equals a rebuild
+    from Item, ShopItem and TransferItem.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.item = self.make_item("SKU-1", quantity=10)
+        self.make_shop_item(self.item, self.shop_user, 3)
+        refresh_stock_totals()
+
+    def totals(self):
+        return {
+            row["item_id"]: row
+            for row in StockTotal.objects.values(
+                "item_id", "warehouse_quantity", "shop_quantity", "pending_quantity", "shop_count"
+            )
+        }
+
+    def assertMatchesRebuild(self):
+        maintained = self.totals()
+        StockTotal.objects.all().delete()
+        refresh_stock_totals()
+        self.assertEqual(maintained, self.totals())
+
+    def test_transfer_request_and_dispatch(self):
+        response = self.shop_client.post(
+            "/api/transfer/", {"sku": "SKU-1", "transfer_quantity": "4"}
+        )
+        self.assertEqual(response.status_code, 200)
+        total = StockTotal.objects.get(item_id="SKU-1")
+        self.assertEqual(
+            (total.warehouse_quantity, total.shop_quantity, total.pending_quantity),
+            (10, 3, 4),
+        )
+        self.assertMatchesRebuild()
+
+        response = self.manager_client.post(
+            "/api/complete-transfer/",
+            {"sku": "SKU-1", "quantity": "4", "shop_user_id": "shop1"},
+        )
+        self.assertEqual(response.status_code, 200)
+        total = StockTotal.objects.get(item_id="SKU-1")
+        self.assertEqual(
+            (total.warehouse_quantity, total.shop_quantity, total.pending_quantity),
+            (6, 7, 0),
+        )
+        self.assertEqual(total.shop_count, 1)
+        self.assertMatchesRebuild()
+
+    def test_cancelled_request_releases_pending_quantity(self):
+        self.shop_client.post("/api/transfer/", {"sku": "SKU-1", "transfer_quantity": "4"})
+        response = self.shop_client.post(
+            "/api/complete-transfer/",
+            {"sku": "SKU-1", "quantity": "4", "shop_user_id": "shop1", "cancel": "true"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(StockTotal.objects.get(item_id="SKU-1").pending_quantity, 0)
+        self.assertMatchesRebuild()
+
+    def test_item_edit_updates_warehouse_quantity(self):
+        response = self.manager_client.patch(
+            "/api/items/SKU-1/",
+            {"sku": "SKU-1", "quantity": 25},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(StockTotal.objects.get(item_id="SKU-1").warehouse_quantity, 25)
+        self.assertMatchesRebuild()
+
+    def test_api_is_for_managers_and_lists_shops(self):
+        self.assertEqual(self.shop_client.get("/api/stock_totals/").status_code, 403)
+        response = self.manager_client.get("/api/stock_totals/SKU-1/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total_quantity"], 13)
+        self.assertEqual(response.json()["shops"], [{"shop_user": "shop1", "quantity": 3}])
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+from django.contrib.auth.models import Group, User
+
+from stock_manager.models import ArchivedTransfer
+
+from .base import StockTestCase
+
+COMPLETED = ArchivedTransfer.Status.COMPLETED
+CANCELLED = ArchivedTransfer.Status.CANCELLED
+
+
+def at(year, month, day, hour=12, minute=0):
+    return datetime(year, month, day, hour, minute, tzinfo=timezone.utc)
+
+
+class TransferHistoryTests(StockTestCase):
+    """
+    /api/transfer_history/ filters by shop, SKU, status, month and inclusive date
+    range, alone or combined, and shop users only see their own transfers.
+    """
+
+    def setUp(self):
+        super().setUp()
+        other = User.objects.create_user("shop2", password="x")
+        other.groups.add(Group.objects.get(name="shop_users"))
+        rows = [
+            # (shop user, sku, status, completed_at)
+            (self.shop_user, "SKU-1", COMPLETED, at(2026, 1, 31, 23, 30)),
+            (self.shop_user, "SKU-2", CANCELLED, at(2026, 2, 1, 0, 10)),
+            (self.shop_user, "SKU-1", COMPLETED, at(2026, 2, 15)),
+            (other, "SKU-1", CANCELLED, at(2026, 2, 28, 23, 59)),
+            (other, "SKU-2", COMPLETED, at(2026, 3, 1)),
+        ]
+        # Each row's quantity is its position + 1, to tell rows apart.
+        for position, (shop_user, sku, status, completed_at) in enumerate(rows):
+            ArchivedTransfer.objects.create(
+                shop_user=shop_user,
+                sku=sku,
+                quantity=position + 1,
+                status=status,
+                created_at=completed_at,
+                completed_at=completed_at,
+                completed_month=completed_at.year * 100 + completed_at.month,
+            )
+
+    def history(self, client=None, **params):
+        response = (client or self.manager_client).get("/api/transfer_history/", params)
+        self.assertEqual(response.status_code, 200)
+        return [row["quantity"] - 1 for row in response.json()["results"]]
+
+    def test_newest_first(self):
+        self.assertEqual(self.history(), [4, 3, 2, 1, 0])
+        self.assertEqual(self.history(ordering="completed_at"), [0, 1, 2, 3, 4])
+
+    def test_single_filters(self):
+        cases = {
+            "shop_user": ("shop2", [4, 3]),
+            "sku": ("SKU-2", [4, 1]),
+            "status": ("Cancelled", [3, 1]),
+            "month": ("202602", [3, 2, 1]),
+            "date_from": ("2026-02-01", [4, 3, 2, 1]),
+            "date_to": ("2026-02-28", [3, 2, 1, 0]),
+        }
+        for name, (value, expected) in cases.items():
+            with self.subTest(name=name):
+                self.assertEqual(self.history(**{name: value}), expected)
+
+    def test_combined_filters(self):
+        self.assertEqual(self.history(shop_user="shop1", sku="SKU-1"), [2, 0])
+        self.assertEqual(self.history(month="202602", status="completed"), [2])
+        self.assertEqual(self.history(date_from="2026-01-31", date_to="2026-01-31"), [0])
+        self.assertEqual(
+            self.history(sku="SKU-1", date_from="2026-02-01", date_to="2026-02-28"), [3, 2]
+        )
+
+    def test_unknown_values_match_nothing(self):
+        self.assertEqual(self.history(status="lost"), [])
+        self.assertEqual(self.history(shop_user="nobody"), [])
+        # Malformed months and dates are ignored.
+        self.assertEqual(len(self.history(month="Feb", date_from="yesterday")), 5)
+
+    def test_shop_users_see_their_own(self):
+        self.assertEqual(self.history(self.shop_client), [2, 1, 0])
+        self.assertEqual(self.history(self.shop_client, shop_user="shop2"), [2, 1, 0])
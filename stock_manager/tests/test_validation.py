@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from stock_manager.models import Item
+from stock_manager.utils import sanitize_price
+from stock_manager.validation import SKU_MAX_LENGTH, validate_columns
+
+from .base import StockTestCase
+
+
+class ValidateColumnsTests(SimpleTestCase):
+    def test_prices_match_sanitize_price(self):
+        prices = [
+            "£1,234.50", "12.3", 1.005, "1.005", 2.675, "2.675", 0.125, 7, "  ", None,
+            " 9.99", 1e-3, "0E-2", Decimal("3.14159"),
+        ]
+        columns, errors = validate_columns(["SKU"] * len(prices), prices=prices)
+        self.assertEqual(errors, [])
+        self.assertEqual(columns["retail_price"], [sanitize_price(p) for p in prices])
+        self.assertEqual(
+            columns["retail_pence"], [int(sanitize_price(p) * 100) for p in prices]
+        )
+
+    def test_invalid_prices(self):
+        columns, errors = validate_columns(
+            ["A", "B", "C", "D"], prices=["abc", -3, 1e20, "nan"]
+        )
+        self.assertEqual(
+            [(error["sku"], error["error"]) for error in errors],
+            [
+                ("A", "Retail price must be a valid number."),
+                ("B", "Retail price must not be negative."),
+                ("C", "Retail price is too large."),
+                ("D", "Retail price must be a valid number."),
+            ],
+        )
+        self.assertEqual(columns["valid"].tolist(), [False] * 4)
+
+    def test_quantities(self):
+        columns, errors = validate_columns(
+            ["A", "B", "C", "D", "E", "F"], quantities=["1,000", 3.0, 2.5, -1, None, "x"]
+        )
+        self.assertEqual(columns["quantity"][:2], [1000, 3])
+        self.assertEqual(
+            [(error["sku"], error["field"]) for error in errors],
+            [("C", "quantity"), ("D", "quantity"), ("E", "quantity"), ("F", "quantity")],
+        )
+        self.assertEqual(columns["valid"].tolist(), [True, True, False, False, False, False])
+
+    def test_skus_and_descriptions(self):
+        columns, errors = validate_columns(
+            ["  A ", None, "", "X" * (SKU_MAX_LENGTH + 1)],
+            descriptions=[" Widget ", "ignored", None, "ok"],
+        )
+        self.assertEqual(columns["sku"][0], "A")
+        self.assertEqual(columns["description"][0], "Widget")
+        self.assertEqual(columns["present"].tolist(), [True, False, False, True])
+        # Rows without a SKU are skipped, not reported.
+        self.assertEqual([(error["row"], error["field"]) for error in errors], [(3, "sku")])
+
+
+class ImportValidationTests(StockTestCase):
+    def test_invalid_rows_are_skipped_and_reported(self):
+        skipped, row_errors = self.import_sheets(
+            items=[
+                ("SKU-1", "Good", "£2.50", "4"),
+                ("SKU-2", "Bad price", "free", 1),
+                ("SKU-3", "Bad quantity", "1.00", 1.5),
+            ]
+        )
+        self.assertEqual(skipped, ["SKU-2"])
+        self.assertEqual(
+            [(error["row"], error["sku"], error["field"]) for error in row_errors],
+            [(3, "SKU-2", "retail_price"), (4, "SKU-3", "quantity")],
+        )
+        item = Item.objects.get(sku="SKU-1")
+        self.assertEqual((item.retail_price, item.quantity), (Decimal("2.50"), 4))
+        self.assertFalse(Item.objects.filter(sku__in=["SKU-2", "SKU-3"]).exists())
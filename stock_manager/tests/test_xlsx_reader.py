@@ -0,0 +1,135 @@
+import os
+import tempfile
+import zipfile
+
+from django.test import SimpleTestCase
+from openpyxl import Workbook, load_workbook
+
+from stock_manager import xlsx_reader
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>
+</Types>"""
+PACKAGE_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="Warehouse Stock" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>
+</Relationships>"""
+SHARED_STRINGS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="4" uniqueCount="4">
+<si><t>SKU</t></si>
+<si><t>Description</t></si>
+<si><r><t>Rich </t></r><r><rPr><b/></rPr><t>text</t></r></si>
+<si><t>Kanji</t><rPh sb="0" eb="1"><t>kana</t></rPh></si>
+</sst>"""
+# Excel-style sheet: an extra namespace on the rows, styled empty cells, missing
+# cells and missing rows.
+SHEET = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:x14ac="http://schemas.microsoft.com/office/spreadsheetml/2009/9/ac">
+<dimension ref="A1:E9"/>
+<sheetData>
+<row r="1" x14ac:dyDescent="0.25"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c><c r="C1" t="inlineStr"><is><t>Retail Price</t></is></c><c r="D1" t="inlineStr"><is><t>Quantity</t></is></c><c r="E1" t="inlineStr"><is><t>Active</t></is></c></row>
+<row r="2" x14ac:dyDescent="0.25"><c r="A2" t="s"><v>2</v></c><c r="B2" t="inlineStr"><is><r><t>In</t></r><r><t>line</t></r></is></c><c r="C2"><v>1.5</v></c><c r="D2"><v>12</v></c><c r="E2" t="b"><v>1</v></c></row>
+<row r="3"><c r="A3" t="s"><v>3</v></c><c r="B3" s="1"/><c r="D3"><v>1E3</v></c><c r="E3" t="b"><v>0</v></c></row>
+<row r="5"><c r="C5" t="str"><v>text</v></c></row>
+<row r="6"><c r="A6" t="inlineStr"><is><t></t></is></c><c r="D6"><v>-7</v></c></row>
+<row r="9"><c r="E9"><v>0.25</v></c></row>
+</sheetData>
+</worksheet>"""
+
+
+class XlsxReaderTests(SimpleTestCase):
+    """
+    The byte-range reader gives the same rows as openpyxl's read-only
+    values_only iteration, however the sheet is split.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def handmade_workbook(self):
+        path = os.path.join(self.directory, "handmade.xlsx")
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+            archive.writestr("_rels/.rels", PACKAGE_RELS)
+            archive.writestr("xl/workbook.xml", WORKBOOK)
+            archive.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS)
+            archive.writestr("xl/sharedStrings.xml", SHARED_STRINGS)
+            archive.writestr("xl/worksheets/sheet1.xml", SHEET)
+        return path
+
+    def openpyxl_workbook(self):
+        path = os.path.join(self.directory, "openpyxl.xlsx")
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.title = "Warehouse Stock"
+        sheet.append(["SKU", "Description", "Retail Price", "Quantity"])
+        for n in range(200):
+            if n % 7 == 3:
+                sheet.append([])  # a missing row
+                continue
+            sheet.append([f"SKU-{n}", f"Item {n}" if n % 5 else None, n / 4, n])
+            # Sparse cells past the header.
+            sheet.cell(row=sheet.max_row, column=5 + n % 3, value=n % 2 == 0 or 1.25)
+        workbook.save(path)
+        return path
+
+    def expected(self, path):
+        workbook = load_workbook(path, read_only=True)
+        try:
+            return list(workbook["Warehouse Stock"].iter_rows(min_row=2, values_only=True))
+        finally:
+            workbook.close()
+
+    def read(self, path, parts):
+        member = xlsx_reader.sheet_paths(path)["Warehouse Stock"]
+        width = len(self.expected(path)[0])
+        points = xlsx_reader.split_points(path, member, parts)
+        numbered = []
+        for start, stop in zip(points, points[1:]):
+            numbered.extend(xlsx_reader.read_numbered_rows(path, member, start, stop, width))
+        return xlsx_reader.fill_gaps(numbered, 2, width)
+
+    def test_matches_openpyxl(self):
+        for path in (self.handmade_workbook(), self.openpyxl_workbook()):
+            with self.subTest(path=os.path.basename(path)):
+                self.assertEqual(self.read(path, 1), self.expected(path))
+
+    def test_cell_values(self):
+        rows = self.read(self.handmade_workbook(), 1)
+        self.assertEqual(rows[0], ("Rich text", "Inline", 1.5, 12, True))
+        self.assertEqual(rows[1], ("Kanji", None, None, 1000.0, False))
+        self.assertEqual(rows[2], (None,) * 5)
+        self.assertEqual(rows[3], (None, None, "text", None, None))
+        self.assertEqual(rows[4], ("", None, None, -7, None))
+        self.assertEqual(len(rows), 8)
+
+    def test_any_split_gives_the_same_rows(self):
+        for path in (self.handmade_workbook(), self.openpyxl_workbook()):
+            whole = self.read(path, 1)
+            for parts in (2, 3, 5, 16, 1000):
+                with self.subTest(path=os.path.basename(path), parts=parts):
+                    self.assertEqual(self.read(path, parts), whole)
+
+    def test_header(self):
+        path = self.handmade_workbook()
+        member = xlsx_reader.sheet_paths(path)["Warehouse Stock"]
+        self.assertEqual(
+            xlsx_reader.read_header(path, member),
+            ["SKU", "Description", "Retail Price", "Quantity", "Active"],
+        )
@@ -4,6 +4,12 @@ from .views import (
     ItemViewSet,
     ShopItemViewSet,
     TransferItemViewSet,
+    StockTotalViewSet,
+    TransferHistoryViewSet,
+    ReorderThresholdViewSet,
+    StockAlertViewSet,
+    TransferSuggestionViewSet,
+    ImportChangesetViewSet,
     index,
     get_user,
     transfer_item,
@@ -14,6 +20,11 @@ from .views import (
     export_data_excel,
     import_data_excel,
     app_config,  # Add this import
+    stock_at_time,
+    stock_value,
+    changes_since,
+    record_sale_events,
+    response_cache_stats,
 )
 from rest_framework.authtoken.views import obtain_auth_token
 from django.conf.urls.static import static
@@ -23,15 +34,23 @@ from rest_framework import routers
 
 class PathRouter(DefaultRouter):
     def get_lookup_regex(self, viewset, lookup_prefix=''):
-        # Use path converter for detail routes
+        # Use path converter for detail routes, unless the viewset narrows it
+        # (needed for detail actions, which ".+" would swallow)
         lookup_field = getattr(viewset, 'lookup_field', 'pk')
-        return r'(?P<%s>.+)' % (lookup_prefix + lookup_field)
+        lookup_value = getattr(viewset, 'lookup_value_regex', '.+')
+        return r'(?P<%s>%s)' % (lookup_prefix + lookup_field, lookup_value)
 
 # Use PathRouter instead of DefaultRouter
 router = PathRouter()
 router.register(r"items", ItemViewSet)
 router.register(r"shop_items", ShopItemViewSet)
 router.register(r"transfer_items", TransferItemViewSet)
+router.register(r"stock_totals", StockTotalViewSet)
+router.register(r"transfer_history", TransferHistoryViewSet)
+router.register(r"reorder_thresholds", ReorderThresholdViewSet)
+router.register(r"stock_alerts", StockAlertViewSet)
+router.register(r"transfer_suggestions", TransferSuggestionViewSet)
+router.register(r"import_changesets", ImportChangesetViewSet)
 
 urlpatterns = [
     path("", index, name="index"),
@@ -56,6 +75,11 @@ urlpatterns = [
     path("api/export_data/", export_data_excel, name="export_data_excel"),
     path("api/import_data/", import_data_excel, name="import_data_excel"),
     path("api/app_config/", app_config, name="app_config"),  # Register the endpoint
+    path("api/stock_at/", stock_at_time, name="stock_at"),
+    path("api/reports/stock_value/", stock_value, name="stock_value_report"),
+    path("api/changes_since/", changes_since, name="changes_since"),
+    path("api/sales/", record_sale_events, name="record_sale_events"),
+    path("api/cache_stats/", response_cache_stats, name="cache_stats"),
 ]
 
 if settings.DEBUG:
@@ -8,10 +8,22 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.http import FileResponse
 from django.db import transaction
+from django.utils import timezone
 from datetime import datetime
 import pytz
 
-from .models import Item, ShopItem, User, Admin
+from .models import Admin, DataVersion, Item, ShopItem, StockMovement, User
+from .fingerprints import fingerprint, fingerprints
+from .roles import is_manager
+from .inventory import (
+    LEDGER_BATCH_SIZE,
+    cleanup_orphaned_shop_items,
+    evaluate_alerts,
+    record_movements,
+    refresh_stock_totals,
+    restore_archived_items,
+)
+from .validation import validate_columns
 
 
 def sanitize_price(value, *, default="0.00") -> Decimal:
@@ -45,6 +57,17 @@ def sanitize_price(value, *, default="0.00") -> Decimal:
     d = d.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
     return d
 
+
+def quantity_as_int(value):
+    """
+    Best-effort integer view of a quantity cell (int, float, numeric string or None),
+    used to work out ledger deltas. Unparseable values count as 0.
+    """
+    try:
+        return int(Decimal(str(value)))
+    except (InvalidOperation, TypeError, ValueError):
+        return 0
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -56,11 +79,25 @@ except ImportError:
     HAS_SPREADSHEET_CONVERT = False
 
 
+ITEM_SHEET = "Warehouse Stock"
+SHOP_SHEET = "Shop Stock"
+ITEM_HEADERS = ["SKU", "Description", "Retail Price", "Quantity"]
+SHOP_HEADERS = ["SKU", "Description", "Retail Price", "Quantity", "Shop User"]
+# Spreadsheet row number of the first data row, used when reporting row errors.
+FIRST_DATA_ROW = 2
+
+
+class SheetConversionError(Exception):
+    """
+    Raised when a required sheet is missing and the custom conversion fails.
+    """
+
+
 class SpreadsheetTools:
 
-    def __init__(self, request=None):
+    def __init__(self, request=None, user=None):
         self.request = request
-        self.user = request.user
+        self.user = user if user is not None else request.user
 
     def get_related_field(self, obj, field_name):
         """
@@ -131,11 +168,10 @@ class SpreadsheetTools:
         shop_item_sheet.append(shop_item_header)
 
         # If user is not a manager, limit the queryset
-        is_manager = self.user.groups.filter(name="managers").exists()
         queryset = ShopItem.objects.select_related(*shop_item_relation_fields).only(
             *shop_item_retrieved_fields
         )
-        if not is_manager:
+        if not is_manager(self.user):
             queryset = queryset.filter(shop_user__username=self.user.username)
 
         for shop_item in queryset:
@@ -187,20 +223,118 @@ class SpreadsheetTools:
     def cleanup_orphaned_shopitems(self):
         """
         Remove ShopItem rows where item is NULL or item_id points to a non-existent Item (sku).
+        Runs from the maintenance command rather than on every upload.
+        """
+        return cleanup_orphaned_shop_items()
+
+    def restore_archived_skus(self, rows, headers):
+        """
+        Move SKUs named in a sheet back from the archive before its rows are
+        processed, so archived items are updated and reactivated like any other.
         """
-        # Delete ShopItem rows where item is NULL
-        ShopItem.objects.filter(item__isnull=True).delete()
-        # Delete ShopItem rows where item_id points to a non-existent Item.sku (using ORM)
-        orphaned_shopitems = ShopItem.objects.exclude(item__isnull=True).exclude(
-            item_id__in=Item.objects.values_list("sku", flat=True)
+        if "SKU" not in headers:
+            return
+        column = headers.index("SKU")
+        restore_archived_items({row[column] for row in rows if len(row) > column})
+
+    def validate_sheet(self, name, headers, rows):
+        """
+        Validate a sheet's SKU, Description, Retail Price and Quantity columns in one
+        pass (see validation.validate_columns). Returns (columns, errors); errors
+        carry the sheet name and the spreadsheet row number.
+        """
+
+        def column(header):
+            if header not in headers:
+                return None
+            index = headers.index(header)
+            return [row[index] if len(row) > index else None for row in rows]
+
+        columns, errors = validate_columns(
+            column("SKU") or [None] * len(rows),
+            column("Description"),
+            column("Retail Price"),
+            column("Quantity"),
         )
-        count_orphans = orphaned_shopitems.count()
-        orphaned_shopitems.delete()
-        if count_orphans:
-            logger.warning(
-                "Deleted %d orphaned ShopItem rows with invalid item_id (not matching Item.sku)",
-                count_orphans,
+        for error in errors:
+            error["sheet"] = name
+            error["row"] += FIRST_DATA_ROW
+        return columns, errors
+
+    def item_hashes(self, skus):
+        """
+        Return {sku: (row_hash, is_active)} for the given SKUs.
+        """
+        skus = list(skus)
+        hashes = {}
+        for start in range(0, len(skus), LEDGER_BATCH_SIZE):
+            hashes.update(
+                (sku, (row_hash, is_active))
+                for sku, row_hash, is_active in Item.objects.filter(
+                    sku__in=skus[start : start + LEDGER_BATCH_SIZE]
+                ).values_list("sku", "row_hash", "is_active")
+            )
+        return hashes
+
+    def shop_item_hashes(self, skus):
+        """
+        Return {(username, sku): row_hash} for fingerprinted ShopItems of the given
+        SKUs.
+        """
+        skus = list(skus)
+        hashes = {}
+        for start in range(0, len(skus), LEDGER_BATCH_SIZE):
+            hashes.update(
+                ((username, sku), row_hash)
+                for username, sku, row_hash in ShopItem.objects.filter(
+                    item_id__in=skus[start : start + LEDGER_BATCH_SIZE],
+                    row_hash__isnull=False,
+                ).values_list("shop_user__username", "item_id", "row_hash")
             )
+        return hashes
+
+    def load_sheets(self, workbook):
+        """
+        Return {sheet name: (headers, rows)} for the Warehouse Stock and Shop Stock
+        sheets, with rows as tuples of cell values (header row excluded). A missing
+        sheet, or one without the default headers, is taken from the custom
+        conversion instead.
+        """
+        sheets = {}
+        for name, required in ((ITEM_SHEET, ITEM_HEADERS), (SHOP_SHEET, SHOP_HEADERS)):
+            # Only process sheets that exist; do not error if one is missing
+            # Convert custom input format only for the missing sheet, not both
+            if name not in workbook.sheetnames:
+                try:
+                    converted = self.convert_custom_incoming_format(workbook)
+                    if name in converted.sheetnames:
+                        workbook = converted
+                except Exception as e:
+                    logger.error(
+                        "Custom conversion failed for %s: %s", name, e, exc_info=True
+                    )
+                    raise SheetConversionError(str(e)) from e
+            if name not in workbook.sheetnames:
+                continue
+            sheet = workbook[name]
+            headers = [cell.value for cell in next(sheet.iter_rows(max_row=1))]
+            if not all(col in headers for col in required):
+                logger.warning(
+                    "Default headers could not be mapped. Consulting custom mappings..."
+                )
+                sheet = self.convert_custom_incoming_format(workbook)[name]
+                headers = [cell.value for cell in next(sheet.iter_rows(max_row=1))]
+            sheets[name] = (headers, list(sheet.iter_rows(min_row=2, values_only=True)))
+        return sheets
+
+    def uploaded_file(self):
+        """
+        Return the uploaded .xlsx file, or None if the request has no such file.
+        """
+        file_obj = self.request.FILES.get("file")
+        if not file_obj or not file_obj.name.endswith(".xlsx"):
+            return None
+        return file_obj
 
     def handle_excel_upload(self):
         """
@@ -210,14 +344,54 @@ class SpreadsheetTools:
             "handle_excel_upload called for user: %s",
             getattr(self.user, "username", "unknown"),
         )
-        # Sanity check: remove orphaned ShopItem rows before processing
-        self.cleanup_orphaned_shopitems()
-        file_obj = self.request.FILES.get("file")
-        if not file_obj or not file_obj.name.endswith(".xlsx"):
+        file_obj = self.uploaded_file()
+        if file_obj is None:
             return Response(
                 {"detail": "Invalid file format. Please upload an .xlsx file."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        try:
+            logger.info("Starting handle_excel_upload for user: %s", self.user.username)
+            workbook = load_workbook(file_obj)
+            logger.info("Workbook loaded successfully.")
+            skipped_skus, row_errors = self.import_sheets(self.load_sheets(workbook))
+            logger.info("handle_excel_upload completed successfully.")
+        except SheetConversionError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error("Error while importing Excel file: %s", str(e), exc_info=True)
+            return Response({"detail": "Failed to upload stock data."}, status=400)
+        return self.import_response(skipped_skus, row_errors)
+
+    def import_response(self, skipped_skus, row_errors):
+        """
+        Build the upload response from import_sheets' result.
+        """
+        resp_body = {"detail": "Data has been processed according to configuration."}
+        if skipped_skus:
+            resp_body["skipped_skus"] = skipped_skus
+            resp_body["detail"] = "Data processed with some skipped retail_price values. See skipped_skus for list."
+        if row_errors:
+            resp_body["row_errors"] = row_errors
+            resp_body["detail"] = "Data processed with some rows or values skipped. See row_errors for details."
+        return Response(resp_body, status=200)
+
+    def import_sheets(self, sheets):
+        """
+        Apply parsed sheets ({sheet name: (headers, rows)}, see load_sheets) to the
+        database in one transaction. Shared by the upload view and the import_stock
+        command.
+
+        Cell values are validated column by column before any row is written. Rows
+        with an invalid SKU, description or quantity are skipped; an invalid price
+        skips the row on the Warehouse Stock sheet and just the price on the Shop
+        Stock sheet. Returns (skipped_skus, row_errors): the SKUs whose
+        retail_price was rejected, and one error dict per rejected value.
+
+        Rows are fingerprinted (see stock_manager.fingerprints), and a row whose
+        fingerprint matches the one stored for it is skipped without being loaded,
+        so a re-upload only writes the rows that changed.
+        """
         item_field_mapping = {
             "SKU": "sku",
             "Description": "description",
@@ -232,254 +406,278 @@ class SpreadsheetTools:
             "Quantity": "quantity",
         }
         excel_item_skus = set()
-        unique_shop_items_in_excel = set()
         unique_shop_users_in_excel = set()
+        movements = []
+        deactivated_skus = []
+        rehashed_items = []
+        rehashed_shop_items = []
         skipped_skus = []
-        try:
-            logger.info("Starting handle_excel_upload for user: %s", self.user.username)
-            workbook = load_workbook(file_obj)
-            logger.info("Workbook loaded successfully.")
-            with transaction.atomic():
-                # Only process sheets that exist; do not error if one is missing
-                # Convert custom input format only for the missing sheet, not both
-                if "Warehouse Stock" not in workbook.sheetnames:
-                    try:
-                        converted = self.convert_custom_incoming_format(workbook)
-                        if "Warehouse Stock" in converted.sheetnames:
-                            workbook = converted
-                    except Exception as e:
-                        logger.error(
-                            "Custom conversion failed for Warehouse Stock: %s",
-                            e,
-                            exc_info=True,
+        row_errors = []
+
+        def reject_prices(errors):
+            for error in errors:
+                if error["field"] == "retail_price" and error["sku"] not in skipped_skus:
+                    skipped_skus.append(error["sku"])
+
+        with transaction.atomic():
+            if ITEM_SHEET in sheets:
+                headers, item_rows = sheets[ITEM_SHEET]
+                self.restore_archived_skus(item_rows, headers)
+                clean, errors = self.validate_sheet(ITEM_SHEET, headers, item_rows)
+                row_errors.extend(errors)
+                reject_prices(errors)
+                hashed = all(header in headers for header in item_field_mapping)
+                if hashed:
+                    row_hashes = fingerprints(
+                        clean["description"], clean["retail_pence"], clean["quantity"]
+                    )
+                    stored = self.item_hashes(
+                        sku for sku, valid in zip(clean["sku"], clean["valid"]) if valid
+                    )
+                for position in range(len(item_rows)):
+                    if not clean["present"][position]:
+                        continue
+                    sku = clean["sku"][position]
+                    # A rejected row still keeps its item out of the deactivation pass.
+                    excel_item_skus.add(sku)
+                    if not clean["valid"][position]:
+                        continue
+                    if hashed and stored.get(sku) == (row_hashes[position], True):
+                        continue
+                    data = {
+                        field: clean[field][position]
+                        for header, field in item_field_mapping.items()
+                        if header in headers
+                    }
+                    obj, created = Item.objects.get_or_create(
+                        sku=sku, defaults=data
+                    )
+                    if created:
+                        movements.append(
+                            (sku, None, StockMovement.Kind.IMPORT, quantity_as_int(obj.quantity))
                         )
-                        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-                if "Warehouse Stock" in workbook.sheetnames:
-                    item_sheet = workbook["Warehouse Stock"]
-                    headers = [
-                        cell.value for cell in next(item_sheet.iter_rows(max_row=1))
-                    ]
-                    if not all(
-                        col in headers
-                        for col in ["SKU", "Description", "Retail Price", "Quantity"]
+                    if not created:
+                        previous_quantity = obj.quantity
+                        updated = False
+                        for key, value in data.items():
+                            if self.field_changed(obj, key, value):
+                                setattr(obj, key, value)
+                                updated = True
+                        if obj.is_active is False:
+                            obj.is_active = True
+                            updated = True
+                        if updated:
+                            obj.save()
+                            movements.append(
+                                (
+                                    sku,
+                                    None,
+                                    StockMovement.Kind.IMPORT,
+                                    quantity_as_int(obj.quantity) - previous_quantity,
+                                )
+                            )
+                        elif hashed and obj.row_hash != row_hashes[position]:
+                            # Unchanged, but written outside save() since the last
+                            # import; record the fingerprint so next time is fast.
+                            obj.row_hash = row_hashes[position]
+                            rehashed_items.append(obj)
+            # Before the Shop Stock sheet, whose fingerprints include the Item's.
+            Item.objects.bulk_update(rehashed_items, ["row_hash"], batch_size=LEDGER_BATCH_SIZE)
+            rehashed_items.clear()
+            # --- Deactivate warehouse items not present in the spreadsheet if deletions allowed ---
+            if Admin.is_allow_upload_deletions():
+                deactivated = Item.objects.filter(is_active=True).exclude(
+                    sku__in=excel_item_skus
+                )
+                deactivated_skus = list(deactivated.values_list("sku", flat=True))
+                # Stamp last_updated so the archive retention window starts now.
+                deactivated.update(is_active=False, last_updated=timezone.now())
+            if SHOP_SHEET in sheets:
+                headers, shop_rows = sheets[SHOP_SHEET]
+                self.restore_archived_skus(shop_rows, headers)
+                clean, errors = self.validate_sheet(SHOP_SHEET, headers, shop_rows)
+                row_errors.extend(errors)
+                reject_prices(errors)
+                bad_prices = {
+                    error["row"] for error in errors if error["field"] == "retail_price"
+                }
+                rejected_rows = {
+                    error["row"] for error in errors if error["field"] != "retail_price"
+                }
+                hashed = all(header in headers for header in shop_item_field_mapping)
+                if hashed:
+                    shop_skus = {sku for sku in clean["sku"] if sku}
+                    # Loaded after the warehouse sheet so they reflect its writes,
+                    # and kept current as this sheet changes items.
+                    current_item_hashes = {
+                        sku: row_hash
+                        for sku, (row_hash, _) in self.item_hashes(shop_skus).items()
+                    }
+                    stored = self.shop_item_hashes(shop_skus)
+                for position, row in enumerate(shop_rows):
+                    raw_data = {
+                        shop_item_field_mapping[headers[i]]: value
+                        for i, value in enumerate(row)
+                        if headers[i] in shop_item_field_mapping
+                    }
+                    shop_username = raw_data.pop("shop_user__username", None)
+                    raw_data.pop("item__sku", None)
+                    item_sku = clean["sku"][position]
+                    row_number = position + FIRST_DATA_ROW
+                    if not shop_username or not item_sku or row_number in rejected_rows:
+                        continue
+                    for key, field in (
+                        ("item__description", "description"),
+                        ("item__retail_price", "retail_price"),
+                        ("quantity", "quantity"),
                     ):
+                        if key in raw_data:
+                            raw_data[key] = clean[field][position]
+                    if row_number in bad_prices:
+                        # Don't assign an invalid retail_price to the model; skip this field
+                        raw_data.pop("item__retail_price", None)
+                    row_hash = None
+                    if hashed and row_number not in bad_prices:
+                        # The Item's fingerprint is part of the row's, so a change to
+                        # the Item since this row was last imported forces a reload.
+                        item_hash = current_item_hashes.get(item_sku)
+                        if item_hash is not None:
+                            row_hash = fingerprint(
+                                clean["description"][position],
+                                clean["retail_pence"][position],
+                                clean["quantity"][position],
+                                item_hash,
+                            )
+                            if stored.get((shop_username, item_sku)) == row_hash:
+                                continue
+                    try:
+                        shop_user = User.objects.get(username=shop_username)
+                    except User.DoesNotExist:
                         logger.warning(
-                            "Default headers could not be mapped. Consulting custom mappings..."
+                            f"Shop user '{shop_username}' not found. Skipping row."
                         )
-                        item_sheet = self.convert_custom_incoming_format(workbook)[
-                            "Warehouse Stock"
-                        ]
-                    for row in item_sheet.iter_rows(min_row=2, values_only=True):
-                        data = {
-                            item_field_mapping[headers[i]]: value
-                            for i, value in enumerate(row)
-                            if headers[i] in item_field_mapping
+                        continue
+                    unique_shop_users_in_excel.add(shop_user)
+                    # --- CHANGED: Create Item if missing, with is_active=False and valid defaults for required fields ---
+                    try:
+                        item = Item.objects.get(sku=item_sku)
+                    except Item.DoesNotExist:
+                        # Provide defaults for required fields; values are already
+                        # validated, and a rejected price falls back to 0.00.
+                        item_defaults = {
+                            "description": raw_data.get("item__description", ""),
+                            "retail_price": raw_data.get("item__retail_price", Decimal("0.00")),
+                            "quantity": raw_data.get("quantity", 0),
+                            "is_active": False,
                         }
-                        if "retail_price" in data:
-                            data["retail_price"] = sanitize_price(data["retail_price"])
-                        sku = data.get("sku")
-                        if not sku:
-                            continue
-                        excel_item_skus.add(sku)
-                        obj, created = Item.objects.get_or_create(
-                            sku=sku, defaults=data
+
+                        logger.debug("Creating Item with defaults for SKU %s: %r", item_sku, item_defaults)
+                        try:
+                            item = Item.objects.create(sku=item_sku, **item_defaults)
+                        except Exception:
+                            logger.error(
+                                "Failed creating Item SKU=%s; defaults=%r",
+                                item_sku,
+                                item_defaults,
+                                exc_info=True,
+                            )
+                            raise
+                        logger.warning(
+                            f"Item with SKU '{item_sku}' not found. Created with is_active=False and defaults."
                         )
-                        if not created:
-                            updated = False
-                            for key, value in data.items():
-                                if self.field_changed(obj, key, value):
-                                    setattr(obj, key, value)
-                                    updated = True
-                            if obj.is_active is False:
-                                obj.is_active = True
-                                updated = True
-                            if updated:
-                                obj.save()
-                # --- Deactivate warehouse items not present in the spreadsheet if deletions allowed ---
-                if Admin.is_allow_upload_deletions():
-                    Item.objects.filter(is_active=True).exclude(sku__in=excel_item_skus).update(is_active=False)
-                if "Shop Stock" not in workbook.sheetnames:
-                    try:
-                        converted = self.convert_custom_incoming_format(workbook)
-                        if "Shop Stock" in converted.sheetnames:
-                            workbook = converted
-                    except Exception as e:
-                        logger.error(
-                            "Custom conversion failed for Shop Stock: %s",
-                            e,
-                            exc_info=True,
+                        movements.append(
+                            (
+                                item_sku,
+                                None,
+                                StockMovement.Kind.IMPORT,
+                                quantity_as_int(item.quantity),
+                            )
                         )
-                        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-                if "Shop Stock" in workbook.sheetnames:
-                    shop_item_sheet = workbook["Shop Stock"]
-                    headers = [
-                        cell.value
-                        for cell in next(shop_item_sheet.iter_rows(max_row=1))
-                    ]
-                    if not all(
-                        col in headers
-                        for col in [
-                            "SKU",
-                            "Description",
-                            "Retail Price",
-                            "Quantity",
-                            "Shop User",
-                        ]
-                    ):
-                        logger.warning(
-                            "Default headers could not be mapped. Consulting custom mappings..."
+                    obj, created = ShopItem.objects.get_or_create(
+                        shop_user=shop_user, item=item
+                    )
+                    previous_shop_quantity = obj.quantity
+                    item_updated = False
+                    shop_item_updated = False
+                    for key, value in raw_data.items():
+                        if key.startswith("item__"):
+                            field = key.split("__", 1)[1]
+                            if self.field_changed(item, field, value):
+                                setattr(item, field, value)
+                                item_updated = True
+                        else:
+                            if self.field_changed(obj, key, value):
+                                setattr(obj, key, value)
+                                shop_item_updated = True
+                    if item_updated:
+                        item.save()
+                    elif hashed and item.row_hash is None:
+                        # e.g. an item missing from the Warehouse Stock sheet.
+                        item.row_hash = item.content_fingerprint()
+                        rehashed_items.append(item)
+                    if hashed and row_number not in bad_prices:
+                        current_item_hashes[item_sku] = item.row_hash
+                        row_hash = None
+                        if item.row_hash is not None:
+                            row_hash = fingerprint(
+                                clean["description"][position],
+                                clean["retail_pence"][position],
+                                clean["quantity"][position],
+                                item.row_hash,
+                            )
+                    if shop_item_updated:
+                        obj.save(row_hash=row_hash)
+                        movements.append(
+                            (
+                                item_sku,
+                                shop_user.id,
+                                StockMovement.Kind.IMPORT,
+                                quantity_as_int(obj.quantity) - previous_shop_quantity,
+                            )
                         )
-                        shop_item_sheet = self.convert_custom_incoming_format(workbook)[
-                            "Shop Stock"
-                        ]
-                        headers = [
-                            cell.value
-                            for cell in next(shop_item_sheet.iter_rows(max_row=1))
-                        ]
-                    for row in shop_item_sheet.iter_rows(min_row=2, values_only=True):
-                        raw_data = {
-                            shop_item_field_mapping[headers[i]]: value
+                    elif obj.row_hash != row_hash:
+                        obj.row_hash = row_hash
+                        rehashed_shop_items.append(obj)
+                # --- Delete ShopItems for missing (shop_user, item) only if deletions allowed ---
+                if Admin.is_allow_upload_deletions():
+                    excel_shopitem_keys = set()
+                    for position, row in enumerate(shop_rows):
+                        row_dict = {
+                            headers[i]: value
                             for i, value in enumerate(row)
                             if headers[i] in shop_item_field_mapping
                         }
-                        shop_username = raw_data.pop("shop_user__username", None)
-                        item_sku = raw_data.pop("item__sku", None)
-                        if not shop_username or not item_sku:
-                            continue
-                        unique_shop_items_in_excel.add(item_sku)
-                        try:
-                            shop_user = User.objects.get(username=shop_username)
-                        except User.DoesNotExist:
-                            logger.warning(
-                                f"Shop user '{shop_username}' not found. Skipping row."
-                            )
-                            continue
-                        unique_shop_users_in_excel.add(shop_user)
-                        # --- CHANGED: Create Item if missing, with is_active=False and valid defaults for required fields ---
-                        try:
-                            item = Item.objects.get(sku=item_sku)
-                        except Item.DoesNotExist:
-                            # Provide defaults for required fields
-                            orig_rp = raw_data.get("item__retail_price", "0.00")
-                            try:
-                                rp = sanitize_price(orig_rp)
-                            except Exception:
-                                logger.warning(
-                                    "sanitize_price failed for SKU %s value=%r; falling back to 0.00",
-                                    item_sku,
-                                    orig_rp,
-                                )
-                                rp = Decimal("0.00")
-
-                            item_defaults = {
-                                "description": raw_data.get("item__description", ""),
-                                "retail_price": rp,
-                                "quantity": raw_data.get("quantity", 0) or 0,
-                                "is_active": False,
-                            }
-
-                            # Ensure retail_price is a Decimal with 2dp to satisfy model save()
-                            try:
-                                if not isinstance(item_defaults["retail_price"], Decimal):
-                                    item_defaults["retail_price"] = Decimal(item_defaults["retail_price"])
-                                item_defaults["retail_price"] = item_defaults["retail_price"].quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-                            except Exception as ex:
-                                logger.error(
-                                    "Failed to coerce retail_price for SKU %s (value=%r): %s",
-                                    item_sku,
-                                    item_defaults.get("retail_price"),
-                                    ex,
-                                    exc_info=True,
-                                )
-                                # As a last resort, set to 0.00
-                                item_defaults["retail_price"] = Decimal("0.00")
-
-                            logger.debug("Creating Item with defaults for SKU %s: %r", item_sku, item_defaults)
-                            try:
-                                item = Item.objects.create(sku=item_sku, **item_defaults)
-                            except Exception:
-                                logger.error(
-                                    "Failed creating Item SKU=%s; defaults=%r",
-                                    item_sku,
-                                    item_defaults,
-                                    exc_info=True,
-                                )
-                                raise
-                            logger.warning(
-                                f"Item with SKU '{item_sku}' not found. Created with is_active=False and defaults."
-                            )
-                        obj, created = ShopItem.objects.get_or_create(
-                            shop_user=shop_user, item=item
+                        shop_username = row_dict.get("Shop User")
+                        item_sku = clean["sku"][position]
+                        if shop_username and item_sku:
+                            excel_shopitem_keys.add((shop_username, item_sku))
+                    # Compare keys only; the rows themselves are never loaded.
+                    missing = [
+                        (pk, sku, shop_user_id, quantity)
+                        for pk, username, sku, shop_user_id, quantity in ShopItem.objects.filter(
+                            item__isnull=False
+                        ).values_list(
+                            "pk", "shop_user__username", "item_id", "shop_user_id", "quantity"
                         )
-                        item_updated = False
-                        shop_item_updated = False
-                        for key, value in raw_data.items():
-                            # Normalize nested item fields (e.g., item__retail_price)
-                            if key == "item__retail_price":
-                                try:
-                                    value = sanitize_price(value)
-                                except Exception as exc:
-                                    logger.warning(
-                                        "Skipping invalid retail_price for SKU %s: %r (%s)",
-                                        item_sku,
-                                        value,
-                                        exc,
-                                    )
-                                    # record skipped SKU so frontend can be informed
-                                    try:
-                                        if item_sku not in skipped_skus:
-                                            skipped_skus.append(item_sku)
-                                    except Exception:
-                                        pass
-                                    # Don't assign an invalid retail_price to the model; skip this field
-                                    continue
-                            if key.startswith("item__"):
-                                field = key.split("__", 1)[1]
-                                if self.field_changed(item, field, value):
-                                    setattr(item, field, value)
-                                    item_updated = True
-                            else:
-                                if self.field_changed(obj, key, value):
-                                    setattr(obj, key, value)
-                                    shop_item_updated = True
-                        if item_updated:
-                            item.save()
-                        if shop_item_updated:
-                            obj.save()
-                    # --- Delete ShopItems for missing (shop_user, item) only if deletions allowed ---
-                    if Admin.is_allow_upload_deletions():
-                        excel_shopitem_keys = set()
-                        for row in shop_item_sheet.iter_rows(
-                            min_row=2, values_only=True
-                        ):
-                            row_dict = {
-                                headers[i]: value
-                                for i, value in enumerate(row)
-                                if headers[i] in shop_item_field_mapping
-                            }
-                            shop_username = row_dict.get("Shop User")
-                            item_sku = row_dict.get("SKU")
-                            if shop_username and item_sku:
-                                excel_shopitem_keys.add((shop_username, item_sku))
-                        for shop_item in ShopItem.objects.select_related(
-                            "shop_user", "item"
-                        ).filter(item__isnull=False):
-                            key = (shop_item.shop_user.username, shop_item.item.sku)
-                            if key not in excel_shopitem_keys:
-                                try:
-                                    shop_item.delete()
-                                except Exception as ex:
-                                    logger.error(
-                                        f"Failed to delete ShopItem for user '{shop_item.shop_user.username}' and item '{shop_item.item.sku}': {ex}",
-                                        exc_info=True,
-                                    )
-                                    raise
-            logger.info("handle_excel_upload completed successfully.")
-        except Exception as e:
-            logger.error("Error while importing Excel file: %s", str(e), exc_info=True)
-            return Response({"detail": "Failed to upload stock data."}, status=400)
-        resp_body = {"detail": "Data has been processed according to configuration."}
-        if skipped_skus:
-            resp_body["skipped_skus"] = skipped_skus
-            resp_body["detail"] = "Data processed with some skipped retail_price values. See skipped_skus for list."
-        return Response(resp_body, status=200)
+                        if (username, sku) not in excel_shopitem_keys
+                    ]
+                    for start in range(0, len(missing), LEDGER_BATCH_SIZE):
+                        batch = missing[start : start + LEDGER_BATCH_SIZE]
+                        ShopItem.objects.filter(pk__in=[row[0] for row in batch]).delete()
+                    movements.extend(
+                        (sku, shop_user_id, StockMovement.Kind.IMPORT, -quantity)
+                        for _, sku, shop_user_id, quantity in missing
+                    )
+            Item.objects.bulk_update(rehashed_items, ["row_hash"], batch_size=LEDGER_BATCH_SIZE)
+            ShopItem.objects.bulk_update(
+                rehashed_shop_items, ["row_hash"], batch_size=LEDGER_BATCH_SIZE
+            )
+            record_movements(movements)
+            # Only rows that were written can have changed totals.
+            refresh_stock_totals({movement[0] for movement in movements} | set(deactivated_skus))
+            # Deactivation moves no stock, so resolve the items' warehouse alerts here.
+            evaluate_alerts({(sku, None) for sku in deactivated_skus})
+            DataVersion.bump(DataVersion.ITEM, DataVersion.SHOP_ITEM)
+        if row_errors:
+            logger.warning("Import skipped %d invalid values", len(row_errors))
+        return skipped_skus, row_errors
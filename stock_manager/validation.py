@@ -0,0 +1,156 @@
+"""
+Column-at-a-time validation of imported item fields.
+
+validate_columns() normalises whole SKU, description, retail price and quantity
+columns with vectorised NumPy/pandas operations and returns the clean values with
+a per-row error report, instead of running sanitize_price and a regex per cell.
+
+Prices are converted to floats in one pass and rounded half-up to whole pence.
+Values whose pence sit so close to a half that binary floating point could round
+them the wrong way (e.g. 1.005) are re-parsed with Decimal from their original
+text, so results always match sanitize_price.
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+import numpy as np
+import pandas as pd
+
+from .models import Item
+
+SKU_MAX_LENGTH = Item._meta.get_field("sku").max_length
+DESCRIPTION_MAX_LENGTH = Item._meta.get_field("description").max_length
+_price_field = Item._meta.get_field("retail_price")
+MAX_PRICE_PENCE = 10 ** _price_field.max_digits - 1
+
+# Characters stripped from text prices before parsing: currency symbols, thousands
+# separators and whitespace (including non-breaking spaces).
+PRICE_NOISE = r"[£$€,\s]"
+QUANTITY_NOISE = r"[,\s]"
+
+# How close (in pence) to a half a float must be before it is re-checked exactly.
+HALF_TOLERANCE = 1e-4
+
+
+def _column(values):
+    series = pd.Series(values, dtype=object)
+    return series, series.isna().to_numpy()
+
+
+def _numbers(series, noise):
+    """
+    Convert a column to floats. Text cells that do not parse as they are get the
+    noise characters stripped and are tried again. Returns (numbers, source), where
+    source holds each cell as parsed (the cleaned text for those retried).
+    """
+    numbers = pd.to_numeric(series, errors="coerce")
+    source = series.to_numpy(copy=True)
+    retry = series[numbers.isna().to_numpy() & (series.map(type) == str).to_numpy()]
+    if len(retry):
+        cleaned = retry.str.replace(noise, "", regex=True)
+        numbers[cleaned.index] = pd.to_numeric(cleaned, errors="coerce")
+        source[cleaned.index] = cleaned.to_numpy()
+    return numbers.to_numpy(dtype=float), source
+
+
+def _pence(values):
+    """
+    Parse a price column into integer pence. Returns (pence, invalid, negative,
+    too_large). Blank cells are 0.00, as with sanitize_price.
+    """
+    series, missing = _column(values)
+    blank = missing | series.map(
+        lambda value: isinstance(value, str) and not value.strip()
+    ).to_numpy()
+    numbers, source = _numbers(series.mask(blank, 0), PRICE_NOISE)
+    invalid = ~np.isfinite(numbers)
+    scaled = np.abs(np.where(invalid, 0, numbers)) * 100
+    pence = np.floor(scaled + 0.5)
+    negative = numbers < 0
+
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < HALF_TOLERANCE
+    for index in np.flatnonzero(near_half & ~invalid):
+        try:
+            number = Decimal(str(source[index]))
+        except InvalidOperation:
+            continue
+        pence[index] = int(abs(number).quantize(Decimal("0.01"), ROUND_HALF_UP) * 100)
+
+    too_large = ~invalid & (pence > MAX_PRICE_PENCE)
+    pence = np.where(invalid | too_large, 0, pence).astype(np.int64)
+    return pence, invalid, negative & ~invalid, too_large
+
+
+def _quantities(values):
+    """
+    Parse a quantity column into integers. Returns (quantities, invalid, negative).
+    """
+    series, missing = _column(values)
+    numbers, _ = _numbers(series, QUANTITY_NOISE)
+    invalid = missing | ~np.isfinite(numbers)
+    numbers = np.where(invalid, 0, numbers)
+    invalid |= numbers % 1 != 0
+    quantities = np.where(invalid, 0, numbers).astype(np.int64)
+    return quantities, invalid, quantities < 0
+
+
+def _text(values):
+    series, missing = _column(values)
+    return series.where(missing, series.astype(str).str.strip()).fillna("")
+
+
+def validate_columns(skus, descriptions=None, prices=None, quantities=None):
+    """
+    Validate item columns of equal length (None for a column the sheet lacks).
+
+    Returns (columns, errors). columns maps "sku", "description", "retail_price"
+    (Decimal), "retail_pence" and "quantity" (int) to lists of clean values, plus
+    "present" (the SKU is not blank) and "valid" (no errors) boolean arrays.
+    errors is a list of {"row", "sku", "field", "error"} dicts. Row numbers are
+    0-based positions in the input; rows with a blank SKU are not reported.
+    """
+    sku_text = _text(skus)
+    present = sku_text.ne("").to_numpy()
+    problems = []
+
+    def flag(mask, field, message):
+        problems.append((np.asarray(mask) & present, field, message))
+
+    flag(
+        sku_text.str.len().gt(SKU_MAX_LENGTH),
+        "sku",
+        f"SKU is longer than {SKU_MAX_LENGTH} characters.",
+    )
+    columns = {"sku": sku_text.tolist(), "present": present}
+
+    if descriptions is not None:
+        description_text = _text(descriptions)
+        flag(
+            description_text.str.len().gt(DESCRIPTION_MAX_LENGTH),
+            "description",
+            f"Description is longer than {DESCRIPTION_MAX_LENGTH} characters.",
+        )
+        columns["description"] = description_text.tolist()
+    if prices is not None:
+        pence, invalid, negative, too_large = _pence(prices)
+        flag(invalid, "retail_price", "Retail price must be a valid number.")
+        flag(too_large, "retail_price", "Retail price is too large.")
+        flag(negative, "retail_price", "Retail price must not be negative.")
+        columns["retail_price"] = [Decimal(int(p)).scaleb(-2) for p in pence]
+        columns["retail_pence"] = pence.tolist()
+    if quantities is not None:
+        values, invalid, negative = _quantities(quantities)
+        flag(invalid, "quantity", "Quantity must be a whole number.")
+        flag(negative, "quantity", "Quantity must not be negative.")
+        columns["quantity"] = values.tolist()
+
+    valid = present.copy()
+    errors = []
+    for mask, field, message in problems:
+        valid &= ~mask
+        errors.extend(
+            {"row": int(row), "sku": columns["sku"][row], "field": field, "error": message}
+            for row in np.flatnonzero(mask)
+        )
+    columns["valid"] = valid
+    errors.sort(key=lambda error: error["row"])
+    return columns, errors
@@ -1,35 +1,136 @@
+import json
 import logging
+from datetime import datetime, time, timedelta
+from decimal import ROUND_HALF_UP, Decimal
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from .models import Item, ShopItem, TransferItem, Admin
-from .serializers import ItemSerializer, ShopItemSerializer, TransferItemSerializer
+from .models import (
+    Admin,
+    ArchivedTransfer,
+    DataVersion,
+    ImportChange,
+    ImportChangeset,
+    Item,
+    ReorderThreshold,
+    ShopItem,
+    StockAlert,
+    StockMovement,
+    StockTotal,
+    TransferItem,
+    TransferSuggestion,
+)
+from .serializers import (
+    ArchivedTransferSerializer,
+    ImportChangeSerializer,
+    ImportChangesetSerializer,
+    ItemSerializer,
+    ReorderThresholdSerializer,
+    ShopItemSerializer,
+    StockAlertSerializer,
+    StockTotalDetailSerializer,
+    StockTotalSerializer,
+    TransferItemSerializer,
+    TransferSuggestionSerializer,
+)
+from .permissions import IsManager
+from .roles import is_manager, is_shop_user
+from .reports import stock_value_report
+from .planner import accept_suggestions, plan_replenishment
+from .catalogue import apply_operation, filter_items
+from .changesets import StaleChangeset, apply_changeset, create_changeset
+from .changelog import changes_after
+from .sales import MAX_EVENTS_PER_REQUEST, record_sales
+from .idempotency import idempotent
+from .edit_lock import is_edit_locked, set_edit_locked
 from .pagination import CustomPagination
 from django.contrib.auth.models import User  # For accessing the User model
 from rest_framework.response import (
     Response,
 )  # For returning HTTP responses in REST framework
-from rest_framework.decorators import api_view, permission_classes
-from django.db.models.functions import Lower, Cast
-from django.http import JsonResponse
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.serializers import BooleanField, ValidationError
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.functions import Lower
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import status
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
-from django.db.models import IntegerField, Q
+from django.db.models import CharField, F, Q, TextField
 from email_service.email import SendEmail
-from .utils import SpreadsheetTools
+from .utils import SheetConversionError, SpreadsheetTools
+from openpyxl import load_workbook
+from .routers import ReadReplicaMixin, read_replica
+from .response_cache import SCOPE_ALL, SCOPE_MANAGERS, CachedResponseMixin, cache_stats
+from .inventory import (
+    archive_transfers,
+    evaluate_alerts,
+    record_movements,
+    refresh_stock_totals,
+    reserve,
+    restore_archived_items,
+    stock_at,
+)
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.db import transaction
 from natsort import natsorted
 
 logger = logging.getLogger(__name__)
 
 
+def _resolve_field(model, field_path):
+    """
+    Return the model field named by a (possibly related) lookup path, or None.
+    """
+    field = None
+    for part in field_path.split("__"):
+        if model is None:
+            return None
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        model = field.related_model
+    return field
+
+
+def apply_ordering(queryset, ordering, natural_sort_key=None, default="-last_updated"):
+    """
+    Order a list queryset by the client's ?ordering= value ("field" or "-field").
+    Text fields sort case-insensitively on Lower(field), matching the expression
+    indexes on the models; other fields are ordered on the bare column so their
+    composite indexes apply. "sku" is naturally sorted in Python. Unknown fields
+    fall back to the default ordering.
+    """
+    if not ordering:
+        return queryset.order_by(default)
+    descending = ordering.startswith("-")
+    field_path = ordering.lstrip("-")
+    if field_path == "sku" and natural_sort_key:
+        return natsorted(list(queryset), key=natural_sort_key, reverse=descending)
+    field = _resolve_field(queryset.model, field_path)
+    if field is None or field.is_relation:
+        return queryset.order_by(default)
+    if isinstance(field, (CharField, TextField)):
+        expression = Lower(field_path)
+    else:
+        expression = F(field_path)
+    return queryset.order_by(expression.desc() if descending else expression.asc())
+
+
 # API View
-class ItemViewSet(viewsets.ModelViewSet):
+class ItemViewSet(CachedResponseMixin, ReadReplicaMixin, viewsets.ModelViewSet):
     queryset = Item.objects.filter(is_active=True)
     serializer_class = ItemSerializer
     lookup_field = "sku"
     permission_classes = [IsAuthenticated]
     pagination_class = CustomPagination
+    # reserved_quantity changes with transfer requests.
+    cache_tables = (DataVersion.ITEM, DataVersion.TRANSFER_ITEM)
+
+    def cache_scope(self):
+        return SCOPE_ALL
 
     def get_queryset(self):
         queryset = Item.objects.filter(is_active=True)
@@ -38,38 +139,25 @@ class ItemViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(
                 Q(description__icontains=search_query) | Q(sku__icontains=search_query)
             )  # 🔍 Search filter
-        ordering = self.request.query_params.get("ordering", None)
-        if ordering:
-            if ordering.lstrip('-') == "sku":
-                items = list(queryset)
-                reverse = ordering.startswith('-')
-                items = natsorted(items, key=lambda x: x.sku, reverse=reverse)
-                return items
-            if ordering.startswith("-"):
-                field = ordering[1:]
-                if field == "quantity":
-                    queryset = queryset.order_by(Cast(field, IntegerField()).desc())
-                else:
-                    queryset = queryset.order_by(Lower(field)).reverse()
-            else:
-                if ordering == "quantity":
-                    queryset = queryset.order_by(Cast(ordering, IntegerField()))
-                else:
-                    queryset = queryset.order_by(Lower(ordering))
-        else:
-            queryset = queryset.order_by("last_updated").reverse()
-        return queryset
+        return apply_ordering(
+            queryset,
+            self.request.query_params.get("ordering", None),
+            natural_sort_key=lambda x: x.sku,
+        )
 
     def create(self, request, *args, **kwargs):
         sku = request.data.get("sku")
         if sku:
+            # An archived SKU comes back as an inactive item and is reactivated below.
+            with transaction.atomic():
+                restore_archived_items([sku])
             try:
                 item = Item.objects.get(sku=sku)
                 if not item.is_active:
                     # Reactivate and update fields
                     serializer = ItemSerializer(item, data=request.data, partial=True)
                     if serializer.is_valid():
-                        serializer.save(is_active=True)
+                        self._save_item(serializer, is_active=True)
                         return Response(serializer.data, status=status.HTTP_200_OK)
                     else:
                         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -79,18 +167,34 @@ class ItemViewSet(viewsets.ModelViewSet):
                 pass
         return super().create(request, *args, **kwargs)
 
+    def perform_create(self, serializer):
+        self._save_item(serializer)
+
+    def _save_item(self, serializer, **kwargs):
+        previous_quantity = serializer.instance.quantity if serializer.instance else 0
+        with transaction.atomic():
+            item = serializer.save(**kwargs)
+            record_movements(
+                [(item.sku, None, StockMovement.Kind.EDIT, item.quantity - previous_quantity)]
+            )
+            refresh_stock_totals([item.sku])
+            DataVersion.bump(DataVersion.ITEM)
+        return item
+
     def update(self, request, *args, **kwargs):
-        if not request.user.groups.filter(name="managers").exists():
+        if not is_manager(request.user):
             return Response(
                 {"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN
             )
         sku = request.data.get("sku")
+        with transaction.atomic():
+            restore_archived_items([sku])
         try:
             item = Item.objects.get(sku=sku)
             if not item.is_active:
                 serializer = ItemSerializer(item, data=request.data, partial=True)
                 if serializer.is_valid():
-                    serializer.save(is_active=True)
+                    self._save_item(serializer, is_active=True)
                     return Response(serializer.data, status=status.HTTP_200_OK)
                 else:
                     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -100,13 +204,131 @@ class ItemViewSet(viewsets.ModelViewSet):
             )
         serializer = ItemSerializer(item, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            self._save_item(serializer)
             return Response(serializer.data, status=status.HTTP_200_OK)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=["patch"], url_path="bulk")
+    def bulk_update(self, request):
+        """
+        Apply many partial edits in one transaction. Takes a list of objects (or
+        {"items": [...]}) each holding a "sku" plus the fields to change. Edited
+        inactive items are reactivated, as with a single update. Rows that fail
+        validation are reported back by index and the rest are applied.
+        """
+        if not is_manager(request.user):
+            return Response(
+                {"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN
+            )
+        entries = request.data
+        if isinstance(entries, dict):
+            entries = entries.get("items", None)
+        if not isinstance(entries, list) or not entries:
+            return Response(
+                {"detail": "Expected a non-empty list of items."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        skus = [entry.get("sku") for entry in entries if isinstance(entry, dict)]
+        skus = [sku for sku in skus if sku]
+        items = Item.objects.in_bulk(skus, field_name="sku")
+        missing = set(skus) - set(items)
+        if missing:
+            with transaction.atomic():
+                if restore_archived_items(missing):
+                    items = Item.objects.in_bulk(skus, field_name="sku")
+        errors, changed, seen = [], {}, set()
+        fields = {"is_active", "last_updated", "row_hash"}
+        for index, entry in enumerate(entries):
+            if not isinstance(entry, dict) or not entry.get("sku"):
+                errors.append(
+                    {"index": index, "errors": {"sku": ["This field is required."]}}
+                )
+                continue
+            sku = entry["sku"]
+            if sku in seen:
+                errors.append(
+                    {"index": index, "sku": sku, "errors": {"sku": ["Duplicate SKU in request."]}}
+                )
+                continue
+            seen.add(sku)
+            item = items.get(sku)
+            if item is None:
+                errors.append(
+                    {"index": index, "sku": sku, "errors": {"sku": ["Item not found."]}}
+                )
+                continue
+            data = {key: value for key, value in entry.items() if key != "sku"}
+            serializer = ItemSerializer(item, data=data, partial=True)
+            if not serializer.is_valid():
+                errors.append({"index": index, "sku": sku, "errors": serializer.errors})
+                continue
+            changed[sku] = (item, item.quantity, serializer.validated_data)
+
+        now = timezone.now()
+        movements = []
+        for sku, (item, previous_quantity, validated) in changed.items():
+            for field, value in validated.items():
+                if field == "retail_price":
+                    # The serializer returns a float, and bulk_update skips the
+                    # Decimal rounding in Item.save().
+                    value = Decimal(str(value)).quantize(
+                        Decimal("0.01"), rounding=ROUND_HALF_UP
+                    )
+                setattr(item, field, value)
+                fields.add(field)
+            item.is_active = True
+            item.last_updated = now
+            # bulk_update skips save(), so drop the import fingerprint.
+            item.row_hash = None
+            movements.append(
+                (sku, None, StockMovement.Kind.EDIT, item.quantity - previous_quantity)
+            )
+        if changed:
+            with transaction.atomic():
+                Item.objects.bulk_update(
+                    [item for item, _, _ in changed.values()], sorted(fields), batch_size=500
+                )
+                record_movements(movements)
+                refresh_stock_totals(list(changed))
+                DataVersion.bump(DataVersion.ITEM)
+        return Response(
+            {"updated": list(changed), "errors": errors},
+            status=status.HTTP_200_OK if changed or not errors else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(detail=False, methods=["post"], url_path="bulk_operation")
+    def bulk_operation(self, request):
+        """
+        Apply one operation to every item matching a filter, as a single UPDATE.
+        Body: {"filter": {search, sku_prefix, is_active, min_quantity, max_quantity},
+        "operation": price_percent | price_absolute | description_suffix | activate |
+        deactivate, "value": ..., "dry_run": true|false}.
+        """
+        if not is_manager(request.user):
+            return Response(
+                {"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN
+            )
+        item_filter = request.data.get("filter", None) or {}
+        if not isinstance(item_filter, dict):
+            return Response(
+                {"detail": "filter must be an object."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            result = apply_operation(
+                filter_items(item_filter),
+                request.data.get("operation", None),
+                request.data.get("value", None),
+                dry_run=str(request.data.get("dry_run", False)).lower() == "true",
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
+
     def destroy(self, request, *args, **kwargs):
-        if not request.user.groups.filter(name="managers").exists():
+        if not is_manager(request.user):
             return Response(
                 {"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN
             )
@@ -114,102 +336,418 @@ class ItemViewSet(viewsets.ModelViewSet):
         try:
             item = Item.objects.get(sku=sku)
             item.is_active = False
-            item.save()
+            with transaction.atomic():
+                item.save()
+                DataVersion.bump(DataVersion.ITEM)
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Item.DoesNotExist:
             return Response({"error": "Item not found."}, status=status.HTTP_404_NOT_FOUND)
 
 
-class ShopItemViewSet(viewsets.ModelViewSet):
+class ShopItemViewSet(CachedResponseMixin, ReadReplicaMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only: shop stock changes through the transfer endpoints, which keep
+    reservations, the movement ledger and StockTotal in step.
+    """
+
     queryset = ShopItem.objects.all()
     serializer_class = ShopItemSerializer
     lookup_field = "item__sku"
     permission_classes = [IsAuthenticated]
     pagination_class = CustomPagination
+    cache_tables = (DataVersion.SHOP_ITEM, DataVersion.ITEM, DataVersion.TRANSFER_ITEM)
 
     def get_queryset(self):
-        queryset = ShopItem.objects.filter(shop_user=self.request.user).exclude(item=None)
+        queryset = (
+            ShopItem.objects.filter(shop_user=self.request.user)
+            .exclude(item=None)
+            .select_related("item", "shop_user")
+            .prefetch_related("shop_user__groups")
+        )
         search_query = self.request.query_params.get("search", None)
         if search_query:
             queryset = queryset.filter(
                 Q(item__description__icontains=search_query)
                 | Q(item__sku__icontains=search_query)
             )  # 🔍 Search filter
-        ordering = self.request.query_params.get("ordering", None)
-        if ordering:
-            if ordering.lstrip('-') == "sku":
-                items = list(queryset)
-                reverse = ordering.startswith('-')
-                items = natsorted(items, key=lambda x: x.item.sku if x.item else '', reverse=reverse)
-                return items
-            if ordering.startswith("-"):
-                field = ordering[1:]
-                if field == "quantity":
-                    queryset = queryset.order_by(Cast(field, IntegerField()).desc())
-                else:
-                    queryset = queryset.order_by(Lower(field)).reverse()
-            else:
-                if ordering == "quantity":
-                    queryset = queryset.order_by(Cast(ordering, IntegerField()))
-                else:
-                    queryset = queryset.order_by(Lower(ordering))
-        return queryset
+        return apply_ordering(
+            queryset,
+            self.request.query_params.get("ordering", None),
+            natural_sort_key=lambda x: x.item.sku if x.item else '',
+        )
 
 
-class TransferItemViewSet(viewsets.ModelViewSet):
+class TransferItemViewSet(CachedResponseMixin, ReadReplicaMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only: transfers are created and completed through the transfer endpoints.
+    """
+
     queryset = TransferItem.objects.all()
     serializer_class = TransferItemSerializer
     lookup_field = "item__sku"
     permission_classes = [IsAuthenticated]
     pagination_class = CustomPagination
+    cache_tables = (DataVersion.TRANSFER_ITEM, DataVersion.ITEM)
+
+    def cache_scope(self):
+        # Managers all see every ordered transfer.
+        if is_manager(self.request.user):
+            return SCOPE_MANAGERS
+        return super().cache_scope()
 
     def get_queryset(self):
         user = self.request.user
-        if user.groups.filter(name="managers").exists():
+        if is_manager(user):
             queryset = TransferItem.objects.filter(ordered=True)
         else:
             queryset = TransferItem.objects.filter(shop_user=user)
+        queryset = queryset.select_related("item", "shop_user").prefetch_related(
+            "shop_user__groups"
+        )
         search_query = self.request.query_params.get("search", None)
         if search_query:
             queryset = queryset.filter(
                 Q(item__description__icontains=search_query)
                 | Q(item__sku__icontains=search_query)
             )  # 🔍 Search filter
-        ordering = self.request.query_params.get("ordering", None)
-        if ordering:
-            if ordering.lstrip('-') == "sku":
-                items = list(queryset)
-                reverse = ordering.startswith('-')
-                items = natsorted(items, key=lambda x: x.item.sku, reverse=reverse)
-                return items
-            if ordering.startswith("-"):
-                field = ordering[1:]
-                if field == "quantity":
-                    queryset = queryset.order_by(Cast(field, IntegerField()).desc())
-                else:
-                    queryset = queryset.order_by(Lower(field)).reverse()
-            else:
-                if ordering == "quantity":
-                    queryset = queryset.order_by(Cast(ordering, IntegerField()))
-                else:
-                    queryset = queryset.order_by(Lower(ordering))
+        return apply_ordering(
+            queryset,
+            self.request.query_params.get("ordering", None),
+            natural_sort_key=lambda x: x.item.sku,
+        )
+
+
+class StockTotalViewSet(CachedResponseMixin, ReadReplicaMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Per-SKU stock totals read from the maintained StockTotal table; the detail view
+    adds the per-shop breakdown.
+    """
+
+    queryset = StockTotal.objects.all()
+    serializer_class = StockTotalSerializer
+    lookup_field = "item_id"
+    permission_classes = [IsManager]
+    pagination_class = CustomPagination
+    cache_tables = (DataVersion.ITEM, DataVersion.SHOP_ITEM, DataVersion.TRANSFER_ITEM)
+
+    def cache_scope(self):
+        return SCOPE_ALL
+
+    def get_serializer_class(self):
+        if self.action == "retrieve":
+            return StockTotalDetailSerializer
+        return StockTotalSerializer
+
+    def get_queryset(self):
+        queryset = StockTotal.objects.filter(item__is_active=True).select_related("item")
+        search_query = self.request.query_params.get("search", None)
+        if search_query:
+            queryset = queryset.filter(
+                Q(item__description__icontains=search_query)
+                | Q(item_id__icontains=search_query)
+            )  # 🔍 Search filter
+        return apply_ordering(
+            queryset,
+            self.request.query_params.get("ordering", None),
+            natural_sort_key=lambda x: x.item_id,
+        )
+
+
+class TransferHistoryViewSet(ReadReplicaMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Archived (completed and cancelled) transfers. Managers see every shop, shop
+    users their own. Filters: shop_user, sku, status, month (YYYYMM), date_from and
+    date_to (YYYY-MM-DD, inclusive, on completion date).
+    """
+
+    queryset = ArchivedTransfer.objects.all()
+    serializer_class = ArchivedTransferSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CustomPagination
+
+    def get_queryset(self):
+        user = self.request.user
+        params = self.request.query_params
+        queryset = ArchivedTransfer.objects.select_related("shop_user")
+        if not is_manager(user):
+            queryset = queryset.filter(shop_user=user)
+        elif params.get("shop_user"):
+            queryset = queryset.filter(shop_user__username=params["shop_user"])
+        if params.get("sku"):
+            queryset = queryset.filter(sku=params["sku"])
+        if params.get("status"):
+            queryset = queryset.filter(
+                status={
+                    "completed": ArchivedTransfer.Status.COMPLETED,
+                    "cancelled": ArchivedTransfer.Status.CANCELLED,
+                }.get(params["status"].lower(), 0)
+            )
+        if params.get("month", "").isdigit():
+            queryset = queryset.filter(completed_month=int(params["month"]))
+        # Compare against datetime bounds rather than completed_at__date so the
+        # completed_at indexes can be used.
+        date_from = parse_date(params.get("date_from", ""))
+        date_to = parse_date(params.get("date_to", ""))
+        if date_from:
+            queryset = queryset.filter(
+                completed_at__gte=timezone.make_aware(datetime.combine(date_from, time.min))
+            )
+        if date_to:
+            queryset = queryset.filter(
+                completed_at__lt=timezone.make_aware(
+                    datetime.combine(date_to + timedelta(days=1), time.min)
+                )
+            )
+        return apply_ordering(
+            queryset, params.get("ordering", None), default="-completed_at"
+        )
+
+
+class ReorderThresholdViewSet(viewsets.ModelViewSet):
+    """
+    Manager-maintained reorder levels per SKU, for the warehouse (shop_user null) or
+    a single shop. Saving or deleting one re-evaluates the alert for its location.
+    """
+
+    queryset = ReorderThreshold.objects.all()
+    serializer_class = ReorderThresholdSerializer
+    permission_classes = [IsManager]
+    pagination_class = CustomPagination
+
+    def get_queryset(self):
+        queryset = ReorderThreshold.objects.select_related("shop_user").order_by(
+            "item_id", "shop_user__username"
+        )
+        sku = self.request.query_params.get("sku", None)
+        if sku:
+            queryset = queryset.filter(item_id=sku)
         return queryset
 
+    @transaction.atomic
+    def perform_create(self, serializer):
+        threshold = serializer.save()
+        evaluate_alerts({(threshold.item_id, threshold.shop_user_id)})
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        previous = (serializer.instance.item_id, serializer.instance.shop_user_id)
+        threshold = serializer.save()
+        evaluate_alerts({previous, (threshold.item_id, threshold.shop_user_id)})
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        key = (instance.item_id, instance.shop_user_id)
+        instance.delete()
+        evaluate_alerts({key})
+
+
+class StockAlertViewSet(ReadReplicaMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Low-stock alerts. Managers see every location, shop users their own shop.
+    Filters: status (open (default), resolved or all), sku, shop_user (managers
+    only; "warehouse" for the warehouse).
+    """
+
+    queryset = StockAlert.objects.all()
+    serializer_class = StockAlertSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CustomPagination
+
+    def get_queryset(self):
+        user = self.request.user
+        params = self.request.query_params
+        queryset = StockAlert.objects.select_related("item", "shop_user")
+        if not is_manager(user):
+            queryset = queryset.filter(shop_user=user)
+        elif params.get("shop_user") == "warehouse":
+            queryset = queryset.filter(shop_user__isnull=True)
+        elif params.get("shop_user"):
+            queryset = queryset.filter(shop_user__username=params["shop_user"])
+        alert_status = params.get("status", "open").lower()
+        if alert_status == "open":
+            queryset = queryset.filter(resolved_at__isnull=True)
+        elif alert_status == "resolved":
+            queryset = queryset.filter(resolved_at__isnull=False)
+        if params.get("sku"):
+            queryset = queryset.filter(item_id=params["sku"])
+        return apply_ordering(
+            queryset, params.get("ordering", None), default="-created_at"
+        )
+
+
+class TransferSuggestionViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Draft transfers from the replenishment planner. Shop users see and accept their
+    own; managers see every shop (filter with ?shop_user=) and run the planner.
+    """
+
+    queryset = TransferSuggestion.objects.all()
+    serializer_class = TransferSuggestionSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CustomPagination
+
+    def _is_manager(self):
+        return is_manager(self.request.user)
+
+    def get_queryset(self):
+        queryset = TransferSuggestion.objects.select_related("item")
+        shop_user = self.request.query_params.get("shop_user", None)
+        if not self._is_manager():
+            queryset = queryset.filter(shop_user=self.request.user)
+        elif shop_user:
+            queryset = queryset.filter(shop_user__username=shop_user)
+        return queryset.order_by("item_id")
+
+    @action(detail=False, methods=["post"])
+    def plan(self, request):
+        """
+        Re-plan every shop (managers, optionally limited to "shop_users" usernames)
+        or the requesting shop user's own shop.
+        """
+        if self._is_manager():
+            usernames = request.data.get("shop_users", None)
+            shop_user_ids = (
+                list(User.objects.filter(username__in=usernames).values_list("id", flat=True))
+                if usernames
+                else None
+            )
+        elif is_shop_user(request.user):
+            shop_user_ids = [request.user.id]
+        else:
+            return Response(
+                {"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(plan_replenishment(shop_user_ids), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"])
+    def accept(self, request):
+        """
+        Move the shop user's suggestions (all, or the "ids" given) into their
+        transfer basket, ready for submit-transfer-request.
+        """
+        if not is_shop_user(request.user):
+            return Response(
+                {"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN
+            )
+        if is_edit_locked():
+            return Response(
+                {
+                    "detail": "Transfers are disabled as the warehouse is being maintained. Please try again later."
+                },
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        accepted, skipped = accept_suggestions(request.user, request.data.get("ids", None))
+        return Response(
+            {"accepted": accepted, "skipped": skipped}, status=status.HTTP_200_OK
+        )
+
+
+class ImportChangesetViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Previewed spreadsheet uploads (POST /api/import_data/?dry_run=true). The diff
+    is paged from changes/ (filter with ?kind=), and confirm/ applies it.
+    """
+
+    queryset = ImportChangeset.objects.all()
+    serializer_class = ImportChangesetSerializer
+    permission_classes = [IsManager]
+    pagination_class = CustomPagination
+    lookup_value_regex = r"\d+"
+
+    def get_queryset(self):
+        return ImportChangeset.objects.select_related("created_by").order_by("-created_at")
+
+    @staticmethod
+    def paginated_changes(request, changeset):
+        queryset = changeset.changes.order_by("id")
+        kind = request.query_params.get("kind", None)
+        if kind:
+            try:
+                queryset = queryset.filter(kind=ImportChange.Kind[kind.upper()])
+            except KeyError:
+                raise ValueError(
+                    "kind must be one of: "
+                    + ", ".join(k.name.lower() for k in ImportChange.Kind)
+                    + "."
+                )
+        paginator = CustomPagination()
+        page = paginator.paginate_queryset(queryset, request)
+        return paginator.get_paginated_response(
+            ImportChangeSerializer(page, many=True).data
+        ).data
+
+    @action(detail=True, methods=["get"])
+    def changes(self, request, pk=None):
+        try:
+            return Response(self.paginated_changes(request, self.get_object()))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=True, methods=["post"])
+    def confirm(self, request, pk=None):
+        """
+        Apply the previewed upload, unless rows it touches have changed since.
+        """
+        if not Admin.is_allow_updoads():
+            return Response(
+                {"detail": "Uploads are disabled in the app configuration."}, status=400
+            )
+        tools = SpreadsheetTools(request)
+        try:
+            skipped_skus, row_errors = apply_changeset(tools, self.get_object())
+        except StaleChangeset as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+        return tools.import_response(skipped_skus, row_errors)
+
+
+def _preview_upload(request):
+    """
+    Parse the uploaded workbook and store its diff as a pending ImportChangeset.
+    Returns the changeset with the first page of its changes.
+    """
+    tools = SpreadsheetTools(request)
+    file_obj = tools.uploaded_file()
+    if file_obj is None:
+        return Response(
+            {"detail": "Invalid file format. Please upload an .xlsx file."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        changeset = create_changeset(tools, tools.load_sheets(load_workbook(file_obj)))
+    except SheetConversionError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error("Error while previewing Excel file: %s", str(e), exc_info=True)
+        return Response({"detail": "Failed to preview stock data."}, status=400)
+    return Response(
+        {
+            **ImportChangesetSerializer(changeset).data,
+            "changes": ImportChangesetViewSet.paginated_changes(request, changeset),
+        },
+        status=status.HTTP_200_OK,
+    )
+
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def set_edit_lock_status(request):
-    if not request.user.groups.filter(name="managers").exists():
+    if not is_manager(request.user):
         return Response(
             {"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN
         )
 
-    edit_lock_status = request.data.get("edit_lock_status", False)
-    admin, created = Admin.objects.get_or_create(id=1)
-    admin.edit_lock = edit_lock_status
-    admin.save()
+    try:
+        edit_lock_status = BooleanField().to_internal_value(
+            request.data.get("edit_lock_status", False)
+        )
+    except ValidationError:
+        return Response(
+            {"detail": "edit_lock_status must be true or false."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    set_edit_locked(edit_lock_status)
     return Response(
-        {"edit_lock": admin.edit_lock},
+        {"edit_lock": edit_lock_status},
         status=status.HTTP_200_OK,
     )
 
@@ -217,7 +755,7 @@ def set_edit_lock_status(request):
 @csrf_exempt
 def get_edit_lock_status(request):
     if request.method == "GET":
-        edit_lock = Admin.is_edit_locked()
+        edit_lock = is_edit_locked()
         return JsonResponse({"edit_lock": edit_lock})
     return JsonResponse({"error": "Invalid request method"}, status=400)
 
@@ -250,8 +788,9 @@ def get_user(request):
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@idempotent
 def transfer_item(request):
-    if Admin.objects.first().edit_lock:
+    if is_edit_locked():
         logger.debug("Transfer attempt while update mode is enabled.")
         return Response(
             {
@@ -259,7 +798,7 @@ def transfer_item(request):
             },
             status=status.HTTP_403_FORBIDDEN,
         )
-    if not request.user.groups.filter(name="shop_users").exists():
+    if not is_shop_user(request.user):
         logger.debug("Permission denied: user is not in shop_users group.")
         return Response(
             {"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN
@@ -291,21 +830,26 @@ def transfer_item(request):
     return Response({"detail": "Transfer successful."}, status=status.HTTP_200_OK)
 
 
+@transaction.atomic
 def transfer_to_shop(
     item, shop_user, transfer_quantity, complete=False, cancel=False, manager=False
 ):
-    if Admin.is_edit_locked() and not manager:
+    if is_edit_locked() and not manager:
         raise ValueError(
             "Transfers are disabled as the warehouse is being maintained. Please try again later."
         )
+    shop_user_id = getattr(shop_user, "pk", shop_user)
+    # Re-read quantities now that the transaction holds the write lock.
+    item.refresh_from_db(fields=["quantity", "reserved_quantity"])
     if cancel:
-        transfer_item = TransferItem.objects.get(
-            item=item, shop_user=shop_user
-        ).delete()
+        transfer_item = TransferItem.objects.get(item=item, shop_user=shop_user)
+        archive_transfers([transfer_item], ArchivedTransfer.Status.CANCELLED)
+        reserve(item, -transfer_item.quantity)
+        record_movements(
+            [(item.sku, shop_user_id, StockMovement.Kind.CANCEL, -transfer_item.quantity)]
+        )
     else:
         transfer_quantity = int(transfer_quantity)
-        if item.quantity < transfer_quantity:
-            raise ValueError("Not enough stock to transfer")
         if not complete:
             xfer_item, created = TransferItem.objects.get_or_create(
                 shop_user=shop_user, item=item
@@ -314,13 +858,30 @@ def transfer_to_shop(
                 raise LookupError(
                     "This item has already been ordered and is awaiting dispatch. Please contact the warehouse manager if you wish to amend your order."
                 )
+            previous_quantity = xfer_item.quantity
+            # This shop's own pending request is being replaced, so it counts as available.
+            if item.available_quantity + previous_quantity < transfer_quantity:
+                raise ValueError("Not enough stock to transfer")
             xfer_item.quantity = transfer_quantity
             xfer_item.save()
+            reserve(item, transfer_quantity - previous_quantity)
+            record_movements(
+                [
+                    (
+                        item.sku,
+                        shop_user_id,
+                        StockMovement.Kind.TRANSFER,
+                        transfer_quantity - previous_quantity,
+                    )
+                ]
+            )
         else:
-            if item.quantity < int(transfer_quantity):
+            shop_user = User.objects.get(id=shop_user)
+            pending = TransferItem.objects.get(item=item, shop_user=shop_user)
+            # Stock reserved for other shops' pending requests is not available.
+            if item.quantity - (item.reserved_quantity - pending.quantity) < transfer_quantity:
                 raise ValueError("Not enough stock to transfer")
             # transfer to ShopItem database
-            shop_user = User.objects.get(id=shop_user)
             shop_item, created = ShopItem.objects.get_or_create(
                 item=item, shop_user=shop_user
             )
@@ -329,15 +890,30 @@ def transfer_to_shop(
             # change quantity recorded for stock Item in warehouse
             item.quantity -= transfer_quantity
             item.save()
-            # delete item from pending transfer
-            TransferItem.objects.get(item=item, shop_user=shop_user).delete()
+            # move item from pending transfer into the transfer history
+            archive_transfers(
+                [pending], ArchivedTransfer.Status.COMPLETED, quantity=transfer_quantity
+            )
+            reserve(item, -pending.quantity)
+            record_movements(
+                [
+                    (item.sku, None, StockMovement.Kind.DISPATCH, -transfer_quantity),
+                    (item.sku, shop_user_id, StockMovement.Kind.DISPATCH, transfer_quantity),
+                ]
+            )
+    refresh_stock_totals([item.sku])
+    if complete and not cancel:
+        DataVersion.bump(DataVersion.ITEM, DataVersion.SHOP_ITEM, DataVersion.TRANSFER_ITEM)
+    else:
+        DataVersion.bump(DataVersion.TRANSFER_ITEM)
 
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@idempotent
 def submit_transfer_request(request):
     try:
-        if not Admin.is_edit_locked():
+        if not is_edit_locked():
             queryset = TransferItem.objects.filter(
                 shop_user=request.user.id, ordered=False
             )
@@ -357,7 +933,9 @@ def submit_transfer_request(request):
                     notification_type=SendEmail.EmailType.STOCK_TRANSFER,
                 )
                 # update records ordered status to True
-                queryset.update(ordered=True)
+                with transaction.atomic():
+                    queryset.update(ordered=True)
+                    DataVersion.bump(DataVersion.TRANSFER_ITEM)
             else:
                 return Response(
                     {"detail": "There were no outstanding items to request!"},
@@ -380,6 +958,7 @@ def submit_transfer_request(request):
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@idempotent
 def complete_transfer(request):
     sku = request.data.get("sku")
     quantity = request.data.get("quantity")
@@ -393,7 +972,8 @@ def complete_transfer(request):
         return Response(
             {"detail": "Shop user not found."}, status=status.HTTP_400_BAD_REQUEST
         )
-    if not request.user.groups.filter(name="managers").exists() and not cancel:
+    manager = is_manager(request.user)
+    if not manager and not cancel:
         return Response(
             {"detail": "Permission denied. User is not in managers group."},
             status=status.HTTP_403_FORBIDDEN,
@@ -401,7 +981,7 @@ def complete_transfer(request):
     try:
         item = Item.objects.get(sku=sku)
         transfer_to_shop(
-            manager=request.user.groups.filter(name="managers").exists(),
+            manager=manager,
             item=item,
             shop_user=shop_user_id,
             transfer_quantity=quantity,
@@ -432,31 +1012,178 @@ def app_config(request):
     })
 
 
+@api_view(["GET"])
+@permission_classes([IsManager])
+def stock_at_time(request):
+    """
+    Point-in-time stock from the movement ledger: ?at=<ISO datetime> (default now),
+    optional ?sku=, and ?shop_user=<username> (default: the warehouse).
+    """
+    at = request.query_params.get("at")
+    at = parse_datetime(at) if at else timezone.now()
+    if at is None:
+        return Response(
+            {"detail": "'at' must be an ISO 8601 datetime."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if timezone.is_naive(at):
+        at = timezone.make_aware(at)
+    shop_username = request.query_params.get("shop_user")
+    shop_user_id = None
+    if shop_username:
+        try:
+            shop_user_id = User.objects.get(username=shop_username).id
+        except User.DoesNotExist:
+            return Response(
+                {"detail": "Shop user not found."}, status=status.HTTP_400_BAD_REQUEST
+            )
+    with read_replica():
+        quantities = stock_at(
+            at, shop_user_id=shop_user_id, sku=request.query_params.get("sku")
+        )
+    return Response(
+        {
+            "at": at.isoformat(),
+            "location": shop_username or "warehouse",
+            "quantities": quantities,
+        }
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def stock_value(request):
+    """
+    Stock value report. Managers get the warehouse, every shop and the overall
+    total, or a single shop with ?shop_user=<username>; shop users get their own
+    shop. ?prefix_length=<n> adds a breakdown by the first n characters of the SKU.
+    """
+    manager = is_manager(request.user)
+    if not manager and not is_shop_user(request.user):
+        return Response(
+            {"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN
+        )
+    prefix_length = request.query_params.get("prefix_length", "")
+    if prefix_length and not (prefix_length.isdigit() and 0 < int(prefix_length) <= 100):
+        return Response(
+            {"detail": "prefix_length must be an integer between 1 and 100."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    shop_user = None if manager else request.user
+    shop_username = request.query_params.get("shop_user")
+    if manager and shop_username:
+        try:
+            shop_user = User.objects.get(username=shop_username)
+        except User.DoesNotExist:
+            return Response(
+                {"detail": "Shop user not found."}, status=status.HTTP_400_BAD_REQUEST
+            )
+    with read_replica():
+        report = stock_value_report(shop_user, int(prefix_length or 0) or None)
+    return Response(report)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def changes_since(request):
+    """
+    Delta sync for shop systems, streamed as NDJSON: one line per Item or ShopItem
+    changed after ?cursor=<n> (default 0, i.e. everything), oldest first, then a
+    final {"type": "cursor"} line with the cursor to send next time. Deleted and
+    deactivated objects come as "delete" / "deactivate" lines. Shop users get every
+    Item but only their own ShopItems. ?limit=<n> caps the number of changes.
+    """
+    manager = is_manager(request.user)
+    if not manager and not is_shop_user(request.user):
+        return Response(
+            {"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN
+        )
+    cursor = request.query_params.get("cursor", "0")
+    limit = request.query_params.get("limit", "")
+    if not cursor.isdigit() or (limit and not (limit.isdigit() and int(limit) > 0)):
+        return Response(
+            {"detail": "cursor must be a non-negative integer and limit a positive one."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    lines = changes_after(
+        int(cursor), request.user, manager, int(limit) if limit else None
+    )
+    return StreamingHttpResponse(
+        (json.dumps(line) + "\n" for line in lines),
+        content_type="application/x-ndjson",
+    )
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def record_sale_events(request):
+    """
+    Accept a batch of POS sale events: a list (or {"events": [...]}) of
+    {"event_id", "shop", "sku", "qty", "ts"}. Events are stored and applied to shop
+    stock later, in aggregate, by the apply_sales command. Already-received
+    event_ids are skipped. Invalid events are reported back by index and the rest
+    are accepted.
+    """
+    manager = is_manager(request.user)
+    if not manager and not is_shop_user(request.user):
+        return Response(
+            {"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN
+        )
+    entries = request.data
+    if isinstance(entries, dict):
+        entries = entries.get("events", None)
+    if not isinstance(entries, list) or not entries:
+        return Response(
+            {"detail": "Expected a non-empty list of events."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(entries) > MAX_EVENTS_PER_REQUEST:
+        return Response(
+            {"detail": f"At most {MAX_EVENTS_PER_REQUEST} events per request."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    accepted, duplicates, errors = record_sales(request.user, entries, manager)
+    return Response(
+        {"accepted": accepted, "duplicates": duplicates, "errors": errors},
+        status=status.HTTP_202_ACCEPTED
+        if accepted or duplicates or not errors
+        else status.HTTP_400_BAD_REQUEST,
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsManager])
+def response_cache_stats(request):
+    """
+    Hit/miss counters and size of the shared caches.
+    """
+    return Response(cache_stats())
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def export_data_excel(request):
     """
     Export data as Excel for download.
     """
-    if not (
-        request.user.groups.filter(name="managers").exists()
-        or request.user.groups.filter(name="shop_users").exists()
-    ):
+    if not (is_manager(request.user) or is_shop_user(request.user)):
         logger.debug("Permission denied: user is not in shop_users or managers group.")
         return Response(
             {"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN
         )
-    return SpreadsheetTools(request).generate_excel_response()
+    with read_replica():
+        return SpreadsheetTools(request).generate_excel_response()
 
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def import_data_excel(request):
     """
-    Import data from an uploaded Excel file.
+    Import data from an uploaded Excel file. With ?dry_run=true nothing is written;
+    the changes are returned as an ImportChangeset to confirm later.
     """
     # Only allow managers to perform the upload.
-    if not request.user.groups.filter(name="managers").exists():
+    if not is_manager(request.user):
         logger.debug("Permission denied: user is not in managers group.")
         return Response(
             {"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN
@@ -466,4 +1193,6 @@ def import_data_excel(request):
         return Response(
             {"detail": "Uploads are disabled in the app configuration."}, status=400
         )
+    if str(request.query_params.get("dry_run", "")).lower() == "true":
+        return _preview_upload(request)
     return SpreadsheetTools(request).handle_excel_upload()
@@ -0,0 +1,203 @@
+"""
+Minimal .xlsx sheet reader that can parse one slice of a sheet on its own, so large
+sheets can be split across a process pool.
+
+openpyxl (even in read-only mode) has to parse every row before the first one
+wanted, so splitting a sheet into row ranges gains nothing with it. Here the
+sheet XML is split on <row> element boundaries by byte offset, and each slice is
+parsed separately. Cell values and rows follow openpyxl's values_only
+conventions (a missing row reads as a blank one), except that number formats are
+ignored, so date-formatted numbers stay numbers, and formula cells give their
+cached value. That is fine for the stock sheets, which hold neither.
+"""
+import posixpath
+import re
+import zipfile
+from xml.etree.ElementTree import XMLParser, fromstring, iterparse
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_NS = "{%s}" % MAIN_NS
+
+ROW_START = b"<row "
+SHEET_DATA_END = b"</sheetData>"
+_COLUMN = re.compile(r"[A-Z]+")
+
+
+class UnsupportedSheet(Exception):
+    """
+    The sheet XML cannot be split on <row> boundaries (e.g. it uses a namespace
+    prefix); callers should fall back to openpyxl.
+    """
+
+
+def sheet_paths(path):
+    """
+    Return {sheet name: zip member path} for a workbook.
+    """
+    with zipfile.ZipFile(path) as archive:
+        workbook = fromstring(archive.read("xl/workbook.xml"))
+        rels = fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {
+        rel.get("Id"): rel.get("Target")
+        for rel in rels.iter("{%s}Relationship" % PKG_REL_NS)
+    }
+    paths = {}
+    for sheet in workbook.iter(_NS + "sheet"):
+        target = targets[sheet.get("{%s}id" % REL_NS)]
+        paths[sheet.get("name")] = (
+            target.lstrip("/") if target.startswith("/") else posixpath.join("xl", target)
+        )
+    return paths
+
+
+def _text(element):
+    """
+    The text of a string item or inline string: plain and rich text runs, without
+    phonetic hints.
+    """
+    parts = []
+    for child in element:
+        if child.tag == _NS + "t":
+            parts.append(child.text or "")
+        elif child.tag == _NS + "r":
+            parts.append(child.findtext(_NS + "t") or "")
+    return "".join(parts)
+
+
+def _shared_strings(archive):
+    try:
+        stream = archive.open("xl/sharedStrings.xml")
+    except KeyError:
+        return []
+    strings = []
+    with stream:
+        for _, element in iterparse(stream):
+            if element.tag == _NS + "si":
+                strings.append(_text(element))
+                element.clear()
+    return strings
+
+
+def _column_index(reference):
+    index = 0
+    for char in _COLUMN.match(reference).group():
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+def _cell_value(cell, strings):
+    kind = cell.get("t", "n")
+    if kind == "inlineStr":
+        inline = cell.find(_NS + "is")
+        return _text(inline) if inline is not None else None
+    value = cell.findtext(_NS + "v")
+    if value is None:
+        return None
+    if kind == "s":
+        return strings[int(value)]
+    if kind == "b":
+        return value == "1"
+    if kind in ("str", "e"):
+        return value
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _rows(element, strings, width):
+    for row in element.iter(_NS + "row"):
+        values = [None] * width
+        for position, cell in enumerate(row.iter(_NS + "c")):
+            reference = cell.get("r")
+            index = _column_index(reference) if reference else position
+            if index >= len(values):
+                values.extend([None] * (index + 1 - len(values)))
+            values[index] = _cell_value(cell, strings)
+        number = row.get("r")
+        if number is None:
+            raise UnsupportedSheet("row without a row number")
+        yield int(number), tuple(values)
+
+
+def split_points(path, member, parts):
+    """
+    Return byte offsets cutting the sheet's XML into `parts` slices of whole rows.
+    """
+    with zipfile.ZipFile(path) as archive:
+        data = archive.read(member)
+    first = data.find(ROW_START)
+    end = data.find(SHEET_DATA_END)
+    if first < 0 or end < 0:
+        raise UnsupportedSheet(member)
+    points = [first]
+    for part in range(1, parts):
+        offset = data.find(ROW_START, first + (end - first) * part // parts)
+        if offset < 0 or offset >= end:
+            break
+        if offset > points[-1]:
+            points.append(offset)
+    points.append(end)
+    return points
+
+
+def read_numbered_rows(path, member, start, stop, width=0, min_row=2):
+    """
+    Parse the rows in bytes [start, stop) of a sheet's XML and return them as
+    (row number, value tuple) pairs, skipping rows numbered below min_row (the
+    header). Rows are padded to `width` columns. Safe to run in a worker process.
+    """
+    with zipfile.ZipFile(path) as archive:
+        strings = _shared_strings(archive)
+        data = archive.read(member)
+    # Wrap the slice in the sheet's own header and footer so every namespace the
+    # rows use (e.g. Excel's x14ac attributes) stays declared.
+    parser = XMLParser()
+    parser.feed(data[: data.find(ROW_START)])
+    parser.feed(data[start:stop])
+    parser.feed(data[data.find(SHEET_DATA_END) :])
+    element = parser.close()
+    return [
+        (number, values)
+        for number, values in _rows(element, strings, width)
+        if number >= min_row
+    ]
+
+
+def fill_gaps(numbered_rows, first_row, width=0):
+    """
+    Return the value tuples of (row number, values) pairs in sheet order, with a
+    blank row for every row number missing from first_row on.
+    """
+    rows = []
+    expected = first_row
+    for number, values in numbered_rows:
+        rows.extend([(None,) * width] * (number - expected))
+        rows.append(values)
+        expected = number + 1
+    return rows
+
+
+def read_rows(path, member, start, stop, width=0, min_row=2):
+    """
+    Parse the rows in bytes [start, stop) of a sheet's XML as value tuples, from
+    row min_row on. Missing rows within the range read as blank rows.
+    """
+    numbered = read_numbered_rows(path, member, start, stop, width, min_row)
+    return fill_gaps(numbered, numbered[0][0] if numbered else min_row, width)
+
+
+def read_header(path, member):
+    """
+    Return the first row of a sheet as a list of values, parsing only that row.
+    """
+    with zipfile.ZipFile(path) as archive:
+        data = archive.read(member)
+    first = data.find(ROW_START)
+    if first < 0:
+        raise UnsupportedSheet(member)
+    second = data.find(ROW_START, first + 1)
+    stop = second if second >= 0 else data.find(SHEET_DATA_END)
+    rows = read_rows(path, member, first, stop, min_row=1)
+    return list(rows[0]) if rows else []